@@ -0,0 +1,249 @@
+"""
+Benchmark of CFGParser's engines across grammar families and input sizes.
+
+For every grammar family, accepted and rejected inputs are generated at increasing lengths
+(from a fixed seed, so runs are reproducible) and parsed by every engine under a SearchBudget.
+Time, steps, peak frontier and optionally peak memory are written as JSON, and compared with
+a saved baseline to report regressions.
+
+    python Benchmark.py --lengths 4 8 16 32 --output results.json
+    python Benchmark.py --baseline results.json
+"""
+import sys
+import json
+import random
+import argparse
+import platform
+from time import perf_counter
+from prettytable import PrettyTable
+from CFGParser import CFG, ENGINES, SearchBudget, BudgetExhausted
+
+FORMAT_VERSION = 1
+
+
+def binary_inputs(rng, length):
+    accepted = ''.join(rng.choice('01') for _ in range(max(length, 1)))
+    return accepted, accepted + '2'
+
+
+def palindrome_inputs(rng, length):
+    half = ''.join(rng.choice('ab') for _ in range(length // 2))
+    middle = rng.choice(['', 'a', 'b']) if length % 2 else ''
+    accepted = half + middle + half[::-1]
+    if len(accepted) < 2:
+        return accepted, 'ab'
+    return accepted, ('b' if accepted[0] == 'a' else 'a') + accepted[1:]
+
+
+def parentheses_inputs(rng, length):
+    length -= length % 2
+    symbols = []
+    opened = 0
+    for position in range(length):
+        remaining = length - position
+        if opened == remaining or (opened and rng.random() < 0.5):
+            symbols.append(')')
+            opened -= 1
+        else:
+            symbols.append('(')
+            opened += 1
+    accepted = ''.join(symbols)
+    return accepted, ')' + accepted[1:] if accepted else ')'
+
+
+def expression(rng, length):
+    if length <= 2:
+        return 'x'
+    if rng.random() < 0.3:
+        return '(' + expression(rng, length - 2) + ')'
+    left = rng.randint(1, length - 2)
+    return expression(rng, left) + rng.choice('+*') + expression(rng, length - left - 1)
+
+
+def arithmetic_inputs(rng, length):
+    accepted = expression(rng, length)
+    return accepted, accepted + '+'
+
+
+def ambiguous_inputs(rng, length):
+    accepted = 'a' * max(length, 1)
+    return accepted, accepted[:-1] + 'b'
+
+
+def nullable_inputs(rng, length):
+    cut = sorted(rng.randint(0, length) for _ in range(2))
+    accepted = 'a' * cut[0] + 'b' * (cut[1] - cut[0]) + 'c' * (length - cut[1])
+    return accepted, 'c' + 'a' * max(length - 1, 1)
+
+
+# name -> (rules, start variable, function returning (accepted, rejected) inputs of about a length)
+FAMILIES = {
+    'binary': ({'S': ['0S', '1S', '0', '1']}, 'S', binary_inputs),
+    'palindromes': ({'S': ['aSa', 'bSb', 'a', 'b', 'λ']}, 'S', palindrome_inputs),
+    'parentheses': ({'S': ['(S)S', 'λ']}, 'S', parentheses_inputs),
+    'arithmetic': ({'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'x']}, 'E', arithmetic_inputs),
+    'ambiguous': ({'S': ['SS', 'a']}, 'S', ambiguous_inputs),
+    'nullable': ({'S': ['ABC'], 'A': ['aA', 'AA', 'λ'], 'B': ['bB', 'λ'], 'C': ['cC', 'λ']}, 'S', nullable_inputs),
+}
+
+
+def build_grammar(rules, start_variable):
+    terminals = {symbol for productions in rules.values() for production in productions
+                 for symbol in production if symbol not in rules}
+    terminals.add('λ')
+    grammar = CFG(terminals=terminals, rules=rules, start_variable=start_variable)
+    grammar.rules(None)
+    return grammar
+
+
+def run_one(grammar, engine, string, expected, args):
+    """
+    Parses string with one engine
+
+    Returns the record of the run
+    """
+    record = {'engine': engine, 'input_length': len(string), 'expected': expected}
+    budget = SearchBudget(max_expanded=args.max_expanded, deadline=args.deadline)
+    started = perf_counter()
+    try:
+        accepted, _ = getattr(grammar, engine)(string, budget=budget)
+        record['status'] = 'accepted' if accepted else 'rejected'
+    except BudgetExhausted as e:
+        record['status'] = 'exhausted'
+        record['reason'] = e.reason
+    except ValueError as e:
+        record['status'] = 'unsupported'
+        record['reason'] = str(e).split('\n')[0]
+    record['seconds'] = perf_counter() - started
+    stats = grammar.last_stats
+    record['steps'] = stats.get('expanded', 0)
+    record['peak_frontier'] = stats.get('peak_frontier', 0)
+    record['prepare_seconds'] = stats.get('timings', {}).get('prepare')
+    record['peak_memory'] = stats['memory']['peak'] if 'memory' in stats else None
+    record['correct'] = record['status'] not in ('accepted', 'rejected') or record['status'] == expected
+    return record
+
+
+def run(args):
+    results = []
+    for family in args.families:
+        rules, start_variable, inputs = FAMILIES[family]
+        grammar = build_grammar(rules, start_variable)
+        grammar.use_automaton = not args.no_automaton
+        grammar.trace_memory = args.memory
+        rng = random.Random(args.seed)
+        cases = [(length, inputs(rng, length)) for length in args.lengths]
+        for engine in args.engines:
+            # Once an engine gives up on a family, longer inputs are skipped
+            given_up = False
+            for length, (accepted, rejected) in cases:
+                for kind, string in (('accepted', accepted), ('rejected', rejected)):
+                    if given_up:
+                        record = {'engine': engine, 'input_length': len(string), 'expected': kind,
+                                  'status': 'skipped', 'correct': True}
+                    else:
+                        timings = [run_one(grammar, engine, string, kind, args) for _ in range(args.repeat)]
+                        record = min(timings, key=lambda timing: timing['seconds'])
+                        given_up = record['status'] == 'exhausted'
+                    record.update(family=family, length=length)
+                    results.append(record)
+                    if args.verbose:
+                        print(family, engine, length, kind, record['status'], file=sys.stderr)
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'settings': {'lengths': args.lengths, 'seed': args.seed, 'deadline': args.deadline,
+                     'max_expanded': args.max_expanded, 'automaton': not args.no_automaton,
+                     'memory': args.memory, 'repeat': args.repeat},
+        'results': results,
+    }
+
+
+def result_key(record):
+    return record['family'], record['engine'], record['length'], record['expected']
+
+
+def compare(report, baseline, tolerance, min_delta):
+    """
+    Returns the regressions of report against baseline: inputs decided in the baseline that are
+    not anymore, wrong answers, and runs slower than the baseline by more than tolerance (a
+    fraction) and min_delta seconds
+    """
+    previous = {result_key(record): record for record in baseline['results']}
+    regressions = []
+    for record in report['results']:
+        old = previous.get(result_key(record))
+        if old is None:
+            continue
+        name = '{} {} length {} ({})'.format(*result_key(record))
+        if not record['correct']:
+            regressions.append('{}: wrong answer {}'.format(name, record['status']))
+        elif old['status'] in ('accepted', 'rejected') and record['status'] not in ('accepted', 'rejected'):
+            regressions.append('{}: {} in the baseline, now {}'.format(name, old['status'], record['status']))
+        elif old['status'] == record['status'] == record['expected']:
+            if record['seconds'] > old['seconds'] * (1 + tolerance) and record['seconds'] - old['seconds'] > min_delta:
+                regressions.append('{}: {:.4f}s, baseline {:.4f}s'.format(name, record['seconds'], old['seconds']))
+    return regressions
+
+
+def summary(report):
+    """
+    Returns a table of the longest input every engine decided within its budget, per family
+    (n/a for grammars the engine does not support)
+    """
+    longest = {}
+    for record in report['results']:
+        key = (record['family'], record['engine'])
+        if record['status'] in ('accepted', 'rejected'):
+            longest[key] = max(longest.get(key) or 0, record['input_length'])
+        elif record['status'] == 'unsupported':
+            longest.setdefault(key, 'n/a')
+        else:
+            longest.setdefault(key, 0)
+    engines = sorted({engine for _, engine in longest}, key=ENGINES.index)
+    table = PrettyTable(['Family'] + engines)
+    for family in dict.fromkeys(family for family, _ in longest):
+        table.add_row([family] + [longest.get((family, engine), '-') for engine in engines])
+    return table.get_string()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CFGParser's engines across grammar families")
+    parser.add_argument('--families', nargs='+', choices=list(FAMILIES), default=list(FAMILIES))
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    parser.add_argument('--lengths', nargs='+', type=int, default=[2, 4, 8, 16, 32, 64])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--deadline', type=float, default=2.0, help="seconds allowed per parse")
+    parser.add_argument('--max-expanded', type=int, default=1000000, help="steps allowed per parse")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per input, the fastest is kept")
+    parser.add_argument('--memory', action='store_true', help="record peak memory with tracemalloc (slower)")
+    parser.add_argument('--no-automaton', action='store_true', help="do not hand regular grammars to their DFA")
+    parser.add_argument('--output', help="JSON file to write, standard output by default")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="slowdown fraction counted as a regression")
+    parser.add_argument('--min-delta', type=float, default=0.005, help="slowdown seconds ignored as noise")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text)
+    else:
+        print(text)
+    print(summary(report), file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta)
+        for regression in regressions:
+            print('REGRESSION ' + regression, file=sys.stderr)
+        print('{} regression(s) against {}'.format(len(regressions), args.baseline), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
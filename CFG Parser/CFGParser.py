@@ -1,14 +1,91 @@
+import gc
+import os
 import re
+import random
+import sys
+import mmap
+import zlib
+import pickle
+import struct
+import signal
+import hashlib
+import functools
+import threading
+import time
+import tracemalloc
+from array import array
+from itertools import islice, combinations
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy, copy
 from prettytable import PrettyTable
-from collections import deque, defaultdict
+from collections import deque, defaultdict, OrderedDict
+
+NULL_CHARACTERS = {'λ', 'ε'}
+END_MARKER = '$'
+ENGINES = ('BFS', 'DFS', 'CYK', 'Earley', 'GLL', 'LL1', 'LALR')
+NORMALIZATION_PASSES = ('epsilon', 'unit', 'useless', 'left_recursion', 'left_factoring')
+# BFS and DFS search the normal form up to this pass: left factoring adds nullable variables,
+# which their length pruning cannot rule out. LL1 uses every pass
+SEARCH_NORMAL_FORM = 'left_recursion'
+# Removing left recursion can multiply the rules exponentially, normal forms are given up past this
+NORMAL_FORM_MAX_RULES = 20000
+CACHE_MAGIC = b'CFGCACHE'
+CACHE_VERSION = 2
+# Cache files start with the magic, the format version, the grammar's fingerprint and the CRC-32
+# and length of the pickled payload following the header
+CACHE_HEADER = struct.Struct('<8sH32sIQ')
 
 class DerivationNode:
+    __slots__ = ('value', 'parent')
+
     def __init__(self, value, parent=None):
         self.value = value
         self.parent = parent
 
 
+class DerivationRecords:
+    """
+    Search states of a leftmost derivation search, kept as parallel arrays instead of strings.
+
+    Record i was derived from record parents[i] by replacing the variable at positions[i] with
+    production rules[i], and its sentential form is lengths[i] symbols long. Forms are only
+    rebuilt by derivation()
+    """
+    __slots__ = ('parents', 'positions', 'rules', 'lengths')
+
+    def __init__(self):
+        self.parents = array('i')
+        self.positions = array('i')
+        self.rules = array('i')
+        self.lengths = array('i')
+
+    def __len__(self):
+        return len(self.parents)
+
+    def append(self, parent, position, rule, length):
+        self.parents.append(parent)
+        self.positions.append(position)
+        self.rules.append(rule)
+        self.lengths.append(length)
+        return len(self.parents) - 1
+
+    def derivation(self, index, start, productions):
+        """
+        Returns the last DerivationNode of the derivation of record index from start
+        """
+        steps = []
+        while self.parents[index] >= 0:
+            steps.append(index)
+            index = self.parents[index]
+        node = DerivationNode(start)
+        form = start
+        for index in reversed(steps):
+            position = self.positions[index]
+            form = form[:position] + ''.join(productions[self.rules[index]][1]) + form[position + 1:]
+            node = DerivationNode(form, node)
+        return node
+
+
 def strings_contain_each_other(first_str, second_str):
     """
     Checks if two strings contain each other.
@@ -28,6 +105,57 @@ def strings_contain_each_other(first_str, second_str):
     return are_containing, first_str, second_str
 
 
+def find_contained_pair(strings):
+    """
+    Finds two strings of an iterable of distinct strings such that one contains the other, in
+    time linear in their total length, with an Aho-Corasick automaton of all of them.
+
+    Returns (the string that includes, the string that is included), None if there are none
+    """
+    strings = list(strings)
+    if '' in strings and len(strings) > 1:
+        return next(string for string in strings if string), ''
+    # Trie of the strings: goto transitions, the string ending at each node if any, the node's
+    # longest proper suffix in the trie, and the nearest such suffix that is a whole string
+    goto = [{}]
+    word = [None]
+    for string in strings:
+        node = 0
+        for char in string:
+            following = goto[node].get(char)
+            if following is None:
+                following = len(goto)
+                goto[node][char] = following
+                goto.append({})
+                word.append(None)
+            node = following
+        word[node] = string
+    fail = [0] * len(goto)
+    output = [None] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for char, following in goto[node].items():
+            suffix = fail[node]
+            while suffix and char not in goto[suffix]:
+                suffix = fail[suffix]
+            suffix = goto[suffix].get(char, 0)
+            fail[following] = suffix
+            output[following] = suffix if word[suffix] is not None else output[suffix]
+            queue.append(following)
+    for string in strings:
+        node = 0
+        for char in string:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if word[node] is not None and word[node] != string:
+                return string, word[node]
+            if output[node] is not None:
+                return string, word[output[node]]
+    return None
+
+
 def string_contains_space(string):
     """
     Returns true if string contains space, false otherwise.
@@ -37,392 +165,3839 @@ def string_contains_space(string):
         if char.isspace():
             return True
 
-    return False
+    return False
+
+
+def re_escaped(it):
+    for i in it:
+        yield re.escape(i)
+
+
+def substitute_builder(builder, replacements):
+    """
+    Replaces the ('splice', k) entries of a tree builder with the builders
+    given in replacements[k], inside nested nodes too.
+    """
+    substituted = []
+    for entry in builder:
+        if entry[0] == 'splice':
+            substituted.extend(replacements[entry[1]])
+        else:
+            substituted.append(('node', entry[1], entry[2], substitute_builder(entry[3], replacements)))
+    return tuple(substituted)
+
+
+def evaluate_builder(builder, children):
+    """
+    Runs a tree builder over the items derived by each symbol of a rule.
+
+    Returns the list of items (terminals and (variable, symbols, subtrees) parse trees)
+    the builder stands for in the original grammar
+    """
+    items = []
+    for entry in builder:
+        if entry[0] == 'splice':
+            items.extend(children[entry[1]])
+        else:
+            inner = evaluate_builder(entry[3], children)
+            items.append((entry[1], entry[2], [item for item in inner if type(item) is not str]))
+    return items
+
+def run_action(action, children):
+    """
+    Runs the action of a NormalForm rule over the values derived by each of its symbols
+    (terminals derive [terminal]).
+
+    Returns the rule's value: the list of items its variable stands for in the original grammar,
+    as evaluate_builder() does, or what a variable added by a pass hands to the rules using it
+    """
+    kind = action[0]
+    if kind == 'build':
+        return evaluate_builder(action[1], children)
+    if kind == 'const':
+        # Null derivation of a variable, fixed by the epsilon pass
+        return action[1]
+    if kind == 'fill':
+        # Rule of the epsilon pass: the omitted symbols' null values are put back
+        given = iter(children)
+        return run_action(action[1], [next(given) if slot is None else slot for slot in action[2]])
+    if kind == 'sub':
+        # The first symbol of rule action[1] was replaced with the symbols of rule action[2]
+        count = action[3]
+        return run_action(action[1], [run_action(action[2], children[:count])] + children[count:])
+    if kind == 'seed':
+        # A -> β A' of the left recursion pass: A -> β, then the A -> A α rules A' stands for
+        items = run_action(action[1], children[:-1])
+        for step, operands in children[-1]:
+            items = run_action(step, [items] + operands)
+        return items
+    if kind == 'tail':
+        # A' -> α A' and A' -> α: the A -> A α rule action[1] still to apply, then the others
+        if action[2]:
+            return [(action[1], children[:-1])] + children[-1]
+        return [(action[1], children)]
+    if kind == 'part':
+        # A' -> β of the left factoring pass: rule action[1] minus the prefix A -> α A' holds
+        return ('partial', action[1], children)
+    if kind == 'join':
+        _, rule, rest = children[-1]
+        return run_action(rule, children[:-1] + rest)
+    raise ValueError("Unknown normal form action '{}'".format(kind))
+
+
+class RuleNode():
+        __slots__ = ('NodeName', 'NodeVars', 'NodeString', 'CanBeNull', 'CanRepeat', 'index')
+
+        def __init__(self,
+                     NodeName=None,
+                     NodeVars=None,
+                     NodeString=None,
+                     CanBeNull=False,
+                     CanRepeat=False,  ):
+            self.NodeName = NodeName
+            self.NodeVars = NodeVars
+            self.NodeString = NodeString
+            self.CanBeNull = CanBeNull
+            self.CanRepeat = CanRepeat
+            self.index = 0
+
+
+class CompiledGrammar():
+    """
+    Immutable form of a grammar's rules with integer symbols, built once per set of rules.
+
+    Symbols are numbered variables first (0 to variable_count - 1) and terminals after them.
+    Rules are sorted by variable, rules offsets[v] to offsets[v + 1] - 1 being the ones of
+    variable v, and rule r is lhs[r] -> rhs[r] (a tuple of symbol numbers, empty for null rules).
+    productions holds the same rules as (variable, symbols) strings, null characters dropped
+    """
+    __slots__ = ('rules', 'productions', 'symbols', 'codes', 'variable_count', 'start', 'lhs', 'rhs', 'offsets')
+
+    def __init__(self, rules, productions, variables, start_variable):
+        self.rules = frozenset(rules)
+        self.productions = tuple(productions)
+        variables = sorted(set(variables) | {variable for variable, _ in productions})
+        terminals = sorted({symbol for _, symbols in productions for symbol in symbols} - set(variables))
+        self.symbols = tuple(variables + terminals)
+        self.codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self.variable_count = len(variables)
+        self.start = self.codes.get(start_variable, -1)
+        self.lhs = array('i', [self.codes[variable] for variable, _ in productions])
+        self.rhs = tuple(tuple(self.codes[symbol] for symbol in symbols) for _, symbols in productions)
+        offsets = [0] * (self.variable_count + 1)
+        for code in self.lhs:
+            offsets[code + 1] += 1
+        for code in range(self.variable_count):
+            offsets[code + 1] += offsets[code]
+        self.offsets = array('i', offsets)
+
+    def with_rows(self, rules, rows):
+        """
+        Returns the CompiledGrammar of rules, whose productions only differ from these for the
+        variables of rows (variable -> its (variable, symbols) productions), the rows of the other
+        variables being kept as they are. None if a variable or terminal is added or no longer
+        used, the symbols being numbered again
+        """
+        codes = self.codes
+        encoded = {}
+        for variable, productions in rows.items():
+            if codes.get(variable, self.variable_count) >= self.variable_count:
+                return None
+            try:
+                encoded[codes[variable]] = [tuple(codes[symbol] for symbol in symbols) for _, symbols in productions]
+            except KeyError:
+                return None
+        productions = []
+        rhs = []
+        lhs = array('i')
+        offsets = array('i', [0])
+        for code in range(self.variable_count):
+            if code in encoded:
+                productions.extend(rows[self.symbols[code]])
+                rhs.extend(encoded[code])
+                count = len(encoded[code])
+            else:
+                start, end = self.offsets[code], self.offsets[code + 1]
+                productions.extend(self.productions[start:end])
+                rhs.extend(self.rhs[start:end])
+                count = end - start
+            lhs.extend([code] * count)
+            offsets.append(offsets[-1] + count)
+        terminals = {code for symbols in rhs for code in symbols if code >= self.variable_count}
+        if len(terminals) != len(self.symbols) - self.variable_count:
+            return None
+        compiled = CompiledGrammar.__new__(CompiledGrammar)
+        compiled.rules = frozenset(rules)
+        compiled.productions = tuple(productions)
+        compiled.symbols = self.symbols
+        compiled.codes = codes
+        compiled.variable_count = self.variable_count
+        compiled.start = self.start
+        compiled.lhs = lhs
+        compiled.rhs = tuple(rhs)
+        compiled.offsets = offsets
+        return compiled
+
+    def encode(self, string):
+        """
+        Returns the symbol numbers of string, None if it has a symbol the grammar does not use
+        """
+        codes = self.codes
+        try:
+            return [codes[symbol] for symbol in string]
+        except KeyError:
+            return None
+
+
+class GrammarAnalysis():
+    """
+    Facts about a grammar computed once when its rules are prepared.
+
+    productions: the (variable, symbols) rules, null characters dropped
+    variable_rules: variable -> indices of its rules in productions
+    replacements: variable -> strings its productive rules replace it with
+    nullable / null_trees: variables deriving the empty string, with one null parse tree each
+    min_length: variable -> length of its shortest terminal string (productive variables only)
+    min_steps: variable -> number of steps of its shortest derivation of a terminal string
+    first: variable -> terminals its strings can start with
+    productive / reachable: variables deriving a terminal string / reachable from the start variable
+    cyclic: variables deriving themselves (A =>+ A), through unit rules and nullable symbols
+
+    Given the analysis of the grammar before the rules of the changed variables were edited
+    (previous), the facts of the variables that cannot reach a changed one are kept from it and
+    only the other variables' are computed again
+    """
+    def __init__(self, productions, variables, start_variable, previous=None, changed=()):
+        self.productions = productions
+        self.variables = variables
+        self.variable_rules = defaultdict(list)
+        for index, (variable, _) in enumerate(productions):
+            self.variable_rules[variable].append(index)
+
+        self.null_trees = {}
+        self.min_length = {}
+        self.min_steps = {}
+        self.first = {variable: set() for variable in variables}
+        pending = productions
+        if previous is not None:
+            users = defaultdict(set)
+            for variable, symbols in productions:
+                for symbol in symbols:
+                    if symbol in variables:
+                        users[symbol].add(variable)
+            affected = set(changed)
+            stack = list(changed)
+            while stack:
+                for user in users[stack.pop()]:
+                    if user not in affected:
+                        affected.add(user)
+                        stack.append(user)
+            for variable in variables - affected:
+                for facts, kept in ((self.null_trees, previous.null_trees), (self.min_length, previous.min_length),
+                                    (self.min_steps, previous.min_steps)):
+                    if variable in kept:
+                        facts[variable] = kept[variable]
+                self.first[variable] = set(previous.first.get(variable, ()))
+            pending = [(variable, symbols) for variable, symbols in productions if variable in affected]
+        changed = True
+        while changed:
+            changed = False
+            for variable, symbols in pending:
+                if variable not in self.null_trees and all(symbol in self.null_trees for symbol in symbols):
+                    self.null_trees[variable] = (variable, symbols, [self.null_trees[symbol] for symbol in symbols])
+                    changed = True
+                if all(symbol in self.min_length or symbol not in variables for symbol in symbols):
+                    length = sum(self.min_length.get(symbol, 1) for symbol in symbols)
+                    if length < self.min_length.get(variable, length + 1):
+                        self.min_length[variable] = length
+                        changed = True
+                    steps = 1 + sum(self.min_steps[symbol] for symbol in symbols if symbol in variables)
+                    if steps < self.min_steps.get(variable, steps + 1):
+                        self.min_steps[variable] = steps
+                        changed = True
+                first = self.first_of(symbols)[0]
+                if not first <= self.first[variable]:
+                    self.first[variable] |= first
+                    changed = True
+        self.nullable = set(self.null_trees)
+        self.productive = set(self.min_length)
+
+        units = defaultdict(set)
+        for variable, symbols in productions:
+            nullable = [symbol in self.nullable for symbol in symbols]
+            for position, symbol in enumerate(symbols):
+                if symbol in variables and nullable.count(False) == (not nullable[position]):
+                    units[variable].add(symbol)
+        self.cyclic = set()
+        for variable in variables:
+            seen = set()
+            pending = list(units[variable])
+            while pending and variable not in seen:
+                symbol = pending.pop()
+                if symbol not in seen:
+                    seen.add(symbol)
+                    pending.extend(units[symbol])
+            if variable in seen:
+                self.cyclic.add(variable)
+
+        self.reachable = {start_variable}
+        pending = [start_variable]
+        while pending:
+            for index in self.variable_rules[pending.pop()]:
+                for symbol in productions[index][1]:
+                    if symbol in variables and symbol not in self.reachable:
+                        self.reachable.add(symbol)
+                        pending.append(symbol)
+
+        self.replacements = defaultdict(list)
+        for variable, symbols in productions:
+            if variable in self.productive and all(s in self.productive for s in symbols if s in variables):
+                self.replacements[variable].append(''.join(symbols))
+
+    def first_of(self, symbols):
+        """
+        Returns (terminals the symbols' strings can start with, true if the symbols are all nullable)
+        """
+        first = set()
+        for symbol in symbols:
+            if symbol not in self.variables:
+                first.add(symbol)
+                return first, False
+            first |= self.first[symbol]
+            if symbol not in self.null_trees:
+                return first, False
+        return first, True
+
+    def viable(self, form, target, offset=0):
+        """
+        Returns false if the sentential form provably cannot derive target[offset:], see prune_reason()
+        """
+        return self.prune_reason(form, target, offset) is None
+
+    def prune_reason(self, form, target, offset=0):
+        """
+        Returns why the sentential form provably cannot derive target[offset:]: 'prefix' if its
+        terminal prefix does not match, 'unproductive' if it has a variable deriving no string,
+        'length' if its shortest string is longer, 'first' if the next symbol of the target is
+        not in its FIRST set. Returns None if it may derive it
+        """
+        for position, symbol in enumerate(form, offset):
+            if symbol in self.variables:
+                break
+            if position >= len(target) or target[position] != symbol:
+                return 'prefix'
+        else:
+            return None if len(form) == len(target) - offset else 'length'
+
+        length = 0
+        for symbol in form:
+            if symbol in self.variables:
+                if symbol not in self.min_length:
+                    return 'unproductive'
+                length += self.min_length[symbol]
+            else:
+                length += 1
+        if length > len(target) - offset:
+            return 'length'
+        if position == len(target) or target[position] in self.first_of(form[position - offset:])[0]:
+            return None
+        return 'first'
+
+
+class SearchFacts():
+    """
+    GrammarAnalysis facts BFS and DFS prune with, on the symbol numbers of a CompiledGrammar.
+
+    Their sentential forms start with a prefix of the input, and are kept as the length of that
+    prefix and the rest of the form from its leftmost variable: a string of symbol numbers (the
+    characters chr(number)), like the encoded input. texts[r] is the right side of rule r in that
+    form, and rules[v] the productive rules of variable v. min_length, min_steps and first are
+    the GrammarAnalysis facts of every symbol (min_length -1 for unproductive variables, a
+    terminal being its own first set). A rest's lower bounds are updated rule by rule from
+    lengths[r] and steps[r], rule r's shortest string length and steps of its variables
+    """
+    __slots__ = ('grammar', 'texts', 'rules', 'min_length', 'min_steps', 'first', 'nullable', 'lengths', 'steps',
+                 'terminals', 'most_terminals', 'variable_pattern')
+
+    def __init__(self, grammar, analysis):
+        count = grammar.variable_count
+        symbols = grammar.symbols
+        self.grammar = grammar
+        self.texts = [''.join(map(chr, rule)) for rule in grammar.rhs]
+        self.min_length = [analysis.min_length.get(symbol, -1) if code < count else 1
+                           for code, symbol in enumerate(symbols)]
+        self.min_steps = [analysis.min_steps.get(symbol, 0) if code < count else 0
+                          for code, symbol in enumerate(symbols)]
+        self.first = [{grammar.codes[terminal] for terminal in analysis.first[symbol]} if code < count else {code}
+                      for code, symbol in enumerate(symbols)]
+        self.nullable = [symbol in analysis.nullable for symbol in symbols]
+        self.lengths = [sum(self.min_length[code] for code in rule) for rule in grammar.rhs]
+        self.steps = [sum(self.min_steps[code] for code in rule) for rule in grammar.rhs]
+        self.terminals = [sum(code >= count for code in rule) for rule in grammar.rhs]
+        self.most_terminals = max(self.terminals, default=0)
+        self.rules = [[rule for rule in range(grammar.offsets[code], grammar.offsets[code + 1])
+                       if all(self.min_length[symbol] >= 0 for symbol in grammar.rhs[rule])]
+                      if self.min_length[code] >= 0 else [] for code in range(count)]
+        self.variable_pattern = re.compile('[\x00-{}]'.format(re.escape(chr(count - 1)))) if count else None
+
+    def measure(self, rest):
+        """
+        Returns (shortest string length, shortest derivation steps, number of terminals) of
+        rest, the length being -1 if one of its variables derives no string
+        """
+        length = steps = terminals = 0
+        for character in rest:
+            code = ord(character)
+            if self.min_length[code] < 0:
+                return -1, 0, 0
+            length += self.min_length[code]
+            steps += self.min_steps[code]
+            terminals += code >= self.grammar.variable_count
+        return length, steps, terminals
+
+    def check(self, rest, target, offset, length):
+        """
+        Same as GrammarAnalysis.prune_reason() for the form target[:offset] + rest, rest being
+        length long at the shortest (see measure()). Returns (the reason, None if it may derive
+        target, the number of terminals rest starts with)
+        """
+        match = self.variable_pattern.search(rest) if self.variable_pattern is not None else None
+        skip = match.start() if match is not None else len(rest)
+        if not target.startswith(rest[:skip], offset):
+            return 'prefix', skip
+        if match is None:
+            return (None if len(rest) == len(target) - offset else 'length'), skip
+        if length < 0:
+            return 'unproductive', skip
+        if length > len(target) - offset:
+            return 'length', skip
+        if offset + skip == len(target):
+            return None, skip
+        symbol = ord(target[offset + skip])
+        for character in rest[skip:]:
+            code = ord(character)
+            if symbol in self.first[code]:
+                return None, skip
+            if not self.nullable[code]:
+                break
+        return 'first', skip
+
+    def expand(self, rest, target, offset, length, steps, terminals, rule):
+        """
+        Replaces the leftmost variable of rest (length, steps and terminals being its measure())
+        with rule, and moves the terminals it then starts with to the prefix
+
+        Returns (the reason the new form is pruned or None, its prefix length, its rest and the
+        rest's measure())
+        """
+        variable = ord(rest[0])
+        rest = self.texts[rule] + rest[1:]
+        length += self.lengths[rule] - self.min_length[variable]
+        reason, skip = self.check(rest, target, offset, length)
+        return (reason, offset + skip, rest[skip:], length - skip,
+                steps + self.steps[rule] - self.min_steps[variable], terminals + self.terminals[rule] - skip)
+
+    def decode(self, rest):
+        symbols = self.grammar.symbols
+        return ''.join(symbols[ord(character)] for character in rest)
+
+
+class RegularAutomaton():
+    """
+    Minimized DFA compiled from a right-linear or left-linear grammar.
+
+    Transitions are kept in a flat array: table[state * width + column] is the next state,
+    -1 when no accepted string can follow. The NFA it was built from, whose edges are
+    (symbol or None, target, rule index, offset in the rule), is kept to recover the rules
+    used by an accepted string
+    """
+    def __init__(self, edges, start, final, left_linear):
+        self.edges = edges
+        self.nfa_start = start
+        self.nfa_final = final
+        self.left_linear = left_linear
+        symbols = sorted({edge[0] for state_edges in edges for edge in state_edges if edge[0] is not None})
+        self.alphabet = {symbol: column for column, symbol in enumerate(symbols)}
+        self.width = len(symbols)
+
+        # Subset construction
+        first = self._closure({start})
+        subsets = [first]
+        subset_index = {first: 0}
+        moves = []
+        position = 0
+        while position < len(subsets):
+            row = []
+            for symbol in symbols:
+                target = self._closure({edge[1] for state in subsets[position] for edge in edges[state] if edge[0] == symbol})
+                if not target:
+                    row.append(-1)
+                    continue
+                if target not in subset_index:
+                    subset_index[target] = len(subsets)
+                    subsets.append(target)
+                row.append(subset_index[target])
+            moves.append(row)
+            position += 1
+
+        # Moore's partition refinement
+        classes = [int(final in subset) for subset in subsets]
+        while True:
+            signatures = {}
+            refined = [signatures.setdefault((classes[state],) + tuple(classes[t] if t >= 0 else -1 for t in row), len(signatures))
+                       for state, row in enumerate(moves)]
+            stable = len(signatures) == len(set(classes))
+            # Refined classes are numbered from 0, which the initial ones are not when all accept
+            classes = refined
+            if stable:
+                break
+
+        # Classes that cannot reach an accepting one are dropped, the start class being numbered 0
+        count = len(set(classes))
+        class_moves = [None] * count
+        accepting = [False] * count
+        for state, row in enumerate(moves):
+            class_moves[classes[state]] = [classes[t] if t >= 0 else -1 for t in row]
+            accepting[classes[state]] = final in subsets[state]
+        live = {c for c in range(count) if accepting[c]}
+        changed = True
+        while changed:
+            changed = False
+            for c in range(count):
+                if c not in live and any(t in live for t in class_moves[c]):
+                    live.add(c)
+                    changed = True
+        order = [classes[0]] + sorted(live - {classes[0]})
+        number = {c: n for n, c in enumerate(order) if c in live}
+        self.start = 0 if classes[0] in live else -1
+        self.table = array('i', [number.get(t, -1) for c in order for t in class_moves[c]])
+        self.accepting = bytearray(accepting[c] for c in order)
+        self.size = len(number)
+
+    def _closure(self, states):
+        states = set(states)
+        pending = list(states)
+        while pending:
+            for edge in self.edges[pending.pop()]:
+                if edge[0] is None and edge[1] not in states:
+                    states.add(edge[1])
+                    pending.append(edge[1])
+        return frozenset(states)
+
+    def accepts(self, string):
+        state = self.start
+        table, width, alphabet = self.table, self.width, self.alphabet
+        for symbol in string:
+            column = alphabet.get(symbol)
+            if column is None or state < 0:
+                return False
+            state = table[state * width + column]
+        return state >= 0 and bool(self.accepting[state])
+
+    def rules_of(self, string):
+        """
+        Replays an accepted string on the NFA
+
+        Returns the indices of the rules used, outermost first
+        """
+        def close(layer, position):
+            pending = list(layer)
+            while pending:
+                state = pending.pop()
+                for edge in self.edges[state]:
+                    if edge[0] is None and edge[1] not in layer:
+                        layer[edge[1]] = (state, position, edge)
+                        pending.append(edge[1])
+            return layer
+
+        layers = [close({self.nfa_start: None}, 0)]
+        for position, symbol in enumerate(string):
+            layer = {}
+            for state in layers[-1]:
+                for edge in self.edges[state]:
+                    if edge[0] == symbol and edge[1] not in layer:
+                        layer[edge[1]] = (state, position, edge)
+            layers.append(close(layer, position + 1))
+
+        rules = []
+        state, position = self.nfa_final, len(string)
+        while layers[position][state] is not None:
+            state, position, edge = layers[position][state]
+            if edge[3] == 0:
+                rules.append(edge[2])
+        return rules if self.left_linear else rules[::-1]
+
+
+class ChomskyGrammar():
+    """
+    Chomsky normal form of a CFG.
+
+    Every rule is either A -> a or A -> B C. Variables added by the conversion are tuples:
+    ('term', a) stands for a terminal inside a longer rule and ('seq', n, k) for the tail
+    of the n-th original rule starting at symbol k. Each rule carries a builder telling how
+    to rebuild the original grammar's parse tree from the parse of its symbols.
+
+    For parsing, variables are numbered (names[number] is the variable), the start variable
+    being 0: terminal_rules maps a terminal to the (variable, rule index) pairs deriving it,
+    binary_rules maps a variable B to the (C, A, rule index) triples of the A -> B C rules,
+    and pairs[rule index] is the (B, C) pair of a binary rule
+    """
+    def __init__(self, start_variable, rules, builders, null_builder):
+        self.start_variable = start_variable
+        self.rules = rules
+        self.builders = builders
+        self.null_builder = null_builder
+        self.names = [start_variable]
+        numbers = {start_variable: 0}
+
+        def number(symbol):
+            if symbol not in numbers:
+                numbers[symbol] = len(self.names)
+                self.names.append(symbol)
+            return numbers[symbol]
+
+        self.terminal_rules = defaultdict(list)
+        self.binary_rules = defaultdict(list)
+        self.pairs = []
+        for index, (variable, symbols) in enumerate(rules):
+            if len(symbols) == 1:
+                self.terminal_rules[symbols[0]].append((number(variable), index))
+                self.pairs.append(None)
+            else:
+                first, second = number(symbols[0]), number(symbols[1])
+                self.binary_rules[first].append((second, number(variable), index))
+                self.pairs.append((first, second))
+
+    @staticmethod
+    def symbol_name(symbol):
+        if type(symbol) is str:
+            return symbol
+        if symbol[0] == 'term':
+            return '<{}>'.format(symbol[1])
+        return '<{}.{}>'.format(*symbol[1:])
+
+    def __str__(self):
+        lines = ['{} -> {}'.format(self.symbol_name(variable), ' '.join(map(self.symbol_name, symbols)))
+                 for variable, symbols in self.rules]
+        if self.null_builder is not None:
+            lines.insert(0, '{} -> λ'.format(self.start_variable))
+        return '\n'.join(lines)
+
+class NormalFormTooLarge(ValueError):
+    pass
+
+
+class NormalForm():
+    """
+    Grammar equivalent to a CFG, made by a chain of NORMALIZATION_PASSES, for the top-down
+    engines to search in its place:
+
+    epsilon: removes null rules, the start variable keeping one if the grammar accepts λ
+    unit: collapses cycles of A -> B rules, every variable of a cycle getting the other rules
+        of the variables it reaches through it
+    useless: drops unproductive variables and the ones the start variable cannot reach
+    left_recursion: removes direct and indirect left recursion, adding A' variables
+    left_factoring: moves the common prefix of rules of a variable to one rule, adding A'
+        variables deriving the rest
+
+    Variables added by the passes are characters the grammar does not use. rules holds
+    (variable, symbols, action) triples, action telling how a use of the rule rebuilds the
+    original grammar's parse tree (see run_action()), so derivations found in grammar can be
+    shown with the original rules
+    """
+    def __init__(self, passes, start_variable, rules, variables, terminals, null_character, original):
+        self.passes = passes
+        self.start_variable = start_variable
+        self.rules = rules
+        self.variables = variables
+        self.terminals = terminals
+        self.null_character = null_character
+        self.original = original
+        self.actions = {(variable, ''.join(symbols)): action for variable, symbols, action in rules}
+        self._grammar = None
+
+    @classmethod
+    def of(cls, grammar):
+        """
+        Returns the NormalForm of grammar's rules before any pass
+        """
+        rules = [(variable, symbols,
+                  ('build', (('node', variable, symbols, tuple(('splice', k) for k in range(len(symbols)))),)))
+                 for variable, symbols in grammar.analyze().productions]
+        return cls((), grammar.start_variable, rules, frozenset(grammar.variables), grammar.terminals,
+                   grammar.null_character, (grammar.start_variable, frozenset(grammar.analyze().productions)))
+
+    @property
+    def changed(self):
+        """
+        True if the passes changed the grammar's rules
+        """
+        return (self.start_variable, {(variable, symbols) for variable, symbols, _ in self.rules}) != self.original
+
+    @property
+    def grammar(self):
+        """
+        Returns the CFG of the rules, built once
+        """
+        if self._grammar is None:
+            rules = {(variable, ''.join(symbols) or self.null_character) for variable, symbols, _ in self.rules}
+            grammar = CFG(variables=set(self.variables), terminals=set(self.terminals), rules=rules,
+                          start_variable=self.start_variable, null_character=self.null_character)
+            grammar.use_normal_form = False
+            grammar.rules(None)
+            self._grammar = grammar
+        return self._grammar
+
+    def apply(self, name):
+        """
+        Returns the NormalForm made by running pass name on the rules
+        """
+        fresh = self._fresh_symbols()
+        variables = set(self.variables)
+        start, rules = getattr(self, '_' + name)(fresh, variables)
+        self._check_size(rules, name)
+        # The first of the rules a pass made twice is kept
+        unique = {}
+        for variable, symbols, action in rules:
+            unique.setdefault((variable, symbols), action)
+        rules = [(variable, symbols, action) for (variable, symbols), action in unique.items()]
+        return NormalForm(self.passes + (name,), start, rules, frozenset(variables), self.terminals,
+                          self.null_character, self.original)
+
+    @staticmethod
+    def _check_size(rules, name):
+        if len(rules) > NORMAL_FORM_MAX_RULES:
+            raise NormalFormTooLarge("The {} pass makes more than {} rules".format(name, NORMAL_FORM_MAX_RULES))
+
+    def _fresh_symbols(self):
+        # Rules may use symbols that are not declared as variables or terminals
+        used = set(''.join(self.variables) + ''.join(self.terminals) + self.null_character + END_MARKER)
+        used.update(symbol for _, symbols, _ in self.rules for symbol in symbols)
+        candidates = [chr(code) for code in range(ord('A'), ord('Z') + 1)]
+        candidates += [chr(code) for code in range(0x391, 0x3AA) if code != 0x3A2]
+        candidates += [chr(code) for code in range(0xE000, 0xF900)]
+        return iter(symbol for symbol in candidates if symbol not in used)
+
+    def _epsilon(self, fresh, variables):
+        null = {}
+        changed = True
+        while changed:
+            changed = False
+            for variable, symbols, action in self.rules:
+                if variable not in null and all(symbol in null for symbol in symbols):
+                    null[variable] = run_action(action, [null[symbol] for symbol in symbols])
+                    changed = True
+        rules = []
+        for variable, symbols, action in self.rules:
+            positions = [k for k, symbol in enumerate(symbols) if symbol in null]
+            for count in range(len(positions) + 1):
+                for omitted in combinations(positions, count):
+                    kept = tuple(symbol for k, symbol in enumerate(symbols) if k not in omitted)
+                    if not kept:
+                        continue
+                    if not omitted:
+                        rules.append((variable, symbols, action))
+                        continue
+                    slots = tuple(null[symbol] if k in omitted else None for k, symbol in enumerate(symbols))
+                    rules.append((variable, kept, ('fill', action, slots)))
+            self._check_size(rules, 'epsilon')
+        start = self.start_variable
+        if start in null:
+            # The empty string is only derived by a new start variable used by no rule
+            if any(start in symbols for _, symbols, _ in rules):
+                start = next(fresh)
+                variables.add(start)
+                rules.insert(0, (start, (self.start_variable,), ('build', (('splice', 0),))))
+            rules.append((start, (), ('const', null[self.start_variable])))
+        return start, rules
+
+    def _unit(self, fresh, variables):
+        variable_rules = defaultdict(list)
+        units = defaultdict(set)
+        for variable, symbols, action in self.rules:
+            variable_rules[variable].append((symbols, action))
+            if len(symbols) == 1 and symbols[0] in variables:
+                units[variable].add(symbols[0])
+        reach = {}
+        for variable in variable_rules:
+            reach[variable] = set(units[variable])
+            pending = list(reach[variable])
+            while pending:
+                for target in units[pending.pop()]:
+                    if target not in reach[variable]:
+                        reach[variable].add(target)
+                        pending.append(target)
+        rules = []
+        for variable in variable_rules:
+            # Unit rules are followed inside the variable's cycles, and kept when leaving them
+            reached = {variable}
+            pending = deque([(variable, None)])
+            while pending:
+                target, outer = pending.popleft()
+                for symbols, action in variable_rules[target]:
+                    composed = action if outer is None else ('sub', outer, action, len(symbols))
+                    if len(symbols) != 1 or symbols[0] not in variables:
+                        rules.append((variable, symbols, composed))
+                    elif variable not in reach.get(symbols[0], ()):
+                        rules.append((variable, symbols, composed))
+                    elif symbols[0] not in reached:
+                        reached.add(symbols[0])
+                        pending.append((symbols[0], composed))
+        return self.start_variable, rules
+
+    def _useless(self, fresh, variables):
+        productive = set()
+        changed = True
+        while changed:
+            changed = False
+            for variable, symbols, _ in self.rules:
+                if variable not in productive and all(s in productive or s not in variables for s in symbols):
+                    productive.add(variable)
+                    changed = True
+        rules = [rule for rule in self.rules if all(s in productive or s not in variables for s in rule[1])]
+        return self.start_variable, self._reachable(rules, variables)
+
+    def _reachable(self, rules, variables):
+        variable_rules = defaultdict(list)
+        for rule in rules:
+            variable_rules[rule[0]].append(rule)
+        reachable = {self.start_variable}
+        pending = [self.start_variable]
+        while pending:
+            for _, symbols, _ in variable_rules[pending.pop()]:
+                for symbol in symbols:
+                    if symbol in variables and symbol not in reachable:
+                        reachable.add(symbol)
+                        pending.append(symbol)
+        return [rule for rule in rules if rule[0] in reachable]
+
+    def _left_recursion(self, fresh, variables):
+        # Paull's algorithm: once A_i is done, its rules only start with terminals or with A_k, k > i.
+        # It needs rules without null and unit cycles, so the epsilon and unit passes come first
+        variable_rules = defaultdict(list)
+        for variable, symbols, action in self.rules:
+            variable_rules[variable].append((symbols, action))
+        # Variables used by the others come first, so the rules of these get substituted to start
+        # with terminals, which left factoring can then share
+        order = list(reversed(variable_rules))
+        for i, variable in enumerate(order):
+            for earlier in order[:i]:
+                substituted = []
+                for symbols, action in variable_rules[variable]:
+                    if symbols and symbols[0] == earlier:
+                        substituted.extend((replacement + symbols[1:], ('sub', action, inner, len(replacement)))
+                                           for replacement, inner in variable_rules[earlier])
+                        self._check_size(substituted, 'left_recursion')
+                    else:
+                        substituted.append((symbols, action))
+                variable_rules[variable] = substituted
+            recursive = [(symbols[1:], action) for symbols, action in variable_rules[variable]
+                         if symbols and symbols[0] == variable and len(symbols) > 1]
+            if not recursive:
+                continue
+            bases = [(symbols, action) for symbols, action in variable_rules[variable]
+                     if not symbols or symbols[0] != variable]
+            tail = next(fresh)
+            variables.add(tail)
+            variable_rules[variable] = bases + [(symbols + (tail,), ('seed', action)) for symbols, action in bases]
+            variable_rules[tail] = ([(rest, ('tail', action, False)) for rest, action in recursive]
+                                    + [(rest + (tail,), ('tail', action, True)) for rest, action in recursive])
+        rules = [(variable, symbols, action) for variable, rules in variable_rules.items()
+                 for symbols, action in rules]
+        return self.start_variable, self._reachable(rules, variables)
+
+    def _left_factoring(self, fresh, variables):
+        variable_rules = defaultdict(list)
+        for variable, symbols, action in self.rules:
+            variable_rules[variable].append((symbols, action))
+        pending = list(variable_rules)
+        while pending:
+            variable = pending.pop()
+            groups = defaultdict(list)
+            for symbols, action in variable_rules[variable]:
+                groups[symbols[:1]].append((symbols, action))
+            for first, group in groups.items():
+                if not first or len(group) < 2:
+                    continue
+                prefix = len(min((symbols for symbols, _ in group), key=len))
+                while any(symbols[:prefix] != group[0][0][:prefix] for symbols, _ in group):
+                    prefix -= 1
+                rest = next(fresh)
+                variables.add(rest)
+                variable_rules[variable] = [rule for rule in variable_rules[variable] if rule[0][:1] != first]
+                variable_rules[variable].append((group[0][0][:prefix] + (rest,), ('join',)))
+                variable_rules[rest] = [(symbols[prefix:], ('part', action)) for symbols, action in group]
+                pending.append(rest)
+        return self.start_variable, [(variable, symbols, action) for variable, rules in variable_rules.items()
+                                     for symbols, action in rules]
+
+    def tree(self, leaf):
+        """
+        Turns the last DerivationNode of a leftmost derivation in grammar into the original
+        grammar's parse tree, a (variable, symbols, subtrees) tuple
+        """
+        forms = []
+        while leaf is not None:
+            forms.append(leaf.value)
+            leaf = leaf.parent
+        forms.reverse()
+        variables = self.variables
+        uses = []
+        for form, following in zip(forms, forms[1:]):
+            position = next(position for position, symbol in enumerate(form) if symbol in variables)
+            uses.append((form[position], following[position:len(following) - len(form) + position + 1]))
+        uses = iter(uses)
+
+        def frame():
+            variable, symbols = next(uses)
+            return self.actions[(variable, symbols)], symbols, []
+
+        stack = [frame()]
+        while True:
+            action, symbols, children = stack[-1]
+            while len(children) < len(symbols) and symbols[len(children)] not in variables:
+                children.append([symbols[len(children)]])
+            if len(children) < len(symbols):
+                stack.append(frame())
+                continue
+            stack.pop()
+            value = run_action(action, children)
+            if not stack:
+                return value[0]
+            stack[-1][2].append(value)
+
+
+class LanguageCounts():
+    """
+    Number of derivation trees of each length for every variable and rule of a grammar without
+    null rules and unit cycles, filled in as longer lengths are asked for. The trees of a length
+    are ranked, so the strings of that length can be listed or drawn at random by unranking
+    them, without searching. When strings may have several trees, they are listed by extending
+    prefixes the counts show can still be completed instead, and counted by listing them.
+
+    rules maps every variable to its symbol tuples, the other symbols being terminals.
+    accepts_null tells if the start variable derives λ, which the rules do not. unique is True
+    if every string has a single tree (the counts being the numbers of strings)
+    """
+    def __init__(self, start_variable, rules, accepts_null, unique):
+        self.start_variable = start_variable
+        self.rules = rules
+        self.accepts_null = accepts_null
+        self.unique = unique
+        self.length = 0
+        # counts[variable][length] are the trees of variable, suffixes[variable][r][i][length] the
+        # trees of the symbols of its r-th rule from the i-th one on
+        self.counts = {variable: [0] for variable in rules}
+        # strings_after[length] is the result of prefix_counts(length)
+        self.strings_after = {}
+        self.alphabet = sorted({symbol for productions in rules.values() for symbols in productions
+                                for symbol in symbols if symbol not in rules})
+        self.suffixes = {variable: [[[0] for _ in symbols] + [[1]] for symbols in productions]
+                         for variable, productions in rules.items()}
+        # Trees of a variable through a unit rule A -> B have B's length, so B is counted before A
+        units = {variable: [symbols[0] for symbols in productions if len(symbols) == 1 and symbols[0] in rules]
+                 for variable, productions in rules.items()}
+        self.order = []
+        placed = set()
+        for root in rules:
+            if root in placed:
+                continue
+            placed.add(root)
+            stack = [(root, iter(units[root]))]
+            while stack:
+                variable, targets = stack[-1]
+                target = next((target for target in targets if target not in placed), None)
+                if target is None:
+                    stack.pop()
+                    self.order.append(variable)
+                else:
+                    placed.add(target)
+                    stack.append((target, iter(units[target])))
+
+    @classmethod
+    def of_normal_form(cls, normal, unique=False):
+        """
+        Returns the LanguageCounts of a NormalForm past the epsilon and unit passes, unique
+        telling if the grammar is known to be unambiguous
+        """
+        rules = {normal.start_variable: []}
+        for variable, symbols, _ in normal.rules:
+            if symbols:
+                rules.setdefault(variable, []).append(symbols)
+        accepts_null = any(variable == normal.start_variable and not symbols for variable, symbols, _ in normal.rules)
+        return cls(normal.start_variable, rules, accepts_null, unique)
+
+    @classmethod
+    def of_automaton(cls, automaton):
+        """
+        Returns the LanguageCounts of a RegularAutomaton, whose states are the variables
+        """
+        rules = {}
+        symbols = sorted(automaton.alphabet, key=automaton.alphabet.get)
+        for state in range(automaton.size):
+            rules[state] = []
+            for column, symbol in enumerate(symbols):
+                target = automaton.table[state * automaton.width + column]
+                if target >= 0:
+                    rules[state].append((symbol, target))
+                    if automaton.accepting[target]:
+                        rules[state].append((symbol,))
+        if automaton.start < 0:
+            return cls(0, {0: []}, False, True)
+        return cls(automaton.start, rules, bool(automaton.accepting[automaton.start]), True)
+
+    def _count(self, symbol, length):
+        if symbol in self.counts:
+            return self.counts[symbol][length]
+        return int(length == 1)
+
+    def _ways(self, symbols, suffix, position, length):
+        # Each symbol derives at least one terminal
+        following = suffix[position + 1]
+        rest = len(symbols) - position - 1
+        if symbols[position] not in self.counts:
+            return following[length - 1] if length > rest else 0
+        total = 0
+        for part in range(1, length - rest + 1):
+            if following[length - part]:
+                total += self._count(symbols[position], part) * following[length - part]
+        return total
+
+    def extend(self, length):
+        """
+        Fills the counts in up to length
+        """
+        while self.length < length:
+            current = self.length + 1
+            # Whole rules first, their first symbol being shorter than them unless it is a unit rule
+            for variable in self.order:
+                total = 0
+                for symbols, suffix in zip(self.rules[variable], self.suffixes[variable]):
+                    ways = self._ways(symbols, suffix, 0, current)
+                    suffix[0].append(ways)
+                    total += ways
+                self.counts[variable].append(total)
+            for variable in self.order:
+                for symbols, suffix in zip(self.rules[variable], self.suffixes[variable]):
+                    for position in range(1, len(symbols)):
+                        suffix[position].append(self._ways(symbols, suffix, position, current))
+                    suffix[len(symbols)].append(0)
+            self.length = current
+
+    def count(self, length):
+        """
+        Returns the number of trees of the start variable deriving length terminals
+        """
+        if length == 0:
+            return int(self.accepts_null)
+        self.extend(length)
+        return self.counts[self.start_variable][length]
+
+    def unrank(self, length, index):
+        """
+        Returns the string of the index-th tree (from 0) of the ones deriving length terminals
+        """
+        output = []
+        pending = [(self.start_variable, length, index)] if length else []
+        while pending:
+            symbol, length, index = pending.pop()
+            if symbol not in self.rules:
+                output.append(symbol)
+                continue
+            for symbols, suffix in zip(self.rules[symbol], self.suffixes[symbol]):
+                if index < suffix[0][length]:
+                    break
+                index -= suffix[0][length]
+            # Trees of a rule are ranked by the tree of its first symbol, then the ones of the rest
+            parts = []
+            for position, part_symbol in enumerate(symbols):
+                following = suffix[position + 1]
+                rest = len(symbols) - position - 1
+                for part in range(1, length - rest + 1):
+                    block = self._count(part_symbol, part) * following[length - part]
+                    if index < block:
+                        break
+                    index -= block
+                parts.append((part_symbol, part, index // following[length - part]))
+                index %= following[length - part]
+                length -= part
+            pending.extend(reversed(parts))
+        return ''.join(output)
+
+    def completable(self, prefix, length):
+        """
+        Returns true if a tree derives a string of length terminals starting with the terminals
+        of prefix, in time polynomial in length
+        """
+        if len(prefix) > length:
+            return False
+        if length == 0:
+            return self.accepts_null
+        self.extend(length)
+        known = {}
+
+        def derives(symbol, start, size):
+            # symbol derives size terminals agreeing with prefix from start on, past it any do
+            if start >= len(prefix):
+                return self._count(symbol, size) > 0
+            if symbol not in self.rules:
+                return size == 1 and prefix[start] == symbol
+            key = (symbol, start, size)
+            if key not in known:
+                known[key] = any(follows(symbols, suffix, 0, start, size)
+                                 for symbols, suffix in zip(self.rules[symbol], self.suffixes[symbol]))
+            return known[key]
+
+        def follows(symbols, suffix, position, start, size):
+            if start >= len(prefix):
+                return suffix[position][size] > 0
+            if position == len(symbols):
+                return size == 0
+            key = (id(suffix), position, start, size)
+            if key not in known:
+                rest = len(symbols) - position - 1
+                known[key] = any(derives(symbols[position], start, part)
+                                 and follows(symbols, suffix, position + 1, start + part, size - part)
+                                 for part in range(1, size - rest + 1))
+            return known[key]
+
+        return derives(self.start_variable, 0, length)
+
+    def strings(self, length, budget=None):
+        """
+        Yields the strings of length terminals once each, in the order of their terminals, by
+        extending a prefix only with the terminals after which it can still be completed: each
+        string costs at most length * len(alphabet) completable() checks, however many trees it has
+
+        Raises BudgetExhausted if budget (a started SearchBudget) runs out, a step being a check
+        """
+        for terminals in self._sequences(length, budget):
+            yield ''.join(terminals)
+
+    def prefix_counts(self, length, budget=None):
+        """
+        Returns the number of strings of length terminals starting with each prefix they have,
+        keyed by the tuple of the prefix's terminals, () giving the number of strings. Unlike
+        trees, strings are not counted by the tables: they are listed by strings(), so this takes
+        time exponential in length for languages that grow exponentially. Kept for later calls
+
+        Raises BudgetExhausted if budget (a started SearchBudget) runs out
+        """
+        if length not in self.strings_after:
+            counts = defaultdict(int)
+            for terminals in self._sequences(length, budget):
+                for end in range(length + 1):
+                    counts[terminals[:end]] += 1
+            self.strings_after[length] = dict(counts)
+        return self.strings_after[length]
+
+    def _sequences(self, length, budget):
+        if not self.completable((), length):
+            return
+        if length == 0:
+            yield ()
+            return
+        prefix = []
+        choices = [iter(self.alphabet)]
+        while choices:
+            symbol = next(choices[-1], None)
+            if symbol is None:
+                choices.pop()
+                if prefix:
+                    prefix.pop()
+                continue
+            prefix.append(symbol)
+            if budget is not None:
+                budget.step(len(prefix))
+            if not self.completable(prefix, length):
+                prefix.pop()
+            elif len(prefix) == length:
+                yield tuple(prefix)
+                prefix.pop()
+            else:
+                choices.append(iter(self.alphabet))
+
+
+class BatchResult():
+    """
+    Outcome of one input of CFG.parse_many.
+
+    status is 'accepted', 'rejected', 'error' (error holds the message), 'timeout' or
+    'exhausted' (error holds the BudgetExhausted reason).
+    node is the last DerivationNode of accepted inputs when derivations were asked for, and
+    stats the engine's last_stats for the input
+    """
+    __slots__ = ('index', 'string', 'status', 'node', 'error', 'stats')
+
+    def __init__(self, index, string, status, node=None, error=None, stats=None):
+        self.index = index
+        self.string = string
+        self.status = status
+        self.node = node
+        self.error = error
+        self.stats = stats
+
+    @property
+    def accepted(self):
+        return self.status == 'accepted'
+
+    def __repr__(self):
+        return "BatchResult({!r}, {!r}, {!r})".format(self.index, self.string, self.status)
+
+
+def leo_item(memo, waiting, grammar, position, variable):
+    """
+    Returns Leo's deterministic reduction item for variable completed from position, None if
+    there is none: (the only item of that position waiting on variable, as its last symbol, and
+    the topmost item completed by following the chain of such items down to earlier positions).
+    Completing that topmost item alone does the work of completing the whole chain, which keeps
+    right recursion linear.
+
+    memo maps positions to {variable: item or None} and is filled in along the chain, waiting
+    maps positions to {variable: items waiting on it}: both positions must be fully processed.
+    A chain stops at a completed start rule from position 0, so acceptance is never hidden
+    """
+    path = []
+    above = None
+    while True:
+        known = memo.setdefault(position, {})
+        if variable in known:
+            # Also cuts cycles of unit rules, the chain being filled in is None until it is known
+            above = known[variable]
+            break
+        known[variable] = None
+        items = waiting[position].get(variable, ())
+        if len(items) != 1 or items[0][1] + 1 != len(grammar.rhs[items[0][0]]):
+            break
+        item = items[0]
+        path.append((position, variable, item))
+        position, variable = item[2], grammar.lhs[item[0]]
+        if variable == grammar.start and position == 0:
+            break
+    for position, variable, item in reversed(path):
+        advanced = (item[0], item[1] + 1, item[2])
+        above = memo[position][variable] = (item, above[1] if above is not None else advanced)
+    return above
+
+
+class StreamingRecognizer():
+    """
+    Recognizer reading its input symbol by symbol, see CFG.stream().
+
+    It runs Earley's algorithm without back pointers and without keeping the input: for every
+    position it only keeps the items waiting on a variable and its Leo items (see leo_item()),
+    and drops the positions no pending item can complete anymore. Only productive rules are
+    predicted, so any remaining item means the prefix read so far can still be completed.
+    Regular grammars run on their DFA instead
+    """
+    def __init__(self, grammar):
+        self.automaton = grammar.regular_automaton() if grammar.use_automaton else None
+        self.grammar = grammar.compile()
+        analysis = grammar.analyze()
+        compiled = self.grammar
+        productive = {compiled.codes[variable] for variable in analysis.productive}
+        self.nullable = {compiled.codes[variable] for variable in analysis.nullable}
+        self.variable_rules = [
+            [rule for rule in range(compiled.offsets[variable], compiled.offsets[variable + 1])
+             if all(symbol in productive or symbol >= compiled.variable_count for symbol in compiled.rhs[rule])]
+            if variable in productive else []
+            for variable in range(compiled.variable_count)
+        ]
+        self.position = 0
+        self.dead = False
+        if self.automaton is not None:
+            self.state = self.automaton.start
+            self.dead = self.state < 0
+            return
+        self.sets = {}
+        self.leo = {}
+        self.scanning = {}
+        self.accepting = False
+        self._retained = 1
+        start = compiled.start
+        self._close([(rule, 0, 0) for rule in self.variable_rules[start]] if start >= 0 else [])
+
+    def _close(self, items):
+        """
+        Completes and predicts the items of the set at the current position
+        """
+        compiled = self.grammar
+        lhs, rhs, variable_count = compiled.lhs, compiled.rhs, compiled.variable_count
+        k = self.position
+        waiting = defaultdict(list)
+        scanning = defaultdict(list)
+        predicted = set()
+        accepting = False
+        seen = set(items)
+        worklist = list(items)
+
+        def add(item):
+            if item not in seen:
+                seen.add(item)
+                worklist.append(item)
+
+        while worklist:
+            item = worklist.pop()
+            rule, dot, origin = item
+            symbols = rhs[rule]
+            if dot == len(symbols):
+                variable = lhs[rule]
+                if variable == compiled.start and origin == 0:
+                    accepting = True
+                top = leo_item(self.leo, self.sets, compiled, origin, variable) if origin < k else None
+                if top is not None:
+                    add(top[1])
+                    continue
+                source = waiting if origin == k else self.sets.get(origin, {})
+                for waiting_rule, waiting_dot, waiting_origin in list(source.get(variable, ())):
+                    add((waiting_rule, waiting_dot + 1, waiting_origin))
+                continue
+            symbol = symbols[dot]
+            if symbol < variable_count:
+                waiting[symbol].append(item)
+                if symbol not in predicted:
+                    predicted.add(symbol)
+                    for predicted_rule in self.variable_rules[symbol]:
+                        add((predicted_rule, 0, k))
+                if symbol in self.nullable:
+                    add((rule, dot + 1, origin))
+            else:
+                scanning[symbol].append(item)
+
+        self.sets[k] = dict(waiting)
+        self.scanning = dict(scanning)
+        self.accepting = accepting
+        self.dead = not accepting and not scanning
+        if len(self.sets) > 2 * self._retained + 64:
+            self._collect()
+
+    def _collect(self):
+        """
+        Drops the positions no pending item refers to anymore
+        """
+        live = {origin for items in self.scanning.values() for _, _, origin in items}
+        for position in sorted(self.sets, reverse=True):
+            if position in live:
+                live.update(origin for items in self.sets[position].values() for _, _, origin in items)
+        self.sets = {position: waiting for position, waiting in self.sets.items() if position in live}
+        self.leo = {position: items for position, items in self.leo.items() if position in live}
+        self._retained = len(self.sets)
+
+    def feed(self, symbols):
+        """
+        Reads the given symbols
+
+        Returns true if the prefix read so far can still be completed
+        """
+        codes = self.grammar.codes
+        for symbol in symbols:
+            if self.dead:
+                break
+            self.position += 1
+            if self.automaton is not None:
+                column = self.automaton.alphabet.get(symbol)
+                self.state = -1 if column is None else self.automaton.table[self.state * self.automaton.width + column]
+                self.dead = self.state < 0
+                continue
+            items = self.scanning.get(codes.get(symbol), ())
+            self._close([(rule, dot + 1, origin) for rule, dot, origin in items])
+        if self.dead and self.automaton is None:
+            self.sets = {}
+            self.leo = {}
+            self.scanning = {}
+        return not self.dead
+
+    def is_viable_prefix(self):
+        return not self.dead
+
+    def accepts(self):
+        """
+        Returns true if the input read so far is accepted by the grammar
+        """
+        if self.dead:
+            return False
+        if self.automaton is not None:
+            return bool(self.automaton.accepting[self.state])
+        return self.accepting
+
+    def snapshot(self):
+        """
+        Returns the recognizer's state, to be given back to restore()
+        """
+        if self.automaton is not None:
+            return self.position, self.dead, self.state
+        # Leo items of a position never change, the snapshot can share them
+        return self.position, self.dead, dict(self.sets), dict(self.leo), self.scanning, self.accepting, self._retained
+
+    def restore(self, snapshot):
+        if self.automaton is not None:
+            self.position, self.dead, self.state = snapshot
+        else:
+            self.position, self.dead, sets, leo, self.scanning, self.accepting, self._retained = snapshot
+            self.sets = dict(sets)
+            self.leo = dict(leo)
+
+
+class ParseForest():
+    """
+    Shared packed parse forest of every derivation of an accepted input, see CFG.parse_forest().
+
+    Nodes are (variable code, start, end) for a variable deriving input[start:end], and
+    (rule, dot, start, end) for the first dot symbols of a rule deriving it. families maps a
+    variable node to the rule nodes completing it, and a rule node to its (rule node one symbol
+    shorter, variable node or None for a terminal) splits; rule nodes with dot 0 are leaves.
+    A derivation picks one family at every node it uses, so the forest takes O(n³) space for
+    exponentially many derivations, or infinitely many when unit or null rules form a cycle
+    """
+    def __init__(self, grammar, root, families, derive):
+        self.grammar = grammar
+        self.root = root
+        self.families = families
+        self._derive = derive
+        unbounded = float('inf')
+
+        # Derivation counts, bottom up over the strongly connected components. Nodes on a cycle
+        # have infinitely many derivations, and so do the nodes above them
+        self.counts = {}
+        self.sizes = {}
+        self.ranking = {}
+        self.ranks = {}
+        for component in self._components():
+            cyclic = len(component) > 1 or component[0] in self._children(component[0])
+            for node in component:
+                self.counts[node] = unbounded if cyclic else self._combine(node, self.families[node], self.counts)
+                self.sizes[node] = unbounded
+            # Derivations are listed from every family of the node, except on a cycle, where the
+            # families staying in the component must lead to strictly smaller derivations (sizes
+            # counting nodes), which keeps the listing finite
+            changed = True
+            while changed:
+                changed = False
+                for node in component:
+                    size = self._size(node)
+                    if size < self.sizes[node]:
+                        self.sizes[node] = size
+                        changed = True
+            inside = set(component) if cyclic else set()
+            for node in sorted(component, key=self.sizes.get):
+                size = self.sizes[node]
+                if len(node) == 3:
+                    ranking = [item for item in self.families[node] if item not in inside or self.sizes[item] < size]
+                    ranking.sort(key=self.sizes.get)
+                else:
+                    ranking = [(left, right) for left, right in self.families[node]
+                               if (left not in inside or self.sizes[left] < size)
+                               and (right not in inside or self.sizes[right] < size)]
+                    ranking.sort(key=lambda family: self.sizes[family[0]] + self.sizes.get(family[1], 0))
+                self.ranking[node] = ranking
+                self.ranks[node] = self._combine(node, ranking, self.ranks)
+
+    def _children(self, node):
+        if len(node) == 3:
+            return self.families[node]
+        return [child for family in self.families[node] for child in family if child is not None]
+
+    def _components(self):
+        """
+        Returns the strongly connected components of the forest, children before their parents
+        """
+        index = {self.root: 0}
+        low = {self.root: 0}
+        stack = [self.root]
+        on_stack = {self.root}
+        components = []
+        work = [(self.root, iter(self._children(self.root)))]
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(self._children(child))))
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                low[work[-1][0]] = min(low[work[-1][0]], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+        return components
+
+    def _combine(self, node, families, values):
+        if len(node) == 3:
+            return sum(values[item] for item in families)
+        if node[1] == 0:
+            return 1
+        return sum(values[left] * (values[right] if right is not None else 1) for left, right in families)
+
+    def _size(self, node):
+        if len(node) == 3:
+            return 1 + min(self.sizes[item] for item in self.families[node])
+        if node[1] == 0:
+            return 1
+        return 1 + min(self.sizes[left] + (self.sizes[right] if right is not None else 0)
+                       for left, right in self.families[node])
+
+    def count(self):
+        """
+        Returns the number of leftmost derivations of the input, infinity if a cycle of unit or
+        null rules allows unboundedly long ones
+        """
+        return self.counts[self.root]
+
+    def is_ambiguous(self):
+        return self.count() > 1
+
+    def ambiguities(self):
+        """
+        Returns the spans derived in more than one way at their top level, as a list of
+        (variable, start, end, number of alternatives) sorted by span: the alternatives are the
+        rules of the variable matching input[start:end] and the ways of splitting it between
+        their symbols
+        """
+        splits = {}
+        items = sorted((node for node in self.families if len(node) == 4), key=lambda node: node[1])
+        for node in items:
+            splits[node] = 1 if node[1] == 0 else sum(splits[left] for left, _ in self.families[node])
+        ambiguous = []
+        for node, families in self.families.items():
+            if len(node) == 3:
+                alternatives = sum(splits[item] for item in families)
+                if alternatives > 1:
+                    ambiguous.append((self.grammar.symbols[node[0]], node[1], node[2], alternatives))
+        ambiguous.sort(key=lambda span: (span[1], -span[2], span[0]))
+        return ambiguous
+
+    def tree(self, rank=0):
+        """
+        Returns the rank-th listed derivation as a (variable, symbols, subtrees) parse tree
+        """
+        productions = self.grammar.productions
+
+        def expand(node, rank):
+            for item in self.ranking[node]:
+                if rank < self.ranks[item]:
+                    break
+                rank -= self.ranks[item]
+            children = []
+            while item[1] > 0:
+                for left, right in self.ranking[item]:
+                    weight = self.ranks[left] * (self.ranks[right] if right is not None else 1)
+                    if rank < weight:
+                        break
+                    rank -= weight
+                if right is not None:
+                    rank, right_rank = divmod(rank, self.ranks[right])
+                    children.append((right, right_rank))
+                item = left
+            children.reverse()
+            return item[0], children
+
+        if not 0 <= rank < self.ranks[self.root]:
+            raise IndexError("Derivation rank out of range")
+        tree = [None, None, []]
+        stack = [(self.root, rank, tree)]
+        while stack:
+            node, rank, target = stack.pop()
+            rule, children = expand(node, rank)
+            target[0], target[1] = productions[rule]
+            for child, child_rank in children:
+                subtree = [None, None, []]
+                target[2].append(subtree)
+                stack.append((child, child_rank, subtree))
+        return tree
+
+    def derivations(self, k=None):
+        """
+        Lazily yields the last DerivationNode of the first k listed leftmost derivations (all of
+        them if k is None), preferring the smaller alternative at every node. With cycles of
+        unit or null rules only the derivations not going around a cycle are listed
+        """
+        total = self.ranks[self.root]
+        for rank in range(total if k is None else min(k, total)):
+            yield self._derive(self.tree(rank))
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+def memory_in_use():
+    """
+    Returns the bytes of memory used by the process (traced by tracemalloc where /proc is not
+    available), None if it cannot be read
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return None
+
+
+class CancellationToken():
+    """
+    Flag checked by the parses given it in their SearchBudget: cancel(), called from any thread,
+    makes them raise BudgetExhausted
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised by a parse running out of its SearchBudget before it could accept or reject its input.
+
+    reason is 'expanded', 'frontier', 'deadline', 'memory' or 'cancelled'
+    """
+    def __init__(self, reason, expanded, frontier, elapsed):
+        super().__init__("Search budget exhausted ({}) after {} steps in {:.3f}s".format(reason, expanded, elapsed))
+        self.reason = reason
+        self.expanded = expanded
+        self.frontier = frontier
+        self.elapsed = elapsed
+
+
+class SearchBudget():
+    """
+    Limits of a parse, given to an engine's budget argument or set as CFG.budget for all of them.
+
+    max_expanded: steps the engine may take (forms expanded, chart items or descriptors processed)
+    max_frontier: size the engine's queue, stack or pending work may reach
+    deadline: seconds the parse may run
+    max_memory: bytes of memory the process may use, see memory_in_use()
+    token: CancellationToken
+    progress: function called with (steps taken, frontier size, seconds elapsed), from the thread
+        running the parse
+
+    The token, the deadline and the memory are checked, and progress called, every
+    check_interval steps. Every parse counts on its own copy, made by start()
+    """
+    __slots__ = ('max_expanded', 'max_frontier', 'deadline', 'max_memory', 'token', 'check_interval', 'progress',
+                 'expanded', '_started', '_ends', '_countdown')
+
+    def __init__(self, max_expanded=None, max_frontier=None, deadline=None, max_memory=None, token=None,
+                 check_interval=256, progress=None):
+        self.max_expanded = max_expanded
+        self.max_frontier = max_frontier
+        self.deadline = deadline
+        self.max_memory = max_memory
+        self.token = token
+        self.check_interval = check_interval
+        self.progress = progress
+        self.expanded = 0
+        self._started = None
+        self._ends = None
+        self._countdown = check_interval
+
+    def start(self):
+        """
+        Returns a copy of the budget counting from now
+        """
+        budget = SearchBudget(self.max_expanded, self.max_frontier, self.deadline, self.max_memory, self.token,
+                              self.check_interval, self.progress)
+        budget._started = time.monotonic()
+        if self.deadline is not None:
+            budget._ends = budget._started + self.deadline
+        return budget
+
+    def step(self, frontier=0):
+        """
+        Counts a step of the engine, whose pending work has the given size
+
+        Raises BudgetExhausted when a limit is passed
+        """
+        self.expanded += 1
+        if self.max_expanded is not None and self.expanded > self.max_expanded:
+            self._exhausted('expanded', frontier)
+        if self.max_frontier is not None and frontier > self.max_frontier:
+            self._exhausted('frontier', frontier)
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._countdown = self.check_interval
+            if self.progress is not None:
+                self.progress(self.expanded, frontier, time.monotonic() - self._started)
+            if self.token is not None and self.token.cancelled:
+                self._exhausted('cancelled', frontier)
+            if self._ends is not None and time.monotonic() > self._ends:
+                self._exhausted('deadline', frontier)
+            if self.max_memory is not None and (memory_in_use() or 0) > self.max_memory:
+                self._exhausted('memory', frontier)
+
+    def _exhausted(self, reason, frontier):
+        raise BudgetExhausted(reason, self.expanded, frontier, time.monotonic() - self._started)
+
+
+class ParseCache():
+    """
+    Bounded cache of parse results, set as CFG.result_cache, evicting the least recently used.
+
+    Results are keyed by the grammar's fingerprint, the engine, the settings changing how it
+    parses and the input, so grammars can share a cache and a changed grammar never gets the
+    results of its old rules. A result keeps the verdict and the rules of the leftmost
+    derivation, its forms being rebuilt on a hit. At most max_entries results are kept, and about
+    max_bytes of inputs and rules if it is given
+    """
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Copies sent to other processes start empty
+        return {'max_entries': self.max_entries, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, key):
+        """
+        Returns the (accepted, derivation rules) result saved under key, None if there is none
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, accepted, rules):
+        size = sys.getsizeof(key[-1]) + sys.getsizeof(rules)
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self.entries[key] = ((accepted, rules), size)
+            self.bytes += size
+            while self.entries and (len(self.entries) > self.max_entries
+                                    or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self.bytes -= self.entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the cache's counters: hits, misses, evictions, entries and bytes
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.bytes}
+
+
+def instrumented(engine):
+    """
+    Decorates CFG's parse method of the given engine so every call leaves its statistics in
+    last_stats: the engine's counters, the time spent preparing the grammar's tables and
+    searching, and with trace_memory the memory allocated while parsing
+    """
+    def decorate(parse):
+        @functools.wraps(parse)
+        def wrapper(self, *args, **kwargs):
+            return self._run_instrumented(engine, parse, args, kwargs)
+        return wrapper
+    return decorate
+
+
+class GrammarCacheError(ValueError):
+    pass
+
+
+def read_grammar_cache(path, fingerprint=None):
+    """
+    Returns the state saved in a cache file by CFG.save_cache(), unpickled straight from the
+    memory-mapped file
+
+    Raises GrammarCacheError if the file is not a cache file of this version, is corrupt or, given
+    a fingerprint, holds another grammar, and OSError if it cannot be read
+    """
+    with open(path, 'rb') as cache:
+        if os.fstat(cache.fileno()).st_size < CACHE_HEADER.size:
+            raise GrammarCacheError("Truncated grammar cache '{}'".format(path))
+        with mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, stored, checksum, length = CACHE_HEADER.unpack_from(mapped)
+            if magic != CACHE_MAGIC:
+                raise GrammarCacheError("'{}' is not a grammar cache".format(path))
+            if version != CACHE_VERSION:
+                raise GrammarCacheError("Grammar cache '{}' has version {}, expected {}".format(
+                    path, version, CACHE_VERSION))
+            if fingerprint is not None and stored != fingerprint:
+                raise GrammarCacheError("Grammar cache '{}' holds another grammar".format(path))
+            payload = memoryview(mapped)[CACHE_HEADER.size:]
+            try:
+                if len(payload) != length or zlib.crc32(payload) != checksum:
+                    raise GrammarCacheError("Corrupt grammar cache '{}'".format(path))
+                # The collector would walk the heap over and over while the tables' objects are made
+                collecting = gc.isenabled()
+                gc.disable()
+                try:
+                    return pickle.loads(payload)
+                except Exception as e:
+                    raise GrammarCacheError("Unreadable grammar cache '{}': {}".format(path, e)) from e
+                finally:
+                    if collecting:
+                        gc.enable()
+            finally:
+                payload.release()
+
+
+class CFG(object):
+    """
+    Context free grammar (CFG) class
+
+    """
+    
+            
+    
+    def __init__(self,
+                 variables=None,
+                 terminals=None,
+                 rules=None,
+                 start_variable='S',
+                 null_character='λ'
+                 ):
+        
+        """
+        Initialize method
+
+        Parameters
+            variables (optional): grammar's variables set.
+            terminals: grammar's terminals set
+            rules:  grammar's rules
+            start_variable (optional, defaults to 'S'): grammar's start variable
+            null_character (optional, defaults to 'λ'): grammar's null character
+        """
+
+        if variables is None:
+            variables = set()
+        elif hasattr(variables, '__iter__'):
+            variables = {*variables}
+        else:
+            raise TypeError(
+                "CFG variables must be a iterable, not {}".format(type(variables).__name__)
+            )
+
+        if isinstance(rules, dict):
+            variables |= {*rules}
+            rules = {
+                (var, var_rule)
+                for var, var_rules in rules.items()
+                for var_rule in var_rules
+            }
+        elif hasattr(rules, '__iter__'):
+            rules = {*rules}
+        else:
+            raise TypeError(
+                "CFG rules must be a collection or a dict, not {}".format(type(rules).__name__)
+            )
+
+        if isinstance(terminals, set):
+            terminals = terminals
+        elif hasattr(terminals, '__iter__'):
+            terminals = {*terminals}
+        else:
+            raise TypeError(
+                "CFG variables must be a iterable, not {}".format(type(variables).__name__)
+            )
+
+        self.variables = variables
+        self.terminals = terminals
+        self.start_variable = start_variable
+        self.null_character = null_character
+        self._rules = rules
+        self._drop_tables()
+        self.rulesNodes = {}
+        self._reset_settings()
+
+    def _drop_tables(self):
+        """
+        Forgets everything computed from the grammar's rules, built again when next used
+        """
+        self._is_chamsky = None
+        self._cnf = None
+        self._fingerprint = None
+        self._normal_forms = {}
+        self._language_counts = {}
+        self._ll1 = None
+        self._lalr = None
+        self._automaton = None
+        self._compiled = None
+        self._search_facts = None
+        self.analysis = None
+        self.accepts_null = None
+
+    def _reset_settings(self):
+        self.result_cache = None
+        self.last_stats = {}
+        self.use_automaton = True
+        self.use_normal_form = True
+        self.budget = None
+        self.trace_hook = None
+        self.trace_memory = False
+        self.index=0
+        self.stack=[]
+        self.table = PrettyTable(["Input String", "Stack","Action"])
+
+    def __getstate__(self):
+        # The LL1 trace table does not pickle, copies start with an empty one
+        state = self.__dict__.copy()
+        del state['table']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.table = PrettyTable(["Input String", "Stack","Action"])
+        
+
+    @property
+    def variables(self):
+        """
+        Grammar's variables set property getter
+        """
+        return self._variables
+
+    @variables.setter
+    def variables(self, new_variables):
+        """
+        Grammar's variables set property setter
+        """
+        if type(new_variables) is not set:
+            raise TypeError("CFG variables must be a set, not '{}'".format(type(new_variables).__name__))
+
+        for variable in new_variables:
+            if type(variable) is not str:
+                raise TypeError("CFG variables must be strings, not '{}'".format(type(variable).__name__))
+
+        for variable in new_variables:
+            if string_contains_space(variable):
+                raise ValueError("Variables cannot contain white spaces : '{}'".format(variable))
+
+        contained_pair = find_contained_pair(new_variables)
+        if contained_pair is not None:
+            raise ValueError("Variables cannot contain each other, '{}' contains '{}'".format(*contained_pair))
+
+        self._variables = frozenset(new_variables)
+        self._drop_tables()
+
+    @property
+    def terminals(self):
+        """
+        Grammar's terminals set property getter
+        """
+        return self._terminals
+
+    @terminals.setter
+    def terminals(self, new_terminals):
+        """
+        Grammar's terminals set property setter
+        """
+        if type(new_terminals) is not set:
+            raise TypeError("CFG terminals must be a set, not '{}'".format(type(new_terminals).__name__))
+
+        for terminal in new_terminals:
+            if type(terminal) is not str:
+                raise TypeError("CFG terminals must be strings, not '{}'".format(type(terminal).__name__))
+
+        for terminal in new_terminals:
+            if string_contains_space(terminal):
+                raise ValueError("Variables cannot contain white spaces : '{}'".format(terminal))
+
+        contained_pair = find_contained_pair(new_terminals)
+        if contained_pair is not None:
+            raise ValueError("Terminals cannot contain each other, '{}' contains '{}'".format(*contained_pair))
+
+        self._terminals = frozenset(new_terminals)
+        self._drop_tables()
+
+    
+    def rulesNodePrep(self):
+        """
+        Rebuilds rulesNodes, one RuleNode per variable holding its productions as lists of symbols
+        """
+        self.rulesNodes = {}
+        rows = defaultdict(list)
+        for rule in sorted(self._rules):
+            rows[rule[0]].append(rule[1])
+        for variable, productions in rows.items():
+            self.rulesNodes[variable] = self._rule_node(variable, productions)
+
+    def _rule_node(self, variable, productions):
+        """
+        Returns the RuleNode of a variable's sorted productions
+        """
+        v = RuleNode(NodeName=variable, NodeVars=[], NodeString=[])
+        for production in productions:
+            string = []
+            Variables = []
+            for s in production:
+                string.append(s)
+                if s in self.variables:
+                    Variables.append(s)
+                elif s == self.null_character:
+                    v.CanBeNull = True
+            if variable in Variables:
+                v.CanRepeat = True
+            v.NodeString.append(string)
+            v.NodeVars.append(Variables)
+        return v
+
+    def rules(self,str):
+        """
+        Grammar's rules property setter
+
+        """
+        # if type(new_rules) is not set:
+        #     raise TypeError("CFG rules must be a set, not '{}'".format(type(new_rules).__name__))
+
+        # for rule in new_rules:
+        #     if type(rule) is not tuple:
+        #         raise TypeError("CFG rules must be 2-tuples, not '{}'".format(type(rule).__name__))
+        #     if len(rule) != 2:
+        #         raise TypeError("CFG rules must be 2-tuples")
+        #     if type(rule[0]) is not str or type(rule[1]) is not str:
+        #         raise TypeError("CFG rules must contain strings")
+        #     if string_contains_space(rule[0]) or string_contains_space(rule[1]):
+        #         raise ValueError("Rule cannot contain white spaces : '{} -> {}'".format(*rule))
+
+        # pattern = re.compile('({})+'.format('|'.join(re_escaped(self.variables | self.terminals))))
+        # print(f"the rule pattern : {pattern}")
+        # print(f"rule : {rule}")
+        # for rule in new_rules:
+        #     if rule[0] not in self.variables:
+        #         raise ValueError("Unknown Variable '{p0}' in '{p0} -> {p1}'".format(
+        #             p0=rule[0],
+        #             p1=rule[1]
+        #         ))
+        #     if not pattern.fullmatch(rule[1]):
+        #         raise ValueError("Rule must contain combination of variables and terminals : '{} -> {}'".format(*rule))
+        #     if rule[1].count(self.null_character) and rule[1] != self.null_character:
+        #         raise ValueError("Rule cannot combine null character with variables and terminals : '{} -> {}'".format(
+        #             *rule))
+        # print(f"new rules: {new_rules}")
+        if self._compiled is not None and self._compiled.rules == self._rules and self.rulesNodes:
+            return
+        self.rulesNodePrep()
+        self.rulesNodes = dict(reversed(list(self.rulesNodes.items())))
+                    
+        self._drop_tables()
+        if (self.start_variable, self.null_character) in self._rules:
+            self.accepts_null = True
+        self.analyze()
+        self.regular_automaton()
+
+    def compile(self):
+        """
+        Returns grammar's CompiledGrammar, built only once until the grammar is changed
+        """
+        if self._compiled is None:
+            productions = (
+                (variable, tuple(symbol for symbol in production if not self._is_null_symbol(symbol)))
+                for variable, production in sorted(self._rules)
+            )
+            self._compiled = CompiledGrammar(self._rules, list(dict.fromkeys(productions)),
+                                             self.variables, self.start_variable)
+        return self._compiled
+
+    def analyze(self):
+        """
+        Returns grammar's GrammarAnalysis, computing it only once until the grammar is changed
+        """
+        grammar = self.compile()
+        if self.analysis is None:
+            self.analysis = GrammarAnalysis(grammar.productions, self.variables, self.start_variable)
+        return self.analysis
+
+    def search_facts(self):
+        """
+        Returns the SearchFacts BFS and DFS prune with, built only once until the grammar is changed
+        """
+        if self._search_facts is None:
+            self._search_facts = SearchFacts(self.compile(), self.analyze())
+        return self._search_facts
+
+    def add_rule(self, variable, production):
+        """
+        Adds the rule variable -> production to the grammar, a new variable being added to the
+        variables. A prepared grammar is updated in place, see replace_rules()
+
+        Raises TypeError or ValueError if the rule is not made of the grammar's symbols
+        """
+        self._check_rule(variable, production)
+        self._edit_rules({(variable, production)}, set())
+
+    def addrule(self, left, right):
+        self.add_rule(left, right)
+
+    def remove_rule(self, variable, production):
+        """
+        Removes the rule variable -> production from the grammar. A prepared grammar is updated
+        in place, see replace_rules()
+
+        Raises ValueError if the grammar has no such rule
+        """
+        if (variable, production) not in self._rules:
+            raise ValueError("Unknown rule '{} -> {}'".format(variable, production))
+        self._edit_rules(set(), {(variable, production)})
+
+    def replace_rules(self, variable, productions):
+        """
+        Makes productions (strings) the rules of variable, in place of its current ones.
+
+        A prepared grammar (see rules()) stays prepared without being built again: the rows of
+        rulesNodes and of the compiled grammar are rebuilt for variable only, and the analysis
+        (nullable variables, FIRST sets, shortest lengths) only for the variables that can reach
+        it. The tables built from the whole grammar (LL(1) and LALR tables, DFA, normal forms) are
+        built again when next used
+
+        Raises TypeError or ValueError if a rule is not made of the grammar's symbols
+        """
+        productions = set(productions)
+        for production in productions:
+            self._check_rule(variable, production)
+        current = {rule for rule in self._rules if rule[0] == variable}
+        new = {(variable, production) for production in productions}
+        self._edit_rules(new - current, current - new)
+
+    def _check_rule(self, variable, production):
+        if type(variable) is not str or type(production) is not str:
+            raise TypeError("CFG rules must contain strings")
+        if string_contains_space(variable) or string_contains_space(production):
+            raise ValueError("Rule cannot contain white spaces : '{} -> {}'".format(variable, production))
+        if variable not in self.variables:
+            if not variable or variable in self.terminals:
+                raise ValueError("Unknown Variable '{p0}' in '{p0} -> {p1}'".format(p0=variable, p1=production))
+            for other in self.variables:
+                contained, including, included = strings_contain_each_other(variable, other)
+                if contained:
+                    raise ValueError("Variables cannot contain each other, '{}' contains '{}'".format(including, included))
+        pattern = re.compile('({})+'.format('|'.join(re_escaped(self.variables | self.terminals | {variable}))))
+        if not pattern.fullmatch(production):
+            raise ValueError("Rule must contain combination of variables and terminals : '{} -> {}'".format(
+                variable, production))
+        if production.count(self.null_character) and production != self.null_character:
+            raise ValueError("Rule cannot combine null character with variables and terminals : '{} -> {}'".format(
+                variable, production))
+
+    def _edit_rules(self, added, removed):
+        added = {rule for rule in added if rule not in self._rules}
+        removed = {rule for rule in removed if rule in self._rules}
+        if not added and not removed:
+            return
+        changed = {variable for variable, _ in added | removed}
+        prepared = self._compiled is not None and self.analysis is not None and bool(self.rulesNodes)
+        compiled, analysis = self._compiled, self.analysis
+        if type(self._rules) is not set:
+            self._rules = set(self._rules)
+        self._rules -= removed
+        self._rules |= added
+        self._variables = self._variables | {variable for variable, _ in added}
+        self._drop_tables()
+        if (self.start_variable, self.null_character) in self._rules:
+            self.accepts_null = True
+        if not prepared:
+            return
+
+        rows = {variable: [] for variable in changed}
+        for rule in self._rules:
+            if rule[0] in rows:
+                rows[rule[0]].append(rule[1])
+        for variable, productions in rows.items():
+            productions.sort()
+            if productions:
+                self.rulesNodes[variable] = self._rule_node(variable, productions)
+            else:
+                self.rulesNodes.pop(variable, None)
+        self.rulesNodes = {variable: self.rulesNodes[variable] for variable in sorted(self.rulesNodes, reverse=True)}
+        compiled_rows = {
+            variable: list(dict.fromkeys(
+                (variable, tuple(symbol for symbol in production if not self._is_null_symbol(symbol)))
+                for production in productions))
+            for variable, productions in rows.items()
+        }
+        self._compiled = compiled.with_rows(self._rules, compiled_rows)
+        self.analysis = GrammarAnalysis(self.compile().productions, self.variables, self.start_variable,
+                                        analysis, changed)
+    @property
+    def start_variable(self):
+        """
+        Grammar's start_variable property getter
+        """
+        return self._start_variable
+
+    @start_variable.setter
+    def start_variable(self, new_start_variable):
+        """
+        Grammar's start_variable property setter
+        """
+        if type(new_start_variable) is not str:
+            raise TypeError("CFG start variable must be string, not '{}'".format(type(new_start_variable).__name__))
+
+        if new_start_variable not in self.variables:
+            raise ValueError("Start variable must be in variables set")
+
+        self._start_variable = new_start_variable
+        self._drop_tables()
+
+    @property
+    def null_character(self):
+        """
+        Grammar's null_character property getter
+        """
+        return self._null_character
+
+    @null_character.setter
+    def null_character(self, new_null_character):
+        """
+        Grammar's null_character property setter
+        """
+        if type(new_null_character) is not str:
+            raise TypeError("CFG null character must be string, not '{}'".format(type(new_null_character).__name__))
+
+        if new_null_character not in self.terminals:
+            raise ValueError("Null character must be in terminals set")
+
+        self._null_character = new_null_character
+        self._drop_tables()
+    
+    @instrumented('DFS')
+    def DFS(self, input_string, node=None, nodestr=None, failure_cache_size=100000, budget=None):
+        """
+        Depth first search for a leftmost derivation of input_string from nodestr (defaults to the
+        start variable), chained under the given parent node.
+
+        The search runs on an explicit stack with iterative deepening on the number of derivation
+        steps, the limit at least doubling every pass, so the derivation found is at most twice
+        as long as a shortest one. Forms are kept as their prefix of input_string and the rest,
+        like in BFS, and the ones proven not to derive input_string within some number of steps
+        are kept in a bounded failure cache shared by all the passes.
+
+        From the start variable, grammars the normalization passes change are searched in their
+        normal_form() unless use_normal_form is false, the derivation being shown with the
+        grammar's own rules.
+
+        Raises BudgetExhausted if budget (a SearchBudget, defaults to self.budget) runs out
+
+        Returns (True, last DerivationNode of the derivation) if accepted, (False, None) otherwise
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        automaton = self.regular_automaton() if self.use_automaton else None
+        if automaton and node is None and nodestr in (None, self.start_variable):
+            return self._automaton_parse(input_string, automaton)
+        normal = None
+        if node is None and nodestr in (None, self.start_variable):
+            normal = self._searched_normal_form(SEARCH_NORMAL_FORM)
+        if normal:
+            return self._search_normal_form('DFS', normal, input_string, budget,
+                                            failure_cache_size=failure_cache_size)
+        if nodestr is None:
+            nodestr = self.start_variable
+        facts = self.search_facts()
+        budget = self._start_budget(budget)
+        failures = OrderedDict()
+        self.last_stats.update(failure_cache_hits=0, depth=0)
+        if nodestr == input_string:
+            return True, DerivationNode(nodestr, node)
+        target, form = facts.grammar.encode(input_string), facts.grammar.encode(nodestr)
+        if target is None or form is None:
+            return False, None
+        target, form = ''.join(map(chr, target)), ''.join(map(chr, form))
+        limit = 0
+        while limit != float('inf'):
+            self.last_stats['depth'] = limit
+            if self.trace_hook is not None:
+                self.trace_hook('DFS', 'deepen', limit)
+            leaf, needed = self._depth_limited_search(input_string, target, node, nodestr, form, limit, facts,
+                                                      failures, failure_cache_size, budget)
+            if leaf is not None:
+                return True, leaf
+            # Past the bound every failed form needs, the limit at least doubles, so a pass finds a
+            # derivation at most twice as long as a shortest one
+            limit = max(needed, 2 * limit)
+        return False, None
+
+    def _depth_limited_search(self, input_string, target, parent, nodestr, form, limit, facts, failures,
+                              failure_cache_size, budget):
+        """
+        One pass of DFS allowing derivations of at most limit steps, from nodestr whose symbol
+        numbers are form, the input being encoded in target (see SearchFacts)
+
+        Forms are kept as the length of their prefix of the input and their interned rest. A form
+        is cut as soon as the steps taken plus a lower bound of the steps it still needs (the
+        shortest derivations of its variables, and the terminals left to produce) exceed the limit.
+        failures maps forms to a number of steps they cannot derive the input in, infinity when
+        their whole subtree was searched. A form repeating one of its ancestors is skipped, and
+        the failure of a form whose subtree skipped one of its own ancestors is not cached since
+        it depends on the path.
+
+        Returns (last DerivationNode or None, the limit the next pass needs, infinity if none)
+        """
+        unbounded = float('inf')
+        stats = self.last_stats
+        pruned = stats['pruned']
+        trace = self.trace_hook
+        most_terminals = facts.most_terminals
+        rules = facts.rules
+
+        def check(state, depth, steps, terminals):
+            """
+            Returns None if the form has to be searched, (True, depth of the ancestor it repeats)
+            for a form on the current path, and (False, limit it needs) for a form failing in this pass
+            """
+            if state in on_path:
+                pruned['cycle'] = pruned.get('cycle', 0) + 1
+                return True, on_path[state]
+            known = failures.get(state)
+            if known is not None and known >= limit - depth:
+                stats['failure_cache_hits'] += 1
+                pruned['failure_cache'] = pruned.get('failure_cache', 0) + 1
+                failures.move_to_end(state)
+                return False, depth + known + 1
+            if most_terminals:
+                steps = max(steps, -((state[0] + terminals - len(target)) // most_terminals))
+            if depth + steps > limit:
+                pruned['depth_bound'] = pruned.get('depth_bound', 0) + 1
+                return False, depth + steps
+            return None
+
+        def derivation():
+            node = parent
+            for entry in stack:
+                offset, rest = entry[0]
+                node = DerivationNode(input_string[:offset] + facts.decode(rest), node)
+            return DerivationNode(input_string, node)
+
+        length, steps, terminals = facts.measure(form)
+        reason, skip = facts.check(form, target, 0, length)
+        if reason is not None:
+            pruned[reason] = pruned.get(reason, 0) + 1
+            if trace is not None:
+                trace('DFS', 'prune', (nodestr, reason))
+            return None, unbounded
+        state = (skip, sys.intern(form[skip:]))
+        on_path = {}
+        checked = check(state, 0, steps, terminals - skip)
+        if checked is not None:
+            return None, checked[1]
+
+        on_path[state] = 0
+        # Frame: [form, rules left, depth, limit needed below, lowest ancestor depth repeated below,
+        # and the measure of the form's rest]. Derivation nodes are only built for the path of an
+        # accepted string
+        stack = [[state, iter(rules[ord(state[1][0])]), 0, unbounded, unbounded, length - skip, steps, terminals - skip]]
+        stats['expanded'] += 1
+        needed = unbounded
+        while stack:
+            frame = stack[-1]
+            rule = next(frame[1], None)
+            if rule is not None:
+                (offset, rest), depth = frame[0], frame[2]
+                reason, offset, rest, length, steps, terminals = facts.expand(rest, target, offset, *frame[5:], rule)
+                if reason is not None:
+                    pruned[reason] = pruned.get(reason, 0) + 1
+                    if trace is not None:
+                        form = facts.decode(facts.texts[rule] + frame[0][1][1:])
+                        trace('DFS', 'prune', (input_string[:frame[0][0]] + form, reason))
+                    continue
+                if not rest:
+                    return derivation(), limit
+                state = (offset, sys.intern(rest))
+                checked = check(state, depth + 1, steps, terminals)
+                if checked is None:
+                    on_path[state] = depth + 1
+                    stack.append([state, iter(rules[ord(rest[0])]), depth + 1, unbounded, unbounded,
+                                  length, steps, terminals])
+                    stats['expanded'] += 1
+                    if len(stack) > stats['peak_frontier']:
+                        stats['peak_frontier'] = len(stack)
+                    if trace is not None:
+                        trace('DFS', 'expand', (input_string[:offset] + facts.decode(rest), depth + 1))
+                    if budget is not None:
+                        budget.step(len(stack))
+                elif checked[0]:
+                    frame[4] = min(frame[4], checked[1])
+                else:
+                    frame[3] = min(frame[3], checked[1])
+                continue
+
+            stack.pop()
+            state, _, depth, frame_needed, low = frame[:5]
+            del on_path[state]
+            if low >= depth:
+                known = failures.get(state, -1)
+                failures[state] = max(known, frame_needed - depth - 1)
+                failures.move_to_end(state)
+                if len(failures) > failure_cache_size:
+                    failures.popitem(last=False)
+            if stack:
+                stack[-1][3] = min(stack[-1][3], frame_needed)
+                if low < depth:
+                    stack[-1][4] = min(stack[-1][4], low)
+            else:
+                needed = frame_needed
+        return None, needed
+
+
+    @instrumented('BFS')
+    def BFS(self, input_string, budget=None):
+        """
+        Breadth first search for a leftmost derivation of input_string, pruning the sentential
+        forms that cannot derive it and the ones already queued.
+
+        Grammars the normalization passes change are searched in their normal_form() unless
+        use_normal_form is false, the derivation being shown with the grammar's own rules.
+
+        Raises BudgetExhausted if budget (a SearchBudget, defaults to self.budget) runs out
+
+        Returns (True, last DerivationNode of a shortest derivation of the grammar searched) if
+        accepted, (False, None) otherwise
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        automaton = self.regular_automaton() if self.use_automaton else None
+        if automaton:
+            return self._automaton_parse(input_string, automaton)
+        normal = self._searched_normal_form(SEARCH_NORMAL_FORM)
+        if normal:
+            return self._search_normal_form('BFS', normal, input_string, budget)
+        facts = self.search_facts()
+        grammar = facts.grammar
+        budget = self._start_budget(budget)
+        target = grammar.encode(input_string)
+        if target is None or grammar.start < 0:
+            return False, None
+        target = ''.join(map(chr, target))
+        # Forms are kept as in SearchFacts, with the measure of their rest. Every form is queued
+        # once, keeping the record it was first found from
+        records = DerivationRecords()
+        queue = deque()
+        seen = defaultdict(set)
+        duplicates = 0
+        expanded = 0
+        peak = 0
+        stats = self.last_stats
+        pruned = stats['pruned']
+        trace = self.trace_hook
+        start = chr(grammar.start)
+        length, steps, terminals = facts.measure(start)
+        if facts.check(start, target, 0, length)[0] is None:
+            seen[0].add(start)
+            queue.append((records.append(-1, 0, -1, 1), 0, start, length, steps, terminals))
+        try:
+            while queue:
+                if len(queue) > peak:
+                    peak = len(queue)
+                index, offset, rest, length, steps, terminals = queue.popleft()
+
+                if not rest:
+                    return True, records.derivation(index, self.start_variable, grammar.productions)
+
+                expanded += 1
+                if trace is not None:
+                    trace('BFS', 'expand', input_string[:offset] + facts.decode(rest))
+                if budget is not None:
+                    budget.step(len(queue))
+                for rule in facts.rules[ord(rest[0])]:
+                    reason, new_offset, new_rest, new_length, new_steps, new_terminals = facts.expand(
+                        rest, target, offset, length, steps, terminals, rule)
+                    if reason is not None:
+                        pruned[reason] = pruned.get(reason, 0) + 1
+                        continue
+                    new_rest = sys.intern(new_rest)
+                    if new_rest in seen[new_offset]:
+                        duplicates += 1
+                        continue
+                    seen[new_offset].add(new_rest)
+                    queue.append((records.append(index, offset, rule, new_offset + len(new_rest)), new_offset, new_rest,
+                                  new_length, new_steps, new_terminals))
+        finally:
+            stats.update(expanded=expanded, duplicates_suppressed=duplicates, peak_frontier=peak)
+        return False, None
+
+    def _start_budget(self, budget):
+        """
+        Returns a started copy of budget, or of the grammar's default budget, None if there is none
+        """
+        budget = budget if budget is not None else self.budget
+        return budget.start() if budget is not None else None
+
+    def _is_null_symbol(self, symbol):
+        return symbol == self.null_character or symbol in NULL_CHARACTERS
+
+    def is_chomsky(self):
+        """
+        Returns true if grammar's rules are already in Chomsky normal form
+        """
+        if self._is_chamsky is None:
+            self._is_chamsky = all(
+                (len(symbols) == 1 and symbols[0] not in self.variables)
+                or (len(symbols) == 2 and all(s in self.variables and s != self.start_variable for s in symbols))
+                or (not symbols and variable == self.start_variable)
+                for variable, symbols in self.analyze().productions
+            )
+        return self._is_chamsky
+
+    def chomsky_normal_form(self):
+        """
+        Returns grammar converted to Chomsky normal form (ChomskyGrammar).
+
+        The conversion is cached until the grammar is changed
+        """
+        if self._cnf is None:
+            self._cnf = self._build_cnf()
+        return self._cnf
+
+    def normal_form(self, last=NORMALIZATION_PASSES[-1]):
+        """
+        Returns grammar's NormalForm after the NORMALIZATION_PASSES up to last, run in order,
+        searched by BFS, DFS and LL1 in place of the grammar (see use_normal_form).
+
+        Every pass is run once until the grammar is changed. Raises NormalFormTooLarge if a pass
+        makes more than NORMAL_FORM_MAX_RULES rules
+        """
+        if last not in NORMALIZATION_PASSES:
+            raise ValueError("Unknown normalization pass '{}', expected one of {}".format(
+                last, ', '.join(NORMALIZATION_PASSES)))
+        normal = self._normal_forms.get(())
+        if normal is None:
+            normal = self._normal_forms[()] = NormalForm.of(self)
+        for name in NORMALIZATION_PASSES[:NORMALIZATION_PASSES.index(last) + 1]:
+            passes = normal.passes + (name,)
+            if passes not in self._normal_forms:
+                try:
+                    self._normal_forms[passes] = normal.apply(name)
+                except NormalFormTooLarge as e:
+                    self._normal_forms[passes] = e
+            normal = self._normal_forms[passes]
+            if isinstance(normal, NormalFormTooLarge):
+                raise normal
+        return normal
+
+    def _searched_normal_form(self, last):
+        """
+        Returns the NormalForm up to pass last that an engine searches in place of the grammar,
+        None if use_normal_form is false, the passes change nothing or make too many rules
+        """
+        if not self.use_normal_form:
+            return None
+        try:
+            normal = self.normal_form(last)
+        except NormalFormTooLarge:
+            return None
+        return normal if normal.changed else None
+
+    def language_counts(self):
+        """
+        Returns the LanguageCounts of the grammar, built once until the grammar is changed and
+        extended as longer strings are asked for. Regular grammars are counted on their
+        RegularAutomaton (unless use_automaton is false), where every string has one path, and
+        the others on their normal_form('useless'), whose trees are finitely many. Those trees
+        are the strings if the grammar is LL(1) or LALR(1), and so unambiguous
+        """
+        automaton = self.regular_automaton() if self.use_automaton else None
+        key = automaton is not None
+        if key not in self._language_counts:
+            if automaton:
+                self._language_counts[key] = LanguageCounts.of_automaton(automaton)
+            else:
+                unique = not self.predictive_table()[1] or not self.lalr_table()[2]
+                self._language_counts[key] = LanguageCounts.of_normal_form(self.normal_form('useless'), unique)
+        return self._language_counts[key]
+
+    def count_strings(self, n, budget=None):
+        """
+        Returns the number of strings of length n the grammar derives. Counted from the tables
+        of language_counts() when their trees are the strings, in time polynomial in n.
+        Otherwise the strings are listed (see enumerate()), in time polynomial per string but so
+        exponential in n when the language grows exponentially, as ambiguous ones often do
+
+        Raises BudgetExhausted if budget (a SearchBudget, defaults to self.budget) runs out while
+        listing, a step being a prefix checked, and NormalFormTooLarge if the normal form counted
+        makes too many rules
+        """
+        if type(n) is not int or n < 0:
+            raise ValueError("Length must be a non-negative integer")
+        counts = self.language_counts()
+        trees = counts.count(n)
+        if counts.unique or trees <= 1:
+            return trees
+        return counts.prefix_counts(n, self._start_budget(budget)).get((), 0)
+
+    def enumerate(self, max_len):
+        """
+        Lazily yields every string the grammar derives of length up to max_len, once each and
+        shortest first, in time polynomial per string. Trees are unranked when they are the
+        strings, ambiguous grammars' strings are built a terminal at a time otherwise, see
+        LanguageCounts.strings()
+
+        Raises NormalFormTooLarge if the normal form counted makes too many rules
+        """
+        if type(max_len) is not int or max_len < 0:
+            raise ValueError("Length must be a non-negative integer")
+        counts = self.language_counts()
+        for length in range(max_len + 1):
+            if counts.unique:
+                for index in range(counts.count(length)):
+                    yield counts.unrank(length, index)
+            else:
+                yield from counts.strings(length)
+
+    def sample(self, n, k, seed=None, budget=None):
+        """
+        Draws k strings of length n independently and uniformly among the strings. Trees are
+        unranked when they are the strings. Otherwise strings are built a terminal at a time,
+        each terminal weighted by the number of strings extending the prefix with it, which
+        count_strings(n) must find first: see its cost. The same seed gives the same strings
+
+        Raises BudgetExhausted if budget (a SearchBudget, defaults to self.budget) runs out while
+        counting
+
+        Returns the list of strings, empty if the grammar derives none of length n
+        """
+        if type(n) is not int or n < 0:
+            raise ValueError("Length must be a non-negative integer")
+        counts = self.language_counts()
+        total = counts.count(n)
+        if not total:
+            return []
+        generator = random.Random(seed)
+        if counts.unique or total == 1:
+            return [counts.unrank(n, generator.randrange(total)) for _ in range(k)]
+        extending = counts.prefix_counts(n, self._start_budget(budget))
+        strings = []
+        for _ in range(k):
+            prefix = ()
+            while len(prefix) < n:
+                index = generator.randrange(extending[prefix])
+                for symbol in counts.alphabet:
+                    following = extending.get(prefix + (symbol,), 0)
+                    if index < following:
+                        break
+                    index -= following
+                prefix += (symbol,)
+            strings.append(''.join(prefix))
+        return strings
+
+    def _search_normal_form(self, engine, normal, input_string, budget, **options):
+        """
+        Searches the grammar's normal form with a top-down engine instead of its rules
+
+        Returns the engine's result, the derivation shown with the grammar's rules
+        """
+        # Each search gets its own copy, so its statistics are not shared
+        grammar = copy(normal.grammar)
+        grammar.trace_hook = self.trace_hook
+        grammar.budget = self.budget
+        grammar.table = self.table
+        try:
+            accepted, leaf = getattr(grammar, engine)(input_string, budget=budget, **options)
+        finally:
+            self.last_stats.update((key, value) for key, value in grammar.last_stats.items()
+                                   if key not in ('engine', 'timings'))
+            self.last_stats['normal_form'] = normal.passes
+        if not accepted:
+            return False, None
+        return True, self._derivation_from_tree(normal.tree(leaf))
+
+    def _build_cnf(self):
+        def is_variable(symbol):
+            return type(symbol) is tuple or symbol in self.variables
+
+        # TERM and BIN: rules longer than two symbols are split into ('seq', n, k) tails,
+        # and their terminals are moved to ('term', a) variables
+        rules = []
+        proxies = set()
+        for number, (variable, symbols) in enumerate(self.analyze().productions):
+            builder = (('node', variable, symbols, tuple(('splice', k) for k in range(min(len(symbols), 2)))),)
+            if len(symbols) <= 1:
+                rules.append((variable, symbols, builder))
+                continue
+            right = []
+            for symbol in symbols:
+                if is_variable(symbol):
+                    right.append(symbol)
+                    continue
+                if symbol not in proxies:
+                    proxies.add(symbol)
+                    rules.append((('term', symbol), (symbol,), (('splice', 0),)))
+                right.append(('term', symbol))
+            left = variable
+            for k in range(1, len(right) - 1):
+                tail = ('seq', number, k)
+                rules.append((left, (right[k - 1], tail), builder))
+                left, builder = tail, (('splice', 0), ('splice', 1))
+            rules.append((left, tuple(right[-2:]), builder))
+
+        # DEL: every nullable variable keeps the builder of one of its null derivations
+        nullable = {}
+        changed = True
+        while changed:
+            changed = False
+            for variable, symbols, builder in rules:
+                if variable not in nullable and all(symbol in nullable for symbol in symbols):
+                    nullable[variable] = substitute_builder(builder, [nullable[s] for s in symbols])
+                    changed = True
+
+        expanded = []
+        for variable, symbols, builder in rules:
+            if not symbols:
+                continue
+            expanded.append((variable, symbols, builder))
+            if len(symbols) == 2:
+                first, second = symbols
+                if first in nullable:
+                    expanded.append((variable, (second,), substitute_builder(builder, [nullable[first], (('splice', 0),)])))
+                if second in nullable:
+                    expanded.append((variable, (first,), substitute_builder(builder, [(('splice', 0),), nullable[second]])))
+
+        # UNIT: A -> B rules are replaced by the rules of every variable B reaches through them
+        variable_rules = defaultdict(list)
+        for variable, symbols, builder in expanded:
+            variable_rules[variable].append((symbols, builder))
+
+        cnf_rules = []
+        cnf_builders = []
+        seen = set()
+        for variable in variable_rules:
+            reached = {variable}
+            pending = deque([(variable, (('splice', 0),))])
+            while pending:
+                target, outer = pending.popleft()
+                # Variables whose only rules are null have none left
+                for symbols, builder in variable_rules.get(target, ()):
+                    composed = substitute_builder(outer, [builder])
+                    if len(symbols) == 1 and is_variable(symbols[0]):
+                        if symbols[0] not in reached:
+                            reached.add(symbols[0])
+                            pending.append((symbols[0], composed))
+                    elif (variable, symbols) not in seen:
+                        seen.add((variable, symbols))
+                        cnf_rules.append((variable, symbols))
+                        cnf_builders.append(composed)
+
+        # Drops the rules of variables the start variable cannot reach anymore
+        reachable = {self.start_variable}
+        pending = [self.start_variable]
+        by_variable = defaultdict(list)
+        for variable, symbols in cnf_rules:
+            by_variable[variable].append(symbols)
+        while pending:
+            for symbols in by_variable[pending.pop()]:
+                for symbol in symbols:
+                    if is_variable(symbol) and symbol not in reachable:
+                        reachable.add(symbol)
+                        pending.append(symbol)
+        kept = [index for index, (variable, _) in enumerate(cnf_rules) if variable in reachable]
+
+        return ChomskyGrammar(self.start_variable,
+                              [cnf_rules[index] for index in kept],
+                              [cnf_builders[index] for index in kept],
+                              nullable.get(self.start_variable))
+
+    def regular_automaton(self):
+        """
+        Returns grammar's RegularAutomaton if all its rules are right-linear (A -> wB | w) or all
+        left-linear (A -> Bw | w), None otherwise.
+
+        The automaton is compiled once until the grammar is changed
+        """
+        if self._automaton is None:
+            self._automaton = self._build_automaton() or False
+        return self._automaton or None
+
+    def _build_automaton(self):
+        productions = self.analyze().productions
+        shapes = [[position for position, symbol in enumerate(symbols) if symbol in self.variables]
+                  for _, symbols in productions]
+        right_linear = all(not shape or shape == [len(symbols) - 1] for shape, (_, symbols) in zip(shapes, productions))
+        left_linear = all(not shape or shape == [0] for shape in shapes)
+        if not right_linear and not left_linear:
+            return None
+
+        # One NFA state per variable plus the final state (right-linear) or the initial one (left-linear)
+        state = {variable: number for number, variable in enumerate(sorted(self.variables))}
+        extra = len(state)
+        edges = [[] for _ in range(extra + 1)]
+        for index, ((variable, symbols), shape) in enumerate(zip(productions, shapes)):
+            if right_linear:
+                source, target = state[variable], state[symbols[-1]] if shape else extra
+                word = symbols[:-1] if shape else symbols
+            else:
+                source, target = state[symbols[0]] if shape else extra, state[variable]
+                word = symbols[1:] if shape else symbols
+            if not word:
+                edges[source].append((None, target, index, 0))
+                continue
+            for offset, symbol in enumerate(word):
+                if offset == len(word) - 1:
+                    following = target
+                else:
+                    following = len(edges)
+                    edges.append([])
+                edges[source].append((symbol, following, index, offset))
+                source = following
+        if right_linear:
+            return RegularAutomaton(edges, state[self.start_variable], extra, False)
+        return RegularAutomaton(edges, extra, state[self.start_variable], True)
+
+    def _automaton_parse(self, input_string, automaton):
+        """
+        Runs input_string on the grammar's RegularAutomaton, rebuilding the derivation of accepted strings
+        """
+        self.last_stats.update(automaton_states=automaton.size, expanded=len(input_string))
+        if not automaton.accepts(input_string):
+            return False, None
+        productions = self.analyze().productions
+        tree = None
+        for index in reversed(automaton.rules_of(input_string)):
+            variable, symbols = productions[index]
+            tree = (variable, symbols, [] if tree is None else [tree])
+        return True, self._derivation_from_tree(tree)
+
+    @instrumented('CYK')
+    def CYK(self, input_string, budget=None):
+        """
+        Cocke-Younger-Kasami recognizer running on grammar's Chomsky normal form in O(n³·|G|)
+
+        Raises BudgetExhausted if budget (a SearchBudget, defaults to self.budget) runs out
+
+        Returns (True, last DerivationNode of the leftmost derivation) if accepted, (False, None) otherwise
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        automaton = self.regular_automaton() if self.use_automaton else None
+        if automaton:
+            return self._automaton_parse(input_string, automaton)
+        cnf = self.chomsky_normal_form()
+        budget = self._start_budget(budget)
+        stats = self.last_stats
+        trace = self.trace_hook
+        length = len(input_string)
+        if not length:
+            if cnf.null_builder is None:
+                return False, None
+            return True, self._derivation_from_tree(evaluate_builder(cnf.null_builder, [])[0])
+
+        # table[span][start] maps every variable deriving input_string[start:start + span]
+        # to the (rule index, split) it was first found with
+        table = [None, [{variable: (index, None) for variable, index in cnf.terminal_rules.get(char, ())}
+                        for char in input_string]]
+        for span in range(2, length + 1):
+            row = []
+            for start in range(length - span + 1):
+                if budget is not None:
+                    budget.step(length - span - start)
+                cell = {}
+                for split in range(1, span):
+                    left = table[split][start]
+                    right = table[span - split][start + split]
+                    if not left or not right:
+                        continue
+                    for symbol in left:
+                        for second, variable, index in cnf.binary_rules.get(symbol, ()):
+                            if second in right and variable not in cell:
+                                cell[variable] = (index, split)
+                row.append(cell)
+                if len(cell) > stats['peak_frontier']:
+                    stats['peak_frontier'] = len(cell)
+                if trace is not None:
+                    trace('CYK', 'cell', (start, span, len(cell)))
+            stats['expanded'] += len(row)
+            table.append(row)
+
+        root = (length, 0, 0)
+        if 0 not in table[length][0]:
+            return False, None
+
+        items = {}
+        stack = [root]
+        while stack:
+            key = stack[-1]
+            if key in items:
+                stack.pop()
+                continue
+            span, start, variable = key
+            index, split = table[span][start][variable]
+            if split is None:
+                children = [[input_string[start]]]
+            else:
+                first, second = cnf.pairs[index]
+                parts = ((split, start, first), (span - split, start + split, second))
+                missing = [part for part in parts if part not in items]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                children = [items[part] for part in parts]
+            stack.pop()
+            items[key] = evaluate_builder(cnf.builders[index], children)
+        return True, self._derivation_from_tree(items[root][0])
+
+    def _earley_chart(self, codes, budget=None, use_leo=True):
+        """
+        Runs Earley's algorithm on the encoded input, with Leo's deterministic reduction items
+        unless use_leo is false, taking a step of budget for every item
+
+        Returns (chart, leo), where chart[k] maps every item (rule index, dot, origin) of the k-th
+        set to its back pointer (previous item, previous set, child): child is the terminal
+        scanned, the item completed in set k, or ('null', variable) for a nullable variable
+        skipped while predicting. An item first added for a Leo item instead has the pointer
+        ('leo', completed item): the chain of completed items between them is left out of the
+        set, and put back by _expand_leo() from the Leo items of leo (see leo_item())
+        """
+        grammar = self.compile()
+        nullable = {grammar.codes[variable] for variable in self.analyze().null_trees}
+        lhs, rhs, offsets, variable_count = grammar.lhs, grammar.rhs, grammar.offsets, grammar.variable_count
+        length = len(codes)
+        stats = self.last_stats
+        trace = self.trace_hook
+        chart = [{} for _ in range(length + 1)]
+        waiting = [defaultdict(list) for _ in range(length + 1)]
+        leo = {}
+        for index in range(offsets[grammar.start], offsets[grammar.start + 1]):
+            chart[0][(index, 0, 0)] = None
+
+        for k in range(length + 1):
+            items = chart[k]
+            worklist = list(items)
+            predicted = set()
+            position = 0
+            while position < len(worklist):
+                item = worklist[position]
+                position += 1
+                if budget is not None:
+                    budget.step(len(worklist) - position)
+                index, dot, origin = item
+                symbols = rhs[index]
+                if dot == len(symbols):
+                    top = leo_item(leo, waiting, grammar, origin, lhs[index]) if use_leo and origin < k else None
+                    if top is not None:
+                        if top[1] not in items:
+                            items[top[1]] = ('leo', item)
+                            worklist.append(top[1])
+                        continue
+                    for waiting_item in waiting[origin][lhs[index]]:
+                        advanced = (waiting_item[0], waiting_item[1] + 1, waiting_item[2])
+                        if advanced not in items:
+                            items[advanced] = (waiting_item, origin, item)
+                            worklist.append(advanced)
+                    continue
+                symbol = symbols[dot]
+                if symbol < variable_count:
+                    waiting[k][symbol].append(item)
+                    if symbol not in predicted:
+                        predicted.add(symbol)
+                        for rule in range(offsets[symbol], offsets[symbol + 1]):
+                            if (rule, 0, k) not in items:
+                                items[(rule, 0, k)] = None
+                                worklist.append((rule, 0, k))
+                    if symbol in nullable and (index, dot + 1, origin) not in items:
+                        items[(index, dot + 1, origin)] = (item, k, ('null', grammar.symbols[symbol]))
+                        worklist.append((index, dot + 1, origin))
+                elif k < length and codes[k] == symbol:
+                    if (index, dot + 1, origin) not in chart[k + 1]:
+                        chart[k + 1][(index, dot + 1, origin)] = (item, k, symbol)
+            stats['expanded'] += len(worklist)
+            stats['peak_frontier'] = max(stats['peak_frontier'], len(items))
+            if trace is not None:
+                trace('Earley', 'set', (k, len(items)))
+
+        return chart, leo
+
+    def _expand_leo(self, chart, leo, k, completed, top=None):
+        """
+        Puts back in set k of chart the items left out when completed, an item of that set, was
+        completed through a Leo item, up to the first one already there. With top, the item the
+        Leo item added, up to top, which then gets the back pointer it would have had without it
+        """
+        lhs = self.compile().lhs
+        items = chart[k]
+        while True:
+            entry = leo.get(completed[2], {}).get(lhs[completed[0]]) if completed[2] < k else None
+            if entry is None:
+                return
+            waiting_item = entry[0]
+            advanced = (waiting_item[0], waiting_item[1] + 1, waiting_item[2])
+            if advanced == top:
+                items[top] = (waiting_item, completed[2], completed)
+                return
+            if advanced not in items:
+                items[advanced] = (waiting_item, completed[2], completed)
+            elif top is None:
+                return
+            completed = advanced
+
+    @instrumented('Earley')
+    def Earley(self, input_string, budget=None):
+        """
+        Earley recognizer working on grammar's rules as written, left recursion and null rules included.
+
+        Runs in O(n³) time in the worst case, O(n²) on unambiguous grammars and O(n) on LR(k)
+        ones: Leo's deterministic reduction items keep right recursion linear, a completed item
+        completing only the topmost item of the chain waiting on it. They are not used on cyclic
+        grammars (A =>+ A, see GrammarAnalysis.cyclic). Raises BudgetExhausted if
+        budget (a SearchBudget, defaults to self.budget) runs out
+
+        Returns (True, last DerivationNode of the leftmost derivation) if accepted, (False, None) otherwise
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        automaton = self.regular_automaton() if self.use_automaton else None
+        if automaton:
+            return self._automaton_parse(input_string, automaton)
+        grammar = self.compile()
+        analysis = self.analyze()
+        null_trees = analysis.null_trees
+        rhs, offsets = grammar.rhs, grammar.offsets
+        codes = grammar.encode(input_string)
+        if codes is None or grammar.start < 0:
+            return False, None
+        length = len(codes)
+        # On a cyclic grammar, back pointers put back from Leo items could go around a cycle
+        chart, leo = self._earley_chart(codes, self._start_budget(budget), use_leo=not analysis.cyclic)
+
+        productions = grammar.productions
+        root = next(((index, len(rhs[index]), 0) for index in range(offsets[grammar.start], offsets[grammar.start + 1])
+                     if (index, len(rhs[index]), 0) in chart[length]), None)
+        if root is None:
+            return False, None
+
+        trees = {}
+        stack = [(root, length)]
+        while stack:
+            key = stack[-1]
+            if key in trees:
+                stack.pop()
+                continue
+            item, k = key
+            children = []
+            while chart[k][item] is not None:
+                if chart[k][item][0] == 'leo':
+                    self._expand_leo(chart, leo, k, chart[k][item][1], item)
+                item, previous, child = chart[k][item]
+                if type(child) is tuple:
+                    children.append(child if child[0] == 'null' else (child, k))
+                k = previous
+            missing = [child for child in children if child[0] != 'null' and child not in trees]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            variable, symbols = productions[key[0][0]]
+            subtrees = [null_trees[child[1]] if child[0] == 'null' else trees[child] for child in reversed(children)]
+            trees[key] = (variable, symbols, subtrees)
+        return True, self._derivation_from_tree(trees[(root, length)])
+
+    @instrumented('SPPF')
+    def parse_forest(self, input_string, budget=None):
+        """
+        Builds the shared packed parse forest of every derivation of input_string (ParseForest)
+        from the Earley chart, in O(n³) time and space. Raises BudgetExhausted if budget (a
+        SearchBudget, defaults to self.budget) runs out while building the chart
+
+        Returns None if input_string is rejected
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        grammar = self.compile()
+        lhs, rhs, offsets = grammar.lhs, grammar.rhs, grammar.offsets
+        codes = grammar.encode(input_string)
+        if codes is None or grammar.start < 0:
+            return None
+        length = len(codes)
+        chart, leo = self._earley_chart(codes, self._start_budget(budget))
+
+        # complete[end][variable] holds the starts of the variable's spans ending at end, listed
+        # once the items left out of set end for Leo items are put back
+        complete = {}
+
+        def completed(end):
+            if end not in complete:
+                items = chart[end]
+                for item in list(items):
+                    if item[1] == len(rhs[item[0]]):
+                        self._expand_leo(chart, leo, end, item)
+                complete[end] = defaultdict(set)
+                for rule, dot, origin in items:
+                    if dot == len(rhs[rule]):
+                        complete[end][lhs[rule]].add(origin)
+            return complete[end]
+
+        if 0 not in completed(length)[grammar.start]:
+            return None
+        # The sets holding each item whose dot is before a variable
+        sets_of = defaultdict(list)
+        for end, items in enumerate(chart):
+            for rule, dot, origin in items:
+                if dot < len(rhs[rule]) and rhs[rule][dot] < grammar.variable_count:
+                    sets_of[(rule, dot, origin)].append(end)
+
+        root = (grammar.start, 0, length)
+        families = {}
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            if node in families:
+                continue
+            found = []
+            if len(node) == 3:
+                variable, start, end = node
+                completed(end)
+                found = [(rule, len(rhs[rule]), start, end) for rule in range(offsets[variable], offsets[variable + 1])
+                         if (rule, len(rhs[rule]), start) in chart[end]]
+                pending.extend(found)
+            elif node[1]:
+                rule, dot, start, end = node
+                symbol = rhs[rule][dot - 1]
+                if symbol >= grammar.variable_count:
+                    found.append(((rule, dot - 1, start, end - 1), None))
+                else:
+                    starts = completed(end)[symbol]
+                    found = [((rule, dot - 1, start, middle), (symbol, middle, end))
+                             for middle in sets_of[(rule, dot - 1, start)] if middle in starts]
+                pending.extend(child for family in found for child in family if child is not None)
+            families[node] = found
+        return ParseForest(grammar, root, families, self._derivation_from_tree)
+
+    def predictive_table(self):
+        """
+        Returns grammar's LL(1) predictive parse table as (table, conflicts), built from the
+        FIRST and FOLLOW sets once until the grammar is changed.
+
+        table maps (variable, next input symbol or END_MARKER) to a rule index of the analysis'
+        productions, conflicts lists the cells claimed by more than one rule
+        """
+        if self._ll1 is not None:
+            return self._ll1
+        analysis = self.analyze()
+        follow = {variable: set() for variable in self.variables}
+        follow[self.start_variable].add(END_MARKER)
+        changed = True
+        while changed:
+            changed = False
+            for variable, symbols in analysis.productions:
+                for position, symbol in enumerate(symbols):
+                    if symbol not in self.variables:
+                        continue
+                    first, nullable = analysis.first_of(symbols[position + 1:])
+                    if nullable:
+                        first = first | follow[variable]
+                    if not first <= follow[symbol]:
+                        follow[symbol] |= first
+                        changed = True
+
+        table = {}
+        conflicts = []
+        for index, (variable, symbols) in enumerate(analysis.productions):
+            first, nullable = analysis.first_of(symbols)
+            if nullable:
+                first = first | follow[variable]
+            for terminal in sorted(first):
+                claimed = table.setdefault((variable, terminal), index)
+                if claimed != index:
+                    conflicts.append("LL(1) conflict on ({}, {}): {} -> {} | {} -> {}".format(
+                        variable, terminal,
+                        variable, ''.join(analysis.productions[claimed][1]) or self.null_character,
+                        variable, ''.join(symbols) or self.null_character))
+        self._ll1 = (table, conflicts)
+        return self._ll1
+
+    @instrumented('LL1')
+    def LL1(self, input_string, trace=False, budget=None):
+        """
+        Table driven predictive parser, running in linear time without backtracking.
+
+        A grammar that is not LL(1) is parsed with its normal_form() if that one is, unless
+        use_normal_form is false (left recursion removal and left factoring often make it so),
+        the derivation being shown with the grammar's own rules.
+
+        Raises ValueError if neither is LL(1), BudgetExhausted if budget (a SearchBudget, defaults
+        to self.budget) runs out. With trace, the Input String / Stack / Action steps are written
+        to self.table
+
+        Returns (True, last DerivationNode of the leftmost derivation) if accepted, (False, None) otherwise
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        table, conflicts = self.predictive_table()
+        normal = self._searched_normal_form(NORMALIZATION_PASSES[-1]) if conflicts else None
+        if normal and not normal.grammar.predictive_table()[1]:
+            return self._search_normal_form('LL1', normal, input_string, budget, trace=trace)
+        if conflicts:
+            raise ValueError("Grammar is not LL(1):\n" + '\n'.join(conflicts))
+        productions = self.analyze().productions
+        budget = self._start_budget(budget)
+        if trace:
+            self.table.clear_rows()
+
+        self.index = 0
+        self.stack = [END_MARKER, self.start_variable]
+        node = DerivationNode(self.start_variable)
+        stats = self.last_stats
+        while True:
+            stats['expanded'] += 1
+            if len(self.stack) > stats['peak_frontier']:
+                stats['peak_frontier'] = len(self.stack)
+            if self.trace_hook is not None:
+                self.trace_hook('LL1', 'step', (self.index, ''.join(reversed(self.stack))))
+            if budget is not None:
+                budget.step(len(self.stack))
+            top = self.stack[-1]
+            lookahead = input_string[self.index] if self.index < len(input_string) else END_MARKER
+            if trace:
+                remaining = input_string[self.index:] + END_MARKER
+                stack = ''.join(reversed(self.stack))
+            if top == END_MARKER:
+                accepted = lookahead == END_MARKER
+                if trace:
+                    self.table.add_row([remaining, stack, "accepted" if accepted else "error"])
+                return (True, node) if accepted else (False, None)
+            if top in self.variables:
+                index = table.get((top, lookahead))
+                if index is None:
+                    if trace:
+                        self.table.add_row([remaining, stack, "error: no rule for ({}, {})".format(top, lookahead)])
+                    return False, None
+                symbols = productions[index][1]
+                self.stack.pop()
+                self.stack.extend(reversed(symbols))
+                node = DerivationNode(input_string[:self.index] + ''.join(reversed(self.stack[1:])), node)
+                if trace:
+                    self.table.add_row([remaining, stack, "{} -> {}".format(top, ''.join(symbols) or self.null_character)])
+            elif top == lookahead:
+                self.stack.pop()
+                self.index += 1
+                if trace:
+                    self.table.add_row([remaining, stack, "matched {}".format(top)])
+            else:
+                if trace:
+                    self.table.add_row([remaining, stack, "error: expected {}".format(top)])
+                return False, None
+
+    def lalr_table(self):
+        """
+        Returns grammar's LALR(1) parse tables as (action, goto, conflicts), built once until the
+        grammar is changed.
+
+        The LR(0) item sets get their lookaheads by spontaneous generation and propagation.
+        action maps (state, terminal or END_MARKER) to ('shift', state), ('reduce', rule index)
+        or ('accept',), goto maps (state, variable) to a state, and conflicts lists the
+        shift/reduce and reduce/reduce conflicts found
+        """
+        if self._lalr is not None:
+            return self._lalr
+        analysis = self.analyze()
+        # The augmented rule S' -> S is given the index right after the grammar's rules
+        productions = list(analysis.productions) + [(None, (self.start_variable,))]
+        augmented = len(analysis.productions)
+        variable_rules = analysis.variable_rules
+
+        def closure(items):
+            items = set(items)
+            pending = list(items)
+            while pending:
+                index, dot = pending.pop()
+                symbols = productions[index][1]
+                if dot < len(symbols) and symbols[dot] in self.variables:
+                    for rule in variable_rules[symbols[dot]]:
+                        if (rule, 0) not in items:
+                            items.add((rule, 0))
+                            pending.append((rule, 0))
+            return items
+
+        def lookahead_closure(items):
+            items = set(items)
+            pending = list(items)
+            while pending:
+                index, dot, lookahead = pending.pop()
+                symbols = productions[index][1]
+                if dot < len(symbols) and symbols[dot] in self.variables:
+                    first, nullable = analysis.first_of(symbols[dot + 1:])
+                    if nullable:
+                        first = first | {lookahead}
+                    for rule in variable_rules[symbols[dot]]:
+                        for terminal in first:
+                            if (rule, 0, terminal) not in items:
+                                items.add((rule, 0, terminal))
+                                pending.append((rule, 0, terminal))
+            return items
+
+        # LR(0) automaton
+        kernels = [frozenset({(augmented, 0)})]
+        state_of = {kernels[0]: 0}
+        transitions = {}
+        position = 0
+        while position < len(kernels):
+            moves = defaultdict(set)
+            for index, dot in sorted(closure(kernels[position])):
+                symbols = productions[index][1]
+                if dot < len(symbols):
+                    moves[symbols[dot]].add((index, dot + 1))
+            for symbol, kernel in moves.items():
+                kernel = frozenset(kernel)
+                if kernel not in state_of:
+                    state_of[kernel] = len(kernels)
+                    kernels.append(kernel)
+                transitions[(position, symbol)] = state_of[kernel]
+            position += 1
+
+        # Lookaheads: '#' stands for the lookahead propagated from the kernel item
+        lookaheads = {(state, item): set() for state, kernel in enumerate(kernels) for item in kernel}
+        lookaheads[(0, (augmented, 0))].add(END_MARKER)
+        propagates = defaultdict(list)
+        for state, kernel in enumerate(kernels):
+            for item in kernel:
+                for index, dot, lookahead in lookahead_closure({(item[0], item[1], '#')}):
+                    symbols = productions[index][1]
+                    if dot == len(symbols):
+                        continue
+                    target = (transitions[(state, symbols[dot])], (index, dot + 1))
+                    if lookahead == '#':
+                        propagates[(state, item)].append(target)
+                    else:
+                        lookaheads[target].add(lookahead)
+        changed = True
+        while changed:
+            changed = False
+            for source, targets in propagates.items():
+                for target in targets:
+                    if not lookaheads[source] <= lookaheads[target]:
+                        lookaheads[target] |= lookaheads[source]
+                        changed = True
+
+        action = {}
+        goto = {}
+        conflicts = []
+
+        def describe(entry):
+            if entry[0] == 'shift':
+                return 'shift {}'.format(entry[1])
+            if entry[0] == 'accept':
+                return 'accept'
+            variable, symbols = productions[entry[1]]
+            return 'reduce {} -> {}'.format(variable, ''.join(symbols) or self.null_character)
+
+        def add_action(state, terminal, entry):
+            claimed = action.setdefault((state, terminal), entry)
+            if claimed != entry:
+                kind = 'shift/reduce' if 'shift' in (claimed[0], entry[0]) else 'reduce/reduce'
+                conflicts.append("LALR(1) {} conflict in state {} on {}: {} | {}".format(
+                    kind, state, terminal, describe(claimed), describe(entry)))
+
+        for (state, symbol), target in sorted(transitions.items(), key=lambda move: (move[0][0], str(move[0][1]))):
+            if symbol in self.variables:
+                goto[(state, symbol)] = target
+            else:
+                add_action(state, symbol, ('shift', target))
+        for state, kernel in enumerate(kernels):
+            seeds = {(index, dot, lookahead) for index, dot in kernel for lookahead in lookaheads[(state, (index, dot))]}
+            for index, dot, lookahead in sorted(lookahead_closure(seeds)):
+                if dot != len(productions[index][1]):
+                    continue
+                if index == augmented:
+                    add_action(state, END_MARKER, ('accept',))
+                else:
+                    add_action(state, lookahead, ('reduce', index))
 
+        self._lalr = (action, goto, conflicts)
+        return self._lalr
 
-def re_escaped(it):
-    for i in it:
-        yield re.escape(i)
+    @instrumented('LALR')
+    def LALR(self, input_string, budget=None):
+        """
+        LALR(1) shift-reduce parser, running in linear time on any LALR(1) grammar, left recursive
+        ones included.
 
-class RuleNode():
-        def __init__(self,
-                     NodeName=None,
-                     NodeVars=None,
-                     NodeString=None,
-                     CanBeNull=False,
-                     CanRepeat=False,  ):
-            self.NodeName = NodeName
-            self.NodeVars = NodeVars
-            self.NodeString = NodeString
-            self.CanBeNull = CanBeNull
-            self.CanRepeat = CanRepeat
-            self.index = 0
+        Raises ValueError if the grammar is not LALR(1), BudgetExhausted if budget (a SearchBudget,
+        defaults to self.budget) runs out
 
-class CFG(object):
-    """
-    Context free grammar (CFG) class
+        Returns (True, last DerivationNode of the leftmost derivation) if accepted, (False, None) otherwise
+        """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        action, goto, conflicts = self.lalr_table()
+        if conflicts:
+            raise ValueError("Grammar is not LALR(1):\n" + '\n'.join(conflicts))
+        productions = self.analyze().productions
+        budget = self._start_budget(budget)
 
-    """
-    
-            
-    
-    def __init__(self,
-                 variables=None,
-                 terminals=None,
-                 rules=None,
-                 start_variable='S',
-                 null_character='λ'
-                 ):
-        
+        states = [0]
+        trees = []
+        position = 0
+        stats = self.last_stats
+        while True:
+            stats['expanded'] += 1
+            if len(states) > stats['peak_frontier']:
+                stats['peak_frontier'] = len(states)
+            if budget is not None:
+                budget.step(len(states))
+            lookahead = input_string[position] if position < len(input_string) else END_MARKER
+            entry = action.get((states[-1], lookahead))
+            if self.trace_hook is not None:
+                self.trace_hook('LALR', 'step', (position, states[-1], entry))
+            if entry is None:
+                return False, None
+            if entry[0] == 'shift':
+                states.append(entry[1])
+                trees.append(lookahead)
+                position += 1
+            elif entry[0] == 'reduce':
+                variable, symbols = productions[entry[1]]
+                children = trees[len(trees) - len(symbols):]
+                del trees[len(trees) - len(symbols):]
+                del states[len(states) - len(symbols):]
+                trees.append((variable, symbols, [child for child in children if type(child) is not str]))
+                states.append(goto[(states[-1], variable)])
+            else:
+                return True, self._derivation_from_tree(trees[-1])
+
+    @instrumented('GLL')
+    def GLL(self, input_string, budget=None):
         """
-        Initialize method
+        Memoized top-down recognizer in the style of GLL parsing.
 
-        Parameters
-            variables (optional): grammar's variables set.
-            terminals: grammar's terminals set
-            rules:  grammar's rules
-            start_variable (optional, defaults to 'S'): grammar's start variable
-            null_character (optional, defaults to 'λ'): grammar's null character
+        Every call of a variable at a start offset is made once, and its full set of end offsets
+        is memoized and shared by all its callers, so direct and indirect left recursion and
+        ambiguous rules are handled in O(n³). Raises BudgetExhausted if budget (a SearchBudget,
+        defaults to self.budget) runs out
+
+        Returns (True, last DerivationNode of the leftmost derivation) if accepted, (False, None) otherwise
         """
+        if type(input_string) is not str:
+            raise TypeError("Input must be a string")
+        automaton = self.regular_automaton() if self.use_automaton else None
+        if automaton:
+            return self._automaton_parse(input_string, automaton)
+        grammar = self.compile()
+        lhs, rhs, offsets, variable_count = grammar.lhs, grammar.rhs, grammar.offsets, grammar.variable_count
+        codes = grammar.encode(input_string)
+        if codes is None or grammar.start < 0:
+            return False, None
+        length = len(codes)
 
-        if variables is None:
-            variables = set()
-        elif hasattr(variables, '__iter__'):
-            variables = {*variables}
-        else:
-            raise TypeError(
-                "CFG variables must be a iterable, not {}".format(type(variables).__name__)
-            )
+        # A descriptor (rule, dot, start, position) is a rule of a call at start, matched up to dot
+        # until position. descriptors maps each of them to the (previous descriptor, terminal or
+        # (variable, start, end) call) it was first reached with. ends[(variable, start)] maps
+        # every end offset of the call to the descriptor completing it
+        descriptors = {}
+        pending = []
+        ends = {}
+        callers = defaultdict(list)
 
-        if isinstance(rules, dict):
-            variables |= {*rules}
-            rules = {
-                (var, var_rule)
-                for var, var_rules in rules.items()
-                for var_rule in var_rules
-            }
-        elif hasattr(rules, '__iter__'):
-            rules = {*rules}
-        else:
-            raise TypeError(
-                "CFG rules must be a collection or a dict, not {}".format(type(rules).__name__)
-            )
+        def add(descriptor, back):
+            if descriptor not in descriptors:
+                descriptors[descriptor] = back
+                pending.append(descriptor)
 
-        if isinstance(terminals, set):
-            terminals = terminals
-        elif hasattr(terminals, '__iter__'):
-            terminals = {*terminals}
-        else:
-            raise TypeError(
-                "CFG variables must be a iterable, not {}".format(type(variables).__name__)
-            )
+        def call(variable, position):
+            if (variable, position) not in ends:
+                ends[(variable, position)] = {}
+                for rule in range(offsets[variable], offsets[variable + 1]):
+                    add((rule, 0, position, position), None)
 
-        self.variables = variables
-        self.terminals = terminals
-        self.start_variable = start_variable
-        self.null_character = null_character
-        self.accepts_null = None
-        self._rules = rules
-        self._is_chamsky = None
-        self._cnf = None
-        self.rulesNodes = {}
-        self.index=0
-        self.stack=[]
-        self.table = PrettyTable(["Input String", "Stack","Action"])
-        
+        budget = self._start_budget(budget)
+        stats = self.last_stats
+        trace = self.trace_hook
+        call(grammar.start, 0)
+        while pending:
+            stats['expanded'] += 1
+            if len(pending) > stats['peak_frontier']:
+                stats['peak_frontier'] = len(pending)
+            if budget is not None:
+                budget.step(len(pending))
+            descriptor = pending.pop()
+            if trace is not None:
+                trace('GLL', 'descriptor', descriptor)
+            rule, dot, start, position = descriptor
+            symbols = rhs[rule]
+            if dot == len(symbols):
+                call_ends = ends[(lhs[rule], start)]
+                if position not in call_ends:
+                    call_ends[position] = descriptor
+                    for caller in callers[(lhs[rule], start)]:
+                        add((caller[0], caller[1] + 1, caller[2], position), (caller, (lhs[rule], start, position)))
+                continue
+            symbol = symbols[dot]
+            if symbol < variable_count:
+                callers[(symbol, position)].append(descriptor)
+                call(symbol, position)
+                for end in list(ends[(symbol, position)]):
+                    add((rule, dot + 1, start, end), (descriptor, (symbol, position, end)))
+            elif position < length and codes[position] == symbol:
+                add((rule, dot + 1, start, position + 1), (descriptor, symbol))
 
-    @property
-    def variables(self):
+        root = (grammar.start, 0, length)
+        if length not in ends[(grammar.start, 0)]:
+            return False, None
+
+        trees = {}
+        stack = [root]
+        while stack:
+            key = stack[-1]
+            if key in trees:
+                stack.pop()
+                continue
+            variable, start, end = key
+            descriptor = ends[(variable, start)][end]
+            calls = []
+            while descriptors[descriptor] is not None:
+                descriptor, child = descriptors[descriptor]
+                if type(child) is tuple:
+                    calls.append(child)
+            missing = [child for child in calls if child not in trees]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            trees[key] = grammar.productions[descriptor[0]] + ([trees[child] for child in reversed(calls)],)
+        return True, self._derivation_from_tree(trees[root])
+
+    def stream(self):
         """
-        Grammar's variables set property getter
+        Returns a StreamingRecognizer checking input fed to it symbol by symbol
         """
-        return self._variables
+        self.rules(None)
+        return StreamingRecognizer(self)
 
-    @variables.setter
-    def variables(self, new_variables):
+    def _prepare_engine(self, engine):
         """
-        Grammar's variables set property setter
+        Prepares the rules and the tables engine needs, so copies of the grammar do not rebuild them
         """
-        if type(new_variables) is not set:
-            raise TypeError("CFG variables must be a set, not '{}'".format(type(new_variables).__name__))
-
-        for variable in new_variables:
-            if type(variable) is not str:
-                raise TypeError("CFG variables must be strings, not '{}'".format(type(variable).__name__))
-
-        for variable in new_variables:
-            if string_contains_space(variable):
-                raise ValueError("Variables cannot contain white spaces : '{}'".format(variable))
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine '{}', expected one of {}".format(engine, ', '.join(ENGINES)))
+        self.rules(None)
+        self._prepare_tables(engine)
 
-        new_variables_list = list(new_variables)
-        for i in range(len(new_variables_list) - 1):
-            for j in range(i + 1, len(new_variables_list)):
-                contain_each_other, first_str, second_str = strings_contain_each_other(new_variables_list[i],
-                                                                                       new_variables_list[j])
-                if contain_each_other:
-                    raise ValueError("Variables cannot contain each other, '{}' contains '{}'"
-                                     .format(first_str, second_str))
+    def _prepare_tables(self, engine):
+        self.analyze()
+        if self.use_automaton and self.regular_automaton() and engine not in ('LL1', 'LALR'):
+            return
+        if engine in ('BFS', 'DFS'):
+            normal = self._searched_normal_form(SEARCH_NORMAL_FORM)
+            if normal:
+                # Prepares the normal form's own tables
+                normal.grammar
+        if engine == 'CYK':
+            self.chomsky_normal_form()
+        elif engine == 'LL1':
+            normal = self._searched_normal_form(NORMALIZATION_PASSES[-1]) if self.predictive_table()[1] else None
+            if normal:
+                normal.grammar.predictive_table()
+        elif engine == 'LALR':
+            self.lalr_table()
 
-        self._variables = frozenset(new_variables)
-        self._is_chamsky = None
-        self._cnf = None
-        self.accepts_null = None
+    # Everything derived from the rules that cache files hold
+    CACHED_TABLES = ('rulesNodes', 'accepts_null', '_compiled', 'analysis', '_is_chamsky', '_cnf', '_ll1', '_lalr',
+                     '_automaton', '_normal_forms')
+    # Settings a loaded grammar takes from the grammar it stands for, see parse_many()
+    BATCH_SETTINGS = ('use_automaton', 'use_normal_form', 'budget', 'trace_hook', 'trace_memory', 'result_cache')
 
-    @property
-    def terminals(self):
+    def fingerprint(self):
         """
-        Grammar's terminals set property getter
+        Returns the SHA-256 digest of grammar's rules, variables, terminals, start variable and null
+        character, naming its cache file and keying its cached results. It is computed once until
+        the grammar is changed
         """
-        return self._terminals
+        if self._fingerprint is None:
+            content = repr((sorted(self._rules), sorted(self.variables), sorted(self.terminals),
+                            self.start_variable, self.null_character))
+            self._fingerprint = hashlib.sha256(content.encode('utf-8')).digest()
+        return self._fingerprint
 
-    @terminals.setter
-    def terminals(self, new_terminals):
+    def save_cache(self, path):
         """
-        Grammar's terminals set property setter
+        Writes the grammar with every table built so far to a cache file, read by load_cache()
         """
-        if type(new_terminals) is not set:
-            raise TypeError("CFG terminals must be a set, not '{}'".format(type(new_terminals).__name__))
-
-        for terminal in new_terminals:
-            if type(terminal) is not str:
-                raise TypeError("CFG terminals must be strings, not '{}'".format(type(terminal).__name__))
+        self.rules(None)
+        state = {'variables': self.variables, 'terminals': self.terminals, 'start_variable': self.start_variable,
+                 'null_character': self.null_character, 'rules': self._rules}
+        state.update((name, getattr(self, name)) for name in CFG.CACHED_TABLES)
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, self.fingerprint(), zlib.crc32(payload), len(payload))
+        # Written aside and renamed, so readers never see a partial file
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(temporary, 'wb') as cache:
+                cache.write(header)
+                cache.write(payload)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
 
-        for terminal in new_terminals:
-            if string_contains_space(terminal):
-                raise ValueError("Variables cannot contain white spaces : '{}'".format(terminal))
+    @classmethod
+    def load_cache(cls, path):
+        """
+        Returns the grammar saved in a cache file by save_cache(), with all its tables, without
+        validating or preparing it again. Only load cache files from trusted places, they are pickles
 
-        new_terminals_list = list(new_terminals)
-        for i in range(len(new_terminals_list) - 1):
-            for j in range(i + 1, len(new_terminals_list)):
-                contain_each_other, first_str, second_str = strings_contain_each_other(new_terminals_list[i],
-                                                                                       new_terminals_list[j])
-                if contain_each_other:
-                    raise ValueError("Terminals cannot contain each other, '{}' contains '{}'"
-                                     .format(first_str, second_str))
+        Raises GrammarCacheError if the file is stale or corrupt, OSError if it cannot be read
+        """
+        state = read_grammar_cache(path)
+        grammar = cls.__new__(cls)
+        grammar._variables = state['variables']
+        grammar._terminals = state['terminals']
+        grammar._start_variable = state['start_variable']
+        grammar._null_character = state['null_character']
+        grammar._rules = state['rules']
+        grammar._search_facts = None
+        grammar._fingerprint = None
+        grammar._language_counts = {}
+        for name in CFG.CACHED_TABLES:
+            setattr(grammar, name, state[name])
+        grammar._reset_settings()
+        return grammar
 
-        self._terminals = frozenset(new_terminals)
-        self._is_chamsky = None
-        self._cnf = None
-        self.accepts_null = None
+    def cache_path(self, cache_dir):
+        """
+        Returns the path of grammar's cache file in cache_dir
+        """
+        return os.path.join(cache_dir, self.fingerprint().hex() + '.cfgcache')
 
-    
-    def rulesNodePrep(self):
-        for rule in self._rules:
-            #print(rule)
-            if rule[0] not in list(self.rulesNodes.keys()):
-                v = RuleNode(NodeName=rule[0])
-                string = []
-                Variables = []
-                for s in rule[1]:
-                    string.append(s)
-                    if s in self.variables:
-                        Variables.append(s)
-                    elif s == self.null_character:
-                        v.CanBeNull = True
-                    elif s == rule[0]:
-                        v.CanRepeat = True
-                v.NodeString=[]
-                v.NodeVars=[]
-                v.NodeString.append(string)
-                v.NodeVars.append(Variables)
-                self.rulesNodes[rule[0]] = v
-            else:
-                v = self.rulesNodes[rule[0]]
-                string = []
-                Variables = []
-                for s in rule[1]:
-                    string.append(s)
-                    if s in self.variables and s not in v.NodeVars:
-                        Variables.append(s)
-                    elif s == self.null_character:
-                        v.CanBeNull = True
-                    elif s == rule[0]:
-                        v.CanRepeat = True
-                v.NodeString.append(string)
-                v.NodeVars.append(Variables)
-                self.rulesNodes[rule[0]] = v
-                # print(f"Node name :  {self.rulesNodes[rule[0]].NodeName}")
-                # print(f"Node String :  {self.rulesNodes[rule[0]].NodeString}")
-                # print(f"Node Vars : {self.rulesNodes[rule[0]].NodeVars}")
-    
-    def rules(self,str):
+    def prepare(self, cache_dir=None, engines=ENGINES):
         """
-        Grammar's rules property setter
+        Prepares the rules and builds the tables the given engines use. With cache_dir, tables are
+        first read from grammar's cache file in that directory, ignored if stale or corrupt, and
+        the file is rewritten when tables had to be built
 
+        Returns true if the cache file was read
         """
-        # if type(new_rules) is not set:
-        #     raise TypeError("CFG rules must be a set, not '{}'".format(type(new_rules).__name__))
+        loaded = False
+        if cache_dir is not None:
+            try:
+                state = read_grammar_cache(self.cache_path(cache_dir), self.fingerprint())
+            except (OSError, GrammarCacheError):
+                pass
+            else:
+                for name in CFG.CACHED_TABLES:
+                    setattr(self, name, state[name])
+                loaded = True
+        missing = self._missing_tables()
+        self.rules(None)
+        self.is_chomsky()
+        for engine in engines:
+            self._prepare_tables(engine)
+        if cache_dir is not None and (not loaded or self._missing_tables() != missing):
+            # An unwritable cache only costs the next start
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self.save_cache(self.cache_path(cache_dir))
+            except OSError:
+                pass
+        return loaded
 
-        # for rule in new_rules:
-        #     if type(rule) is not tuple:
-        #         raise TypeError("CFG rules must be 2-tuples, not '{}'".format(type(rule).__name__))
-        #     if len(rule) != 2:
-        #         raise TypeError("CFG rules must be 2-tuples")
-        #     if type(rule[0]) is not str or type(rule[1]) is not str:
-        #         raise TypeError("CFG rules must contain strings")
-        #     if string_contains_space(rule[0]) or string_contains_space(rule[1]):
-        #         raise ValueError("Rule cannot contain white spaces : '{} -> {}'".format(*rule))
+    def _missing_tables(self):
+        # Dict tables are filled in place, an empty one is missing
+        return [name for name in CFG.CACHED_TABLES if getattr(self, name) is None or getattr(self, name) == {}]
 
-        # pattern = re.compile('({})+'.format('|'.join(re_escaped(self.variables | self.terminals))))
-        # print(f"the rule pattern : {pattern}")
-        # print(f"rule : {rule}")
-        # for rule in new_rules:
-        #     if rule[0] not in self.variables:
-        #         raise ValueError("Unknown Variable '{p0}' in '{p0} -> {p1}'".format(
-        #             p0=rule[0],
-        #             p1=rule[1]
-        #         ))
-        #     if not pattern.fullmatch(rule[1]):
-        #         raise ValueError("Rule must contain combination of variables and terminals : '{} -> {}'".format(*rule))
-        #     if rule[1].count(self.null_character) and rule[1] != self.null_character:
-        #         raise ValueError("Rule cannot combine null character with variables and terminals : '{} -> {}'".format(
-        #             *rule))
-        # print(f"new rules: {new_rules}")
-        self.rulesNodePrep()
-        self.rulesNodes = dict(reversed(list(self.rulesNodes.items())))
-                    
-        self._is_chamsky = None
-        self._cnf = None
-        self.accepts_null = None
-        if (self.start_variable, self.null_character) in self._rules:
-            self.accepts_null = True
-    def addrule(self,left,right):
-        compact = {left : right}
-        self._rules.add(compact)
-    @property
-    def start_variable(self):
+    def _run_instrumented(self, engine, parse, args, kwargs):
         """
-        Grammar's start_variable property getter
+        Runs an engine's parse method, see instrumented(). With a result_cache, plain parses of an
+        input (no argument but budget) are answered from it when they can
         """
-        return self._start_variable
+        stats = {'engine': engine, 'expanded': 0, 'duplicates_suppressed': 0, 'pruned': {}, 'peak_frontier': 0,
+                 'timings': {}}
+        self.last_stats = stats
+        key = None
+        if self.result_cache is not None and engine in ENGINES and len(args) == 1 and kwargs.keys() <= {'budget'}:
+            started = time.perf_counter()
+            key = (self.fingerprint(), engine, self.use_automaton, self.use_normal_form, args[0])
+            cached = self.result_cache.get(key)
+            stats['cached'] = cached is not None
+            if cached is not None:
+                stats['timings'] = {'prepare': 0.0, 'search': time.perf_counter() - started}
+                return cached[0], self._derivation_from_rules(cached[1]) if cached[0] else None
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        if self.trace_memory:
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        searching = None
+        try:
+            self._prepare_tables(engine)
+            searching = time.perf_counter()
+            result = parse(self, *args, **kwargs)
+            if key is not None:
+                rules = self._derivation_rules(result[1]) if result[0] else ()
+                if rules is not None:
+                    self.result_cache.put(key, result[0], rules)
+            return result
+        finally:
+            finished = time.perf_counter()
+            stats['timings']['prepare'] = (searching or finished) - started
+            stats['timings']['search'] = finished - (searching or finished)
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+                top = snapshot.statistics('lineno')[:5]
+                stats['memory'] = {'allocated': current - before, 'peak': peak - before,
+                                   'top': [str(statistic) for statistic in top]}
+                if tracing:
+                    tracemalloc.stop()
 
-    @start_variable.setter
-    def start_variable(self, new_start_variable):
+    def parse_many(self, strings, engine='Earley', workers=None, chunk_size=256, timeout=None, derivations=False,
+                   budget=None, cache_dir=None):
         """
-        Grammar's start_variable property setter
+        Parses every string of an iterable with the given engine, fanning chunks of chunk_size
+        strings out to a pool of workers processes (os.cpu_count() by default, 1 parses in this
+        process).
+
+        The grammar is prepared once and sent once to every worker. Results are yielded as
+        BatchResult objects in input order while the remaining chunks are parsed. An input
+        raising an error, running longer than timeout seconds or exhausting budget (a
+        SearchBudget without token, defaults to self.budget) only fails its own result.
+        Derivations are sent back only if asked for.
+
+        With cache_dir, the grammar's tables come from its cache file there (see prepare()), and
+        workers load that file instead of receiving the grammar, then take its settings
+        (use_automaton, use_normal_form, budget, trace_hook, trace_memory, result_cache)
         """
-        if type(new_start_variable) is not str:
-            raise TypeError("CFG start variable must be string, not '{}'".format(type(new_start_variable).__name__))
+        if cache_dir is not None:
+            self.prepare(cache_dir, (engine,))
+        self._prepare_engine(engine)
+        return self._parse_many(strings, engine, workers, chunk_size, timeout, derivations, budget, cache_dir)
 
-        if new_start_variable not in self.variables:
-            raise ValueError("Start variable must be in variables set")
+    def _parse_many(self, strings, engine, workers, chunk_size, timeout, derivations, budget, cache_dir=None):
+        strings = iter(strings)
+        chunks = iter(lambda: list(islice(strings, chunk_size)), [])
+        index = 0
 
-        self._start_variable = new_start_variable
-        self._is_chamsky = None
-        self._cnf = None
-        self.accepts_null = None
+        def results(chunk, outcomes):
+            nonlocal index
+            for string, (status, path, error, stats) in zip(chunk, outcomes):
+                node = None
+                for value in path or ():
+                    node = DerivationNode(value, node)
+                yield BatchResult(index, string, status, node, error, stats)
+                index += 1
 
-    @property
-    def null_character(self):
+        if workers == 1:
+            for chunk in chunks:
+                yield from results(chunk, _parse_chunk(self, engine, chunk, timeout, derivations, budget))
+            return
+
+        workers = workers or os.cpu_count() or 1
+        # Workers get the grammar from its cache file when it could be written, pickled otherwise
+        source = self
+        if cache_dir is not None and os.path.exists(self.cache_path(cache_dir)):
+            source = self.cache_path(cache_dir)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(source, self._batch_settings())) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_parse_batch, engine, chunk, timeout, derivations, budget)))
+                while len(pending) > 2 * workers:
+                    yield from results(*self._chunk_outcomes(*pending.popleft()))
+            while pending:
+                yield from results(*self._chunk_outcomes(*pending.popleft()))
+
+    def _batch_settings(self):
+        return {name: getattr(self, name) for name in CFG.BATCH_SETTINGS}
+
+    @staticmethod
+    def _chunk_outcomes(chunk, future):
+        try:
+            return chunk, future.result()
+        except Exception as e:
+            return chunk, [('error', None, str(e), None)] * len(chunk)
+
+    def _derivation_from_tree(self, tree):
         """
-        Grammar's null_character property getter
+        Turns a (variable, symbols, subtrees) parse tree into its leftmost derivation
+
+        Returns the last DerivationNode of the derivation
         """
-        return self._null_character
+        # The terminals left of the leftmost variable are joined once, the rest of the form is
+        # a stack whose top is its leftmost symbol
+        prefix = ''
+        rest = [tree]
+        node = DerivationNode(tree[0])
+        while True:
+            while rest and type(rest[-1]) is str:
+                prefix += rest.pop()
+            if not rest:
+                return node
+            variable, symbols, subtrees = rest.pop()
+            subtrees = iter(subtrees)
+            rest.extend(reversed([next(subtrees) if symbol in self.variables else symbol for symbol in symbols]))
+            node = DerivationNode(prefix + ''.join(item if type(item) is str else item[0] for item in reversed(rest)),
+                                  node)
 
-    @null_character.setter
-    def null_character(self, new_null_character):
+    def _derivation_rules(self, leaf):
         """
-        Grammar's null_character property setter
+        Returns the rules of the leftmost derivation ending at leaf as the tuple of their symbols,
+        shared with analyze().productions, None if its forms are not one
         """
-        if type(new_null_character) is not str:
-            raise TypeError("CFG null character must be string, not '{}'".format(type(new_null_character).__name__))
-
-        if new_null_character not in self.terminals:
-            raise ValueError("Null character must be in terminals set")
+        forms = []
+        while leaf is not None:
+            forms.append(leaf.value)
+            leaf = leaf.parent
+        forms.reverse()
+        analysis = self.analyze()
+        productions = analysis.productions
+        form = [self.start_variable]
+        if not forms or forms[0] != self.start_variable:
+            return None
+        rules = []
+        for following in forms[1:]:
+            position = next((i for i, symbol in enumerate(form) if symbol in self.variables), None)
+            if position is None:
+                return None
+            prefix, suffix = ''.join(form[:position]), ''.join(form[position + 1:])
+            if not following.startswith(prefix) or not following.endswith(suffix) \
+                    or len(following) < len(prefix) + len(suffix):
+                return None
+            replaced = following[len(prefix):len(following) - len(suffix)]
+            symbols = next((productions[index][1] for index in analysis.variable_rules.get(form[position], ())
+                            if ''.join(productions[index][1]) == replaced), None)
+            if symbols is None:
+                return None
+            rules.append(symbols)
+            form[position:position + 1] = symbols
+        return tuple(rules)
 
-        self._null_character = new_null_character
-        self._is_chamsky = None
-        self._cnf = None
-        self.accepts_null = None
-    
-    def DFS(self,input_string,node,nodestr):
-        node = DerivationNode(nodestr,node)
-        current = nodestr
-        if current == input_string:
-            return True, node
-        if len(current) > len(input_string)+1:
-            return False,None
-        for i, char in enumerate(current):
-            if char in self.variables:
-                for production in self.rulesNodes[char].NodeString:
-                    if len(production) == 1 and production[0] in {'λ', 'ε'}:
-                        new_string = current[:i] + current[i + 1:]
-                    else:
-                        new_string = current[:i] + ''.join(production) + current[i + 1:]
-                    print(f"new string : {new_string} & we are at i : {i} & current : {current}")
-                    isTrue,_ = self.DFS(input_string,node,new_string)
-                    if isTrue:
-                        return True,_
-                break
-        return False,None
-        # string_index = 0
-        # self.stack = []
-        # self.stack.append("$")
-        # self.stack.append("S")
-        # print(self.stack)
-        # while True:
-        #     # print(f"current stack = {self.stack}")
-        #     if self.stack[-1] == "$" and string == len(string) * string[0] :
-        #         return True
-        #     c = string[string_index]
-        #     if c == self.stack[-1]:
-        #         self.stack.pop()
-        #         string_list = list(string)
-        #         string_list[string_index] = "_"
-        #         string = "".join(string_list)
-        #         string_index+=1
-        #         self.table.add_row([string,"".join(self.stack[::-1]),f"popped {c}"])
-        #         # print(f"|{string}   |    {self.stack}    |    popped {c}|")
-        #     else:
-        #         if self.stack[-1] in self._variables:
-        #             if c in self.stack[:-1] and self.rulesNodes[self.stack[-1]].CanBeNull and string.count(c) == self.stack.count(c):
-        #                 last_char = self.stack.pop()
-        #                 self.table.add_row([string,"".join(self.stack[::-1]),f"{last_char} became epsilon"])
-        #                 continue
-        #             x,cond = self.recDfs(c,self.rulesNodes[self.stack[-1]])
-        #             print(f"x = {x}")
-        #             if cond:
-        #                 v = self.rulesNodes[self.stack[-1]]
-        #                 self.stack.pop()
-        #                 i = len(v.NodeString[x])
-        #                 while i>0:
-        #                     self.stack.append(v.NodeString[x][i-1])
-        #                     self.table.add_row([{string},"".join(self.stack[::-1]),f"appended {self.stack[-1]}"])
-        #                     # print(f"|{string}   |    {self.stack}    |    appended {self.stack[-1]}|")
-        #                     i-=1
-        #             else:
-        #                 return False
-        #         elif self.stack == "λ":
-        #             continue
-        #         else:
-        #             return False
-
-    def BFS(self, input_string):
-        if type(input_string) is not str:
-            raise TypeError("Input must be a string")
-        queue = deque()
-        queue.append(DerivationNode(self.start_variable))
-        while queue:
-            node = queue.popleft()
-            current = node.value
-
-            if current == input_string:
-                return True, node
-            if len(current) > len(input_string)+2:
-                continue
-            
-            for i, char in enumerate(current):
-                if char in self.variables:
-                    for production in self.rulesNodes[char].NodeString:
-                        if len(production) == 1 and production[0] in {'λ', 'ε'}:
-                            new_string = current[:i] + current[i + 1:]
-                        else:
-                            new_string = current[:i] + ''.join(production) + current[i + 1:]
-
-                        queue.append(DerivationNode(new_string, node))
-                    break
+    def _derivation_from_rules(self, rules):
+        """
+        Replays the rules found by _derivation_rules() from the start variable
 
-        return False, None
+        Returns the last DerivationNode of the derivation
+        """
+        form = [self.start_variable]
+        node = DerivationNode(self.start_variable)
+        for symbols in rules:
+            position = next(i for i, symbol in enumerate(form) if symbol in self.variables)
+            form[position:position + 1] = symbols
+            node = DerivationNode(''.join(form), node)
+        return node
 
     def Derivation_Path(self, leaf):
         path = []
@@ -465,6 +4040,39 @@ class CFG(object):
 
         return line_splitter.join(str_lines)
     
+    def str_stats(self, stats=None):
+        """
+        Returns a human-readable string of the statistics of a parse (defaults to last_stats)
+        """
+        stats = self.last_stats if stats is None else stats
+        if not stats:
+            return ''
+        lines = ["Engine: {}".format(stats['engine'])]
+        if stats.get('cached'):
+            lines.append("Answered from the result cache")
+        if 'normal_form' in stats:
+            lines.append("Searched the grammar's normal form ({})".format(', '.join(stats['normal_form'])))
+        if 'automaton_states' in stats:
+            lines.append("Regular grammar, parsed on a {}-state DFA".format(stats['automaton_states']))
+        lines.append("Steps: {}".format(stats.get('expanded', 0)))
+        if stats.get('duplicates_suppressed'):
+            lines.append("Duplicates suppressed: {}".format(stats['duplicates_suppressed']))
+        if stats.get('pruned'):
+            lines.append("Pruned: {}".format(', '.join(
+                '{} {}'.format(reason, count) for reason, count in sorted(stats['pruned'].items()))))
+        if stats.get('peak_frontier'):
+            lines.append("Peak frontier: {}".format(stats['peak_frontier']))
+        if 'depth' in stats:
+            lines.append("Depth limit: {}".format(stats['depth']))
+        timings = stats.get('timings', {})
+        if timings:
+            lines.append("Time: {:.6f}s preparing, {:.6f}s searching".format(timings['prepare'], timings['search']))
+        if 'memory' in stats:
+            lines.append("Memory: {} bytes allocated, {} bytes at peak".format(
+                stats['memory']['allocated'], stats['memory']['peak']))
+            lines.extend('  ' + line for line in stats['memory']['top'])
+        return '\n'.join(lines)
+
     def __str__(self):
         print_lines = []
         print_lines.append("Variables (V): {}".format(set(self.variables)))
@@ -480,33 +4088,100 @@ class CFG(object):
             print(f"Node Vars : {self.rulesNodes[i].NodeVars}")
 
         return "\n".join(print_lines)
+
+_batch_grammar = None
+
+
+def _init_batch_worker(grammar, settings=None):
+    global _batch_grammar
+    if type(grammar) is str:
+        grammar = CFG.load_cache(grammar)
+        for name, value in (settings or {}).items():
+            setattr(grammar, name, value)
+    _batch_grammar = grammar
+
+
+def _parse_batch(engine, strings, timeout, derivations, budget):
+    return _parse_chunk(_batch_grammar, engine, strings, timeout, derivations, budget)
+
+
+def _raise_timeout(signum, frame):
+    raise ParseTimeout()
+
+
+def _parse_chunk(grammar, engine, strings, timeout, derivations, budget):
+    """
+    Parses strings one by one with grammar's engine
+
+    Returns a (status, derivation forms or None, error message or None, stats) tuple per string
+    """
+    parse = getattr(grammar, engine)
+    # Timeouts rely on SIGALRM, only available on Unix and in the main thread
+    alarm = bool(timeout) and hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    outcomes = []
+    try:
+        for string in strings:
+            try:
+                if alarm:
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+                try:
+                    accepted, node = parse(string, budget=budget)
+                finally:
+                    if alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+            except ParseTimeout:
+                outcomes.append(('timeout', None, None, grammar.last_stats))
+                continue
+            except BudgetExhausted as e:
+                outcomes.append(('exhausted', None, e.reason, grammar.last_stats))
+                continue
+            except Exception as e:
+                outcomes.append(('error', None, str(e), grammar.last_stats))
+                continue
+            path = None
+            if accepted and derivations:
+                path = []
+                while node:
+                    path.append(node.value)
+                    node = node.parent
+                path.reverse()
+            outcomes.append(('accepted' if accepted else 'rejected', path, None, grammar.last_stats))
+    finally:
+        if alarm:
+            signal.signal(signal.SIGALRM, previous)
+    return outcomes
+
     
-g = CFG(terminals={'0', '1','λ'},
-        rules={'S': ['0S','1S','0','1']}
-        )
-g.rules(None)
-print(g.__str__())
 # test_string = input("Enter your string: ")
 # result, node = g.BFS(test_string)
 # print(f"\nString '{test_string}' is accepted by the grammar? {result}")
 # if result:
 #     print("\nLeftmost derivation path:")
 #     print(g.Derivation_Path(node))
-def DARV(node):
+def DARV(grammar, node):
     print("\nLeftmost derivation path:")
-    print(g.Derivation_Path(node))
-def parse_StringBFS():
+    print(grammar.Derivation_Path(node))
+def parse_StringBFS(grammar):
     test_string = input("Enter your string: ")
-    result, node = g.BFS(test_string)
+    result, node = grammar.BFS(test_string)
     print(f"\nString '{test_string}' is accepted by the grammar? {result}")
     # if result:
-    #     DARV(node)
-def parse_StringDFS():
+    #     DARV(grammar, node)
+def parse_StringDFS(grammar):
     test_string = input("Enter your string: ")
-    result, node = g.DFS(test_string,None,"S")
+    result, node = grammar.DFS(test_string,None,grammar.start_variable)
     print(f"\nString '{test_string}' is accepted by the grammar? {result}")
     # if result:
-    #     DARV(node)
+    #     DARV(grammar, node)
 
-# parse_StringBFS()
-# parse_StringDFS()
+
+if __name__ == '__main__':
+    g = CFG(terminals={'0', '1','λ'},
+            rules={'S': ['0S','1S','0','1']}
+            )
+    g.rules(None)
+    print(g.__str__())
+    # parse_StringBFS(g)
+    # parse_StringDFS(g)
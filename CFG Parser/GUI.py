@@ -1,12 +1,19 @@
 import customtkinter as ctk
-from CFGParser import CFG
+import threading
+from queue import Queue, Empty
+from CFGParser import CFG, SearchBudget, BudgetExhausted, CancellationToken, ParseCache
 from tkinter import messagebox
 from time import time
 
 class CFGParserGUI:
     def __init__(self, root):
         self.root = root
-        self.root.title("CFG Parser (using DFS & BFS)")
+        self.root.title("CFG Parser (using DFS, BFS & Earley)")
+        self.grammar_finished = False
+        self.grammar_busy = False
+        self.worker = None
+        # Shared by the grammars entered, repeated parses are answered from it
+        self.result_cache = ParseCache()
         self.create_widgets()
         # self.root.iconbitmap("vi.jpg")
 
@@ -37,8 +44,21 @@ class CFGParserGUI:
         self.parse_button_DFS.pack(pady=10)
         self.parse_button_BFS = ctk.CTkButton(self.root, text="Parse String with BFS", corner_radius=25, fg_color="transparent", border_color="#0A1631", border_width=2, command=self.parse_stringBFS, state="disabled")
         self.parse_button_BFS.pack(pady=10)
+        self.parse_button_Earley = ctk.CTkButton(self.root, text="Parse String with Earley", corner_radius=25, fg_color="transparent", border_color="#0A1631", border_width=2, command=self.parse_stringEarley, state="disabled")
+        self.parse_button_Earley.pack(pady=10)
+
+        self.progress_label = ctk.CTkLabel(self.root, text="")
+        self.progress_label.pack()
+        self.cancel_button = ctk.CTkButton(self.root, text="Cancel", corner_radius=25, fg_color="transparent", border_color="#0A1631", border_width=2, command=self.cancel_parse, state="disabled")
+        self.cancel_button.pack(pady=10)
 
     def finish_grammar(self):
+        # The grammar must not be rebuilt while it is being prepared or used by a parse
+        if self.grammar_busy or self.worker is not None:
+            return
+        self.enter_grammar()
+
+    def enter_grammar(self):
         self.output_text.configure(state="normal")
         self.output_text.delete("1.0", "end")
         
@@ -83,28 +103,85 @@ class CFGParserGUI:
                     has_rules = True
                     for c in prod:
                         if c.islower() or c in ['λ', 'ε']:
-                            NullChar = c
                             Terminals.append(c)
+                        if c in ['λ', 'ε']:
+                            NullChar = c
             
                 except Exception as e:
                     self.output_text.insert("end", "❗ Error: " + str(e) + "\n")
         
         if not has_rules:
             self.output_text.insert("end", "❗ Please enter at least one valid rule.\n")
-            self.parse_button.configure(state="disabled")
+            self.set_parse_buttons("disabled")
             self.grammar_finished = False
             return
-        self.parser = CFG(terminals=Terminals,rules=rules,null_character=NullChar)
-        # Validate the CFG grammar
-        self.output_text.insert("end", "Grammar entry complete.\n")
-        self.grammar_finished = True
+        if not NullChar:
+            NullChar = 'λ'
+            Terminals.append(NullChar)
+        parser = CFG(terminals=Terminals,rules=rules,null_character=NullChar)
+        parser.result_cache = self.result_cache
+        # The grammar is prepared on a worker thread, parses waiting until poll_grammar sees it done
+        self.output_text.insert("end", "Preparing grammar...\n")
+        self.grammar_busy = True
+        self.grammar_finished = False
+        self.set_parse_buttons("disabled")
+        self.finish_button.configure(state="disabled")
+        self.results = Queue()
+        self.worker = threading.Thread(target=self.prepare_grammar, args=(parser,), daemon=True)
+        self.worker.start()
+        self.root.after(100, self.poll_grammar, parser)
+
+    def prepare_grammar(self, parser):
+        # Runs on the worker thread: widgets are only touched by poll_grammar
+        try:
+            parser.rules(None)
+            self.results.put(("done", None, None))
+        except Exception as e:
+            self.results.put(("error", e, None))
+
+    def poll_grammar(self, parser):
+        try:
+            outcome, value, _ = self.results.get_nowait()
+        except Empty:
+            self.root.after(100, self.poll_grammar, parser)
+            return
+
+        self.worker = None
+        self.grammar_busy = False
+        self.finish_button.configure(state="normal")
+        self.output_text.configure(state="normal")
+        if outcome == "done":
+            self.parser = parser
+            self.output_text.insert("end", "Grammar entry complete.\n")
+            self.grammar_finished = True
+            self.set_parse_buttons("normal")
+        else:
+            self.output_text.insert("end", "❗ Error: " + str(value) + "\n")
         # self.output_text.configure(state="disabled")
-        self.parse_button_DFS.configure(state="normal")
-        self.parse_button_BFS.configure(state="normal")
+
+    def set_parse_buttons(self, state):
+        self.parse_button_DFS.configure(state=state)
+        self.parse_button_BFS.configure(state=state)
+        self.parse_button_Earley.configure(state=state)
 
 
 
     def parse_stringBFS(self):
+        self.parse_string("BFS")
+
+    def parse_stringDFS(self):
+        self.parse_string("DFS")
+
+    def parse_stringEarley(self):
+        self.parse_string("Earley")
+
+    def parse_string(self, engine):
+        """
+        Parses the entered string with engine on a worker thread, the window polling it for
+        progress and for the outcome
+        """
+        if self.grammar_busy or self.worker is not None:
+            return
         if not self.grammar_finished:
             messagebox.showwarning("Grammar not finished", "Please finish grammar entry first.")
             return
@@ -117,50 +194,72 @@ class CFGParserGUI:
             self.output_text.configure(state="disabled")
             return
 
+        self.output_text.insert("end", f"Parsing '{target}' with {engine}...\n")
+        self.output_text.configure(state="disabled")
+        self.token = CancellationToken()
+        self.progress = (0, 0)
+        self.results = Queue()
+        budget = SearchBudget(token=self.token, progress=self.report_progress)
+        self.worker = threading.Thread(target=self.run_parse, args=(engine, target, budget), daemon=True)
+        self.set_parse_buttons("disabled")
+        self.finish_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.started = time()
+        self.worker.start()
+        self.root.after(100, self.poll_parse, engine, target)
+
+    def run_parse(self, engine, target, budget):
+        # Runs on the worker thread: widgets are only touched by poll_parse
         try:
             self.parser.rules(None)
-            start = time()
-            result, node = self.parser.BFS(target)
-            end = time()
-            if result:
-                self.output_text.insert("end", f"✅ The string '{target}' is accepted by the grammar.\n\nDerivation Path:\n")
-                self.output_text.insert("end", self.parser.Derivation_Path(node))
-                self.output_text.insert("end", f"\nTime took with BFS : {end-start}")
-            else:
-                self.output_text.insert("end", f"❌ The string '{target}' is NOT accepted by the grammar.\n")
+            result, node = getattr(self.parser, engine)(target, budget=budget)
+            self.results.put(("done", (result, node), self.parser.str_stats()))
+        except BudgetExhausted as e:
+            self.results.put(("exhausted", e, self.parser.str_stats()))
         except Exception as e:
-            self.output_text.insert("end", f"❗ Error during parsing: {str(e)}\n")
+            self.results.put(("error", e, None))
 
-        self.output_text.configure(state="disabled")
-    
-    def parse_stringDFS(self):
-        if not self.grammar_finished:
-            messagebox.showwarning("Grammar not finished", "Please finish grammar entry first.")
-            return
-        target = self.string_entry.get().strip()
-        self.output_text.configure(state="normal")
-        self.output_text.delete("1.0", "end")
+    def report_progress(self, expanded, frontier, elapsed):
+        self.progress = (expanded, frontier)
 
-        if not target:
-            self.output_text.insert("end", "❗ Please enter a non-empty string.\n")
-            self.output_text.configure(state="disabled")
-            return
+    def cancel_parse(self):
+        if self.worker is not None:
+            self.token.cancel()
+            self.cancel_button.configure(state="disabled")
 
+    def poll_parse(self, engine, target):
         try:
-            self.parser.rules(None)
-            start = time()
-            result, node = self.parser.DFS(target,None,self.parser._start_variable)
-            end = time()
+            outcome, value, stats = self.results.get_nowait()
+        except Empty:
+            expanded, frontier = self.progress
+            self.progress_label.configure(
+                text=f"{engine}: {expanded} nodes expanded, frontier {frontier}, {time() - self.started:.1f}s")
+            self.root.after(100, self.poll_parse, engine, target)
+            return
+
+        self.worker = None
+        self.progress_label.configure(text="")
+        self.cancel_button.configure(state="disabled")
+        self.finish_button.configure(state="normal")
+        self.set_parse_buttons("normal")
+        self.output_text.configure(state="normal")
+        self.output_text.delete("1.0", "end")
+        if outcome == "done":
+            result, node = value
             if result:
                 self.output_text.insert("end", f"✅ The string '{target}' is accepted by the grammar.\n\nDerivation Path:\n")
-                self.output_text.insert("end", self.parser.Derivation_Path(node))
-                self.output_text.insert("end", f"\nTime took with DFS : {end-start}")
-                
+                self.output_text.insert("end", self.parser.Derivation_Path(node) + "\n")
             else:
                 self.output_text.insert("end", f"❌ The string '{target}' is NOT accepted by the grammar.\n")
-        except Exception as e:
-            self.output_text.insert("end", f"❗ Error during parsing: {str(e)}\n")
-
+        elif outcome == "exhausted":
+            if value.reason == "cancelled":
+                self.output_text.insert("end", f"⏹ Parsing '{target}' was cancelled after {value.expanded} nodes expanded.\n")
+            else:
+                self.output_text.insert("end", f"❗ Gave up parsing '{target}': {value}\n")
+        else:
+            self.output_text.insert("end", f"❗ Error during parsing: {str(value)}\n")
+        if stats:
+            self.output_text.insert("end", "\nStatistics:\n" + stats)
         self.output_text.configure(state="disabled")
 
     def insert_epsilon(self):
@@ -170,9 +269,10 @@ def boom():
     ctk.set_appearance_mode("system")
     ctk.set_default_color_theme("dark-blue")
     root = ctk.CTk()
-    root.geometry("500x650")
+    root.geometry("500x790")
     root.resizable(False, False)
     app = CFGParserGUI(root)
     root.mainloop()
 
-boom()
+if __name__ == '__main__':
+    boom()
@@ -0,0 +1,388 @@
+"""
+Local parse server keeping grammars prepared between requests.
+
+Grammars are registered once, prepared (and read from or written to a grammar cache directory if
+one is given) and kept in memory under their fingerprint. Clients then send batches of inputs to
+parse, each request under its own SearchBudget, over keep-alive HTTP/1.1 connections on localhost
+or on a Unix socket. Requests are answered by concurrent threads.
+
+A budget's deadline bounds the whole request: the parse running when it passes is cancelled and
+the inputs left are not parsed, all of them coming back 'exhausted' with the error 'deadline'. Its
+other limits (max_expanded, max_frontier, max_memory) bound each input's parse.
+
+    python Server.py --port 8765 --cache-dir grammar-cache
+    python Server.py --unix /tmp/cfgparser.sock
+
+Requests and responses are JSON:
+
+    POST /grammars      {"rules": {"S": ["0S", "1S", "0", "1"]}, "terminals": ["0", "1", "λ"],
+                         "start_variable": "S", "null_character": "λ", "engines": ["Earley"]}
+                        -> {"grammar": id, "cached": bool}
+    GET /grammars       -> {"grammars": [id, ...]}
+    DELETE /grammars/id
+    POST /parse         {"grammar": id, "engine": "Earley", "inputs": ["001", ...],
+                         "derivations": false, "budget": {"deadline": 2, "max_expanded": 100000}}
+                        -> {"results": [{"input", "status", "error", "derivation", "stats"}, ...]}
+    GET /stats          -> result cache statistics per grammar
+
+Only terminals, rules, start_variable and null_character are needed to register a grammar:
+without terminals, every character of the rules that is not a variable is one.
+"""
+import os
+import sys
+import json
+import socket
+import argparse
+import threading
+import socketserver
+import http.client
+from copy import copy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from CFGParser import CFG, ENGINES, SearchBudget, ParseCache, CancellationToken
+
+BUDGET_LIMITS = ('max_expanded', 'max_frontier', 'deadline', 'max_memory')
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class GrammarRegistry():
+    """
+    Grammars registered on the server, by fingerprint, with the lock serializing the preparation
+    of their tables
+    """
+    def __init__(self, cache_dir=None, cache_entries=1024):
+        self.cache_dir = cache_dir
+        self.cache_entries = cache_entries
+        self.grammars = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec):
+        """
+        Returns the id of the grammar described by spec, preparing it unless it is registered,
+        and whether its tables were ready (registered before or read from the grammar cache)
+        """
+        grammar = build_grammar(spec)
+        engines = spec.get('engines', ENGINES)
+        unknown = [engine for engine in engines if engine not in ENGINES]
+        if unknown:
+            raise RequestError(400, "Unknown engines {}, expected some of {}".format(unknown, ', '.join(ENGINES)))
+        identifier = grammar.fingerprint().hex()
+        with self._lock:
+            entry = self.grammars.get(identifier)
+        if entry is not None:
+            with entry[1]:
+                entry[0].prepare(engines=engines)
+            return identifier, True
+        cached = grammar.prepare(self.cache_dir, engines)
+        if self.cache_entries:
+            grammar.result_cache = ParseCache(max_entries=self.cache_entries)
+        with self._lock:
+            self.grammars.setdefault(identifier, (grammar, threading.Lock()))
+        return identifier, cached
+
+    def unregister(self, identifier):
+        with self._lock:
+            if self.grammars.pop(identifier, None) is None:
+                raise RequestError(404, "Unknown grammar '{}'".format(identifier))
+
+    def ids(self):
+        with self._lock:
+            return list(self.grammars)
+
+    def parser(self, identifier, engine):
+        """
+        Returns a copy of a registered grammar, with engine's tables prepared, for one request:
+        copies share the tables and the result cache but not their last_stats
+        """
+        if engine not in ENGINES:
+            raise RequestError(400, "Unknown engine '{}', expected one of {}".format(engine, ', '.join(ENGINES)))
+        with self._lock:
+            entry = self.grammars.get(identifier)
+        if entry is None:
+            raise RequestError(404, "Unknown grammar '{}'".format(identifier))
+        grammar, lock = entry
+        with lock:
+            grammar.prepare(engines=(engine,))
+        return copy(grammar)
+
+    def stats(self):
+        with self._lock:
+            grammars = list(self.grammars.items())
+        return {identifier: grammar.result_cache.stats() if grammar.result_cache is not None else None
+                for identifier, (grammar, _) in grammars}
+
+
+def build_grammar(spec):
+    """
+    Returns the CFG described by a registration request
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get('rules'), dict):
+        raise RequestError(400, "A grammar needs rules, as an object mapping variables to their productions")
+    rules = spec['rules']
+    null_character = spec.get('null_character', 'λ')
+    terminals = spec.get('terminals')
+    if terminals is None:
+        terminals = {symbol for productions in rules.values() for production in productions
+                     for symbol in production if symbol not in rules}
+    terminals = set(terminals) | {null_character}
+    try:
+        return CFG(variables=spec.get('variables'), terminals=terminals, rules=rules,
+                   start_variable=spec.get('start_variable', 'S'), null_character=null_character)
+    except (TypeError, ValueError) as e:
+        raise RequestError(400, str(e))
+
+
+def request_budget(limits, defaults):
+    """
+    Returns the SearchBudget of a parse request: its limits, each capped by the server's
+    """
+    limits = limits or {}
+    if not isinstance(limits, dict) or not set(limits) <= set(BUDGET_LIMITS):
+        raise RequestError(400, "A budget is an object of some of {}".format(', '.join(BUDGET_LIMITS)))
+    values = {}
+    for name in BUDGET_LIMITS:
+        value, default = limits.get(name), defaults.get(name)
+        if value is not None and not isinstance(value, (int, float)):
+            raise RequestError(400, "Budget {} must be a number".format(name))
+        values[name] = default if value is None else value if default is None else min(value, default)
+    return SearchBudget(**values)
+
+
+def parse(registry, request, defaults):
+    """
+    Answers a parse request
+    """
+    if not isinstance(request, dict):
+        raise RequestError(400, "A parse request is an object")
+    inputs = request.get('inputs')
+    if inputs is None and 'input' in request:
+        inputs = [request['input']]
+    if not isinstance(inputs, list) or not all(isinstance(string, str) for string in inputs):
+        raise RequestError(400, "Inputs must be a list of strings")
+    grammar = registry.parser(request.get('grammar'), request.get('engine', 'Earley'))
+    budget = request_budget(request.get('budget'), defaults)
+    derivations = bool(request.get('derivations'))
+    # parse_many starts the budget again for every input, the deadline of the whole request is kept
+    # by cancelling the budget's token when it passes
+    budget.token = CancellationToken()
+    timer = None
+    if budget.deadline is not None:
+        timer = threading.Timer(budget.deadline, budget.token.cancel)
+        timer.daemon = True
+        timer.start()
+
+    def pending():
+        for string in inputs:
+            if budget.token.cancelled:
+                return
+            yield string
+
+    results = []
+    try:
+        for item in grammar.parse_many(pending(), request.get('engine', 'Earley'), workers=1, chunk_size=1,
+                                       derivations=derivations, budget=budget):
+            error = 'deadline' if item.status == 'exhausted' and item.error == 'cancelled' else item.error
+            result = {'input': item.string, 'status': item.status, 'error': error, 'stats': item.stats}
+            if derivations:
+                forms = []
+                node = item.node
+                while node is not None:
+                    forms.append(node.value)
+                    node = node.parent
+                result['derivation'] = forms[::-1] or None
+            results.append(result)
+    finally:
+        if timer is not None:
+            timer.cancel()
+    for string in inputs[len(results):]:
+        result = {'input': string, 'status': 'exhausted', 'error': 'deadline', 'stats': None}
+        if derivations:
+            result['derivation'] = None
+        results.append(result)
+    return {'results': results}
+
+
+class ParseRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can send many requests, pipelined or not, on one connection
+    protocol_version = 'HTTP/1.1'
+    server_version = 'CFGParser'
+
+    @property
+    def disable_nagle_algorithm(self):
+        # Headers and body are written apart, which Nagle's algorithm would hold back on TCP
+        return self.server.address_family != getattr(socket, 'AF_UNIX', None)
+
+    def do_GET(self):
+        self.answer(lambda _: self.route('GET'))
+
+    def do_POST(self):
+        self.answer(lambda body: self.route('POST', body))
+
+    def do_DELETE(self):
+        self.answer(lambda _: self.route('DELETE'))
+
+    def route(self, method, body=None):
+        registry = self.server.registry
+        path = self.path.rstrip('/')
+        if method == 'POST' and path == '/grammars':
+            identifier, cached = registry.register(body)
+            return {'grammar': identifier, 'cached': cached}
+        if method == 'GET' and path == '/grammars':
+            return {'grammars': registry.ids()}
+        if method == 'DELETE' and path.startswith('/grammars/'):
+            registry.unregister(path[len('/grammars/'):])
+            return {}
+        if method == 'POST' and path == '/parse':
+            return parse(registry, body, self.server.budget_defaults)
+        if method == 'GET' and path == '/stats':
+            return {'grammars': registry.stats()}
+        raise RequestError(404, "No {} {}".format(method, self.path))
+
+    def answer(self, handle):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > self.server.max_body:
+                self.close_connection = True
+                raise RequestError(413, "Request body larger than {} bytes".format(self.server.max_body))
+            body = None
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError as e:
+                    raise RequestError(400, "Invalid JSON: {}".format(e))
+            status, response = 200, handle(body)
+        except RequestError as e:
+            status, response = e.status, {'error': str(e)}
+        except Exception as e:
+            status, response = 500, {'error': '{}: {}'.format(type(e).__name__, e)}
+        data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+if hasattr(socket, 'AF_UNIX'):
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def make_server(registry, host='127.0.0.1', port=8765, unix_socket=None, budget_defaults=None,
+                max_body=16 * 1024 * 1024, verbose=False):
+    """
+    Returns the server answering requests on host and port, or on unix_socket if it is given
+    """
+    if unix_socket is not None:
+        server = ThreadingUnixHTTPServer(unix_socket, ParseRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ParseRequestHandler)
+        server.daemon_threads = True
+    server.registry = registry
+    server.budget_defaults = budget_defaults or {}
+    server.max_body = max_body
+    server.verbose = verbose
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class ParseClient():
+    """
+    Client of a parse server keeping one connection open, for a host and port or a Unix socket
+
+    Raises RuntimeError with the server's message when a request fails
+    """
+    def __init__(self, host='127.0.0.1', port=8765, unix_socket=None, timeout=None):
+        if unix_socket is not None:
+            self.connection = UnixHTTPConnection(unix_socket, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout)
+
+    def request(self, method, path, body=None):
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        headers = {'Content-Type': 'application/json'} if data is not None else {}
+        self.connection.request(method, path, data, headers)
+        response = self.connection.getresponse()
+        answer = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(answer.get('error', response.reason))
+        return answer
+
+    def register(self, rules, terminals=None, start_variable='S', null_character='λ', engines=ENGINES):
+        """
+        Registers a grammar, returns its id
+        """
+        spec = {'rules': rules, 'start_variable': start_variable, 'null_character': null_character,
+                'engines': list(engines)}
+        if terminals is not None:
+            spec['terminals'] = list(terminals)
+        return self.request('POST', '/grammars', spec)['grammar']
+
+    def parse(self, grammar, inputs, engine='Earley', derivations=False, **budget):
+        """
+        Parses a batch of inputs with a registered grammar, under budget's limits (keyword
+        arguments named like SearchBudget's, the deadline bounding the whole batch)
+
+        Returns a result object per input
+        """
+        request = {'grammar': grammar, 'engine': engine, 'inputs': list(inputs), 'derivations': derivations,
+                   'budget': budget}
+        return self.request('POST', '/parse', request)['results']
+
+    def close(self):
+        self.connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve CFGParser's engines, keeping registered grammars prepared")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Unix socket to listen on instead of host and port")
+    parser.add_argument('--cache-dir', help="directory of grammar cache files, read and written on registration")
+    parser.add_argument('--cache-entries', type=int, default=1024, help="parse results cached per grammar, 0 for none")
+    parser.add_argument('--deadline', type=float, default=10.0, help="seconds allowed per parse request at most")
+    parser.add_argument('--max-expanded', type=int, help="steps allowed per parse at most")
+    parser.add_argument('--max-frontier', type=int, help="frontier size allowed per parse at most")
+    parser.add_argument('--max-body', type=int, default=16 * 1024 * 1024, help="largest request body in bytes")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    registry = GrammarRegistry(args.cache_dir, args.cache_entries)
+    defaults = {'deadline': args.deadline, 'max_expanded': args.max_expanded, 'max_frontier': args.max_frontier}
+    server = make_server(registry, args.host, args.port, args.unix, defaults, args.max_body, args.verbose)
+    print("Serving on {}".format(args.unix or '{}:{}'.format(args.host, args.port)), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix:
+            os.remove(args.unix)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'CFG Parser'))
+
+from CFGParser import CFG  # noqa: E402
+
+
+def make_grammar(rules, terminals=('a', 'b', 'c', 'λ'), variables=(), start_variable='S', **settings):
+    """
+    Returns a prepared CFG of rules (a dict of productions), settings (use_automaton,
+    use_normal_form, result_cache, budget...) being set on it after it is prepared
+    """
+    g = CFG(variables=set(rules) | set(variables), terminals=set(terminals), rules=rules,
+            start_variable=start_variable)
+    g.rules(None)
+    for name, value in settings.items():
+        setattr(g, name, value)
+    return g
+
+
+@pytest.fixture
+def grammar():
+    return make_grammar
+
+
+@pytest.fixture
+def forms():
+    def forms(leaf):
+        """
+        Returns the sentential forms of the derivation ending at leaf, first to last
+        """
+        path = []
+        while leaf is not None:
+            path.append(leaf.value)
+            leaf = leaf.parent
+        return path[::-1]
+    return forms
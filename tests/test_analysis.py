@@ -0,0 +1,66 @@
+import pytest
+
+RULES = {'S': ['AB', 'aS', 'C'], 'A': ['a', 'λ'], 'B': ['bB', 'b', 'N'], 'N': ['λ'], 'C': ['Cc'], 'D': ['d']}
+TERMINALS = ('a', 'b', 'c', 'd', 'λ')
+
+
+@pytest.fixture
+def analysis(grammar):
+    return grammar(RULES, terminals=TERMINALS).analyze()
+
+
+def test_facts(analysis):
+    assert analysis.nullable == set(analysis.null_trees) == {'S', 'A', 'B', 'N'}
+    assert analysis.min_length == {'S': 0, 'A': 0, 'B': 0, 'N': 0, 'D': 1}
+    assert analysis.productive == {'S', 'A', 'B', 'N', 'D'}
+    assert analysis.reachable == {'S', 'A', 'B', 'C', 'N'}
+    assert analysis.first == {'S': {'a', 'b'}, 'A': {'a'}, 'B': {'b'}, 'N': set(), 'C': set(), 'D': {'d'}}
+    # C derives no string, so S -> C is never tried
+    assert sorted(analysis.replacements['S']) == ['AB', 'aS']
+    assert sorted(analysis.replacements['B']) == ['N', 'b', 'bB']
+    assert analysis.replacements['N'] == ['']
+    assert analysis.cyclic == set()
+
+
+def test_null_trees_derive_the_empty_string(analysis):
+    def leaves(tree):
+        return ''.join(leaves(child) for child in tree[2])
+    for variable, tree in analysis.null_trees.items():
+        assert tree[0] == variable and leaves(tree) == ''
+
+
+@pytest.mark.parametrize('rules, cyclic', [
+    ({'S': ['A', 'a'], 'A': ['S', 'b']}, {'S', 'A'}),
+    ({'S': ['SA', 'a'], 'A': ['λ']}, {'S'}),
+    ({'S': ['SA', 'a'], 'A': ['b']}, set()),
+])
+def test_cyclic_variables(grammar, rules, cyclic):
+    assert grammar(rules).analyze().cyclic == cyclic
+
+
+@pytest.mark.parametrize('form, target, reason', [
+    ('aS', 'b', 'prefix'),
+    ('aaS', 'a', 'prefix'),      # terminal prefix longer than the target
+    ('ab', 'ab', None),
+    ('ab', 'abb', 'length'),     # no variable left and lengths differ
+    ('C', 'c', 'unproductive'),  # C derives no string
+    ('DD', 'd', 'length'),       # shortest string too long
+    ('bB', 'b', None),
+    ('BBa', 'ba', None),
+    ('BBa', 'a', None),          # B is nullable, so a can come first
+    ('Bb', 'a', 'first'),        # a is not in FIRST(Bb)
+    ('S', '', None),
+])
+def test_prune_reason(analysis, form, target, reason):
+    assert analysis.prune_reason(form, target) == reason
+    assert analysis.viable(form, target) is (reason is None)
+    # The same form after a matched prefix of the target
+    assert analysis.prune_reason(form, 'ab' + target, 2) == reason
+
+
+def test_pruned_bfs_rejects_instead_of_looping(grammar):
+    # Without pruning, S -> aS keeps growing forms that can never match 'ba'
+    g = grammar(RULES, terminals=TERMINALS)
+    assert not g.BFS('ba')[0]
+    assert not g.BFS('c')[0]
+    assert g.BFS('aab')[0] and g.BFS('')[0]
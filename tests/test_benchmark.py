@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from Benchmark import compare, summary, main
+
+
+def record(engine, length, status, seconds, expected='accepted', family='ambiguous'):
+    return {'family': family, 'engine': engine, 'length': length, 'input_length': length, 'expected': expected,
+            'status': status, 'seconds': seconds, 'correct': status not in ('accepted', 'rejected') or status == expected}
+
+
+@pytest.fixture
+def baseline():
+    return {'results': [
+        record('Earley', 4, 'accepted', 0.010),
+        record('Earley', 8, 'accepted', 0.020),
+        record('BFS', 4, 'accepted', 0.010),
+        record('BFS', 8, 'exhausted', 2.0),
+        record('LL1', 4, 'unsupported', 0.001),
+    ]}
+
+
+def test_compare_reports_lost_decisions_wrong_answers_and_slowdowns(baseline):
+    report = {'results': [
+        record('Earley', 4, 'accepted', 0.012),    # within the tolerance
+        record('Earley', 8, 'accepted', 0.040),    # twice as slow
+        record('BFS', 4, 'exhausted', 2.0),        # decided in the baseline
+        record('BFS', 8, 'rejected', 0.5),         # wrong answer
+        record('LL1', 4, 'unsupported', 0.001),
+        record('CYK', 4, 'accepted', 0.001),       # not in the baseline
+    ]}
+    assert compare(report, baseline, 0.5, 0.005) == [
+        'ambiguous Earley length 8 (accepted): 0.0400s, baseline 0.0200s',
+        'ambiguous BFS length 4 (accepted): accepted in the baseline, now exhausted',
+        'ambiguous BFS length 8 (accepted): wrong answer rejected',
+    ]
+    # A slowdown shorter than min_delta is noise
+    assert len(compare(report, baseline, 0.5, 0.05)) == 2
+    assert compare(baseline, baseline, 0.0, 0.0) == []
+
+
+def test_summary_lists_the_longest_decided_input(baseline):
+    lines = summary(baseline).splitlines()
+    assert [cell.strip() for cell in lines[1].split('|')[1:-1]] == ['Family', 'BFS', 'Earley', 'LL1']
+    assert [cell.strip() for cell in lines[3].split('|')[1:-1]] == ['ambiguous', '4', '8', 'n/a']
+
+
+def test_run_against_its_own_baseline(tmp_path):
+    output = str(tmp_path / 'results.json')
+    arguments = ['--families', 'binary', 'ambiguous', '--engines', 'CYK', 'Earley', '--lengths', '2', '4',
+                 '--output', output]
+    assert main(arguments) == 0
+    with open(output) as results:
+        report = json.load(results)
+    assert len(report['results']) == 2 * 2 * 2 * 2
+    assert all(result['correct'] and result['status'] == result['expected'] for result in report['results'])
+    assert main(arguments[:-2] + ['--baseline', output, '--tolerance', '100']) == 0
@@ -0,0 +1,38 @@
+from CFGParser import DerivationRecords
+
+
+def test_equal_forms_are_expanded_once(grammar, forms):
+    # aB is reached from AB directly and through CB
+    g = grammar({'S': ['AB'], 'A': ['a', 'C'], 'C': ['a'], 'B': ['b']}, use_normal_form=False)
+    accepted, leaf = g.BFS('ab')
+    assert accepted and forms(leaf) == ['S', 'AB', 'aB', 'ab']
+    assert g.last_stats['expanded'] == 4
+    assert g.last_stats['duplicates_suppressed'] == 1
+
+
+def test_ambiguous_grammar_keeps_a_shortest_derivation(grammar, forms):
+    g = grammar({'S': ['SS', 'a']})
+    accepted, leaf = g.BFS('a' * 6)
+    path = forms(leaf)
+    assert accepted and path[-1] == 'a' * 6
+    # Five S -> SS steps and six S -> a ones, whatever the order
+    assert len(path) == 12
+    assert g.last_stats['duplicates_suppressed'] > 0
+    assert len(set(path)) == len(path)
+    assert not g.BFS('a' * 6 + 'b')[0]
+
+
+def test_records_replay_the_derivation(grammar):
+    g = grammar({'S': ['aSb', 'A'], 'A': ['cA', 'λ']})
+    productions = g.compile().productions
+    rule = {production: index for index, production in enumerate(productions)}
+    records = DerivationRecords()
+    index = records.append(-1, 0, -1, 1)
+    for position, production, length in [(0, ('S', ('a', 'S', 'b')), 3), (1, ('S', ('a', 'S', 'b')), 5),
+                                         (2, ('S', ('A',)), 5), (2, ('A', ('c', 'A')), 6), (3, ('A', ()), 5)]:
+        index = records.append(index, position, rule[production], length)
+    assert len(records) == 6 and list(records.lengths) == [1, 3, 5, 5, 6, 5]
+    expected = ['S', 'aSb', 'aaSbb', 'aaAbb', 'aacAbb', 'aacbb']
+    leaf = records.derivation(index, 'S', productions)
+    assert g.Derivation_Path(leaf) == '\n'.join('  |- ' + form for form in expected)
+    assert g.Derivation_Path(g.BFS('aacbb')[1]) == g.Derivation_Path(leaf)
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from CFGParser import SearchBudget, CancellationToken, BudgetExhausted
+
+ENDLESS = {'S': ['SS', 'a', 'bc', 'λ']}
+
+
+@pytest.fixture
+def endless(grammar):
+    # Without its normal form the search never runs out of forms to expand
+    return grammar(ENDLESS, use_automaton=False, use_normal_form=False)
+
+
+@pytest.mark.parametrize('engine, limit, reason', [
+    (engine, limit, reason)
+    for limit, reason in [
+        ({'max_expanded': 500}, 'expanded'),
+        ({'deadline': 0.05, 'check_interval': 16}, 'deadline'),
+        ({'max_memory': 1, 'check_interval': 1}, 'memory'),
+    ]
+    for engine in ('BFS', 'DFS')
+] + [
+    # BFS's queue holds one form per length here, only DFS's stack grows without bound
+    ('DFS', {'max_frontier': 20}, 'frontier'),
+])
+def test_limits_raise_instead_of_rejecting(endless, engine, limit, reason):
+    with pytest.raises(BudgetExhausted) as raised:
+        getattr(endless, engine)('aab', budget=SearchBudget(**limit))
+    assert raised.value.reason == reason
+    assert raised.value.expanded > 0
+
+
+def test_every_parse_counts_from_zero(endless):
+    budget = SearchBudget(max_expanded=500)
+    for _ in range(3):
+        with pytest.raises(BudgetExhausted) as raised:
+            endless.BFS('aab', budget=budget)
+        assert raised.value.expanded == 501
+    assert budget.expanded == 0
+    assert endless.BFS('aa', budget=budget)[0]
+
+
+def test_default_budget(endless):
+    endless.budget = SearchBudget(max_expanded=100)
+    with pytest.raises(BudgetExhausted) as raised:
+        endless.DFS('aab')
+    assert raised.value.expanded == 101
+    with pytest.raises(BudgetExhausted) as raised:
+        endless.DFS('aab', budget=SearchBudget(max_expanded=300))
+    assert raised.value.expanded == 301
+
+
+def test_cancelled_token(endless):
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(BudgetExhausted) as raised:
+        endless.BFS('aab', budget=SearchBudget(token=token, check_interval=1))
+    assert raised.value.reason == 'cancelled'
+
+
+
+def test_cancel_from_another_thread(endless):
+    token = CancellationToken()
+    steps = []
+
+    def progress(expanded, frontier, elapsed):
+        steps.append(expanded)
+        if len(steps) == 3:
+            threading.Thread(target=token.cancel).start()
+
+    with pytest.raises(BudgetExhausted) as raised:
+        endless.DFS('aab', budget=SearchBudget(token=token, check_interval=32, progress=progress))
+    assert raised.value.reason == 'cancelled'
+    assert steps[:3] == [32, 64, 96]
@@ -0,0 +1,54 @@
+EXPRESSIONS = {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}
+EXPRESSION_TERMINALS = ('a', '+', '*', '(', ')', 'λ')
+
+
+def test_symbols_and_rule_offsets(grammar):
+    g = grammar(EXPRESSIONS, terminals=EXPRESSION_TERMINALS, start_variable='E')
+    compiled = g.compile()
+    assert compiled.symbols == ('E', 'F', 'T', '(', ')', '*', '+', 'a')
+    assert compiled.variable_count == 3 and compiled.start == 0
+    assert list(compiled.offsets) == [0, 2, 4, 6]
+    for code in range(compiled.variable_count):
+        for rule in range(compiled.offsets[code], compiled.offsets[code + 1]):
+            variable, symbols = compiled.productions[rule]
+            assert compiled.lhs[rule] == code and compiled.symbols[code] == variable
+            assert compiled.rhs[rule] == tuple(compiled.codes[symbol] for symbol in symbols)
+    assert compiled.encode('a+a') == [7, 6, 7]
+    assert compiled.encode('a-a') is None
+
+
+def test_rules_called_again_keeps_the_tables(grammar):
+    g = grammar({'S': ['aSb', 'A'], 'A': ['cA', 'λ']})
+    compiled, analysis, facts = g.compile(), g.analyze(), g.search_facts()
+    nodes = {variable: [list(string) for string in node.NodeString] for variable, node in g.rulesNodes.items()}
+    g.rules(None)
+    g.rules(None)
+    assert g.compile() is compiled and g.analyze() is analysis and g.search_facts() is facts
+    assert {variable: node.NodeString for variable, node in g.rulesNodes.items()} == nodes
+    assert len(compiled.productions) == len(set(compiled.productions)) == 4
+    assert g.BFS('acb')[0] and g.DFS('acb')[0] and not g.Earley('abc')[0]
+
+
+def test_changed_start_variable_is_compiled_again(grammar):
+    g = grammar({'S': ['aA'], 'A': ['b', 'bA']}, use_automaton=False)
+    compiled, facts = g.compile(), g.search_facts()
+    g.start_variable = 'A'
+    g.rules(None)
+    assert g.compile() is not compiled and g.search_facts() is not facts
+    assert g.BFS('bb')[0] and g.DFS('bb')[0] and not g.BFS('abb')[0]
+
+
+def test_with_rows_keeps_the_other_rows(grammar):
+    g = grammar(EXPRESSIONS, terminals=EXPRESSION_TERMINALS, start_variable='E')
+    compiled = g.compile()
+    edited_rules = dict(EXPRESSIONS, T=['F*T', 'F'])
+    fresh = grammar(edited_rules, terminals=EXPRESSION_TERMINALS, start_variable='E').compile()
+    rules = {(variable, production) for variable, productions in edited_rules.items() for production in productions}
+    edited = compiled.with_rows(rules, {'T': [rule for rule in fresh.productions if rule[0] == 'T']})
+    for name in ('rules', 'productions', 'symbols', 'lhs', 'rhs', 'offsets', 'start'):
+        assert getattr(edited, name) == getattr(fresh, name)
+    assert edited.rhs[:4] == compiled.rhs[:4]
+    # Rows using a symbol that is new or no longer used are numbered again from scratch
+    assert compiled.with_rows(rules, {'T': [('T', ('F',))]}) is None
+    assert compiled.with_rows(rules, {'T': [('T', ('F', '-', 'T'))]}) is None
+    assert compiled.with_rows(rules, {'X': [('X', ('a',))]}) is None
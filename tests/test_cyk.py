@@ -0,0 +1,13 @@
+def test_cyk_accepts_language(grammar):
+    g = grammar({'S': ['aSb', 'ab']})
+    assert [g.CYK(w)[0] for w in ['ab', 'aabb', 'aaabbb', 'aab', 'ba', '']] == [True, True, True, False, False, False]
+
+
+def test_cyk_unit_rule_to_null_only_variable(grammar):
+    g = grammar({'S': ['aSb', 'C'], 'C': ['λ']})
+    assert [g.CYK(w)[0] for w in ['', 'ab', 'aabb', 'aab']] == [True, True, True, False]
+
+
+def test_cyk_unit_rule_to_variable_without_rules(grammar):
+    g = grammar({'S': ['aSb', 'D', 'c']}, variables={'D'})
+    assert [g.CYK(w)[0] for w in ['acb', 'c', 'ab']] == [True, True, False]
@@ -0,0 +1,36 @@
+from CFGParser import SearchBudget
+
+EXPRESSIONS = {'E': ['T+E', 'T'], 'T': ['F*T', 'F'], 'F': ['(E)', 'x']}
+
+
+def expressions(grammar):
+    return grammar(EXPRESSIONS, terminals=('+', '*', '(', ')', 'x', 'λ'), start_variable='E')
+
+
+def test_long_expression_is_searched_in_few_passes(grammar, forms):
+    g = expressions(grammar)
+    string = '+'.join(['(x*x+x)'] * 40)
+    accepted, leaf = g.DFS(string)
+    assert accepted and forms(leaf)[0] == 'E' and forms(leaf)[-1] == string
+    # Deepening one step at a time re-ran the search about len(string) times
+    assert g.last_stats['expanded'] < 15 * len(string)
+    # so a step budget linear in the input is enough
+    assert g.DFS(string, budget=SearchBudget(max_expanded=15 * len(string)))[0]
+
+
+def test_derivation_is_at_most_twice_a_shortest_one(grammar, forms):
+    g = grammar({'S': ['aSb', 'aB', 'λ'], 'B': ['aBb', 'b']})
+    for n in range(1, 7):
+        string = 'a' * n + 'b' * n
+        accepted, leaf = g.DFS(string)
+        assert accepted and forms(leaf)[-1] == string
+        assert len(forms(leaf)) - 1 <= 2 * (n + 1)
+        shortest = g.BFS(string)[1]
+        assert len(forms(leaf)) <= 2 * len(forms(shortest))
+
+
+def test_rejects(grammar):
+    g = expressions(grammar)
+    for string in ('x+', '(x', 'x**x', ''):
+        assert g.DFS(string) == (False, None)
+    assert g.DFS('(x*x)+x', None, 'E')[0]
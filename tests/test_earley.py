@@ -0,0 +1,75 @@
+import pytest
+
+RIGHT_RECURSIVE = {'S': ['aSc', 'bS', 'b']}
+
+
+def test_right_recursion_is_linear(grammar):
+    g = grammar(RIGHT_RECURSIVE, use_automaton=False)
+    steps = []
+    for n in (500, 1000, 2000):
+        assert g.Earley('a' + 'b' * n + 'c')[0]
+        steps.append(g.last_stats['expanded'])
+        assert g.parse_forest('b' * n).count() == 1
+        steps.append(g.last_stats['expanded'])
+    assert all(later < 2.2 * earlier for earlier, later in zip(steps, steps[2:]))
+
+
+def test_leo_items_keep_the_derivation(grammar, forms):
+    g = grammar(RIGHT_RECURSIVE)
+    assert forms(g.Earley('abbbc')[1]) == ['S', 'aSc', 'abSc', 'abbSc', 'abbbc']
+    forest = g.parse_forest('abbbc')
+    assert forest.count() == 1
+    assert forms(g._derivation_from_tree(forest.tree(0))) == forms(g.Earley('abbbc')[1])
+    assert not g.Earley('abbb')[0] and g.parse_forest('abbb') is None
+
+
+@pytest.mark.parametrize('rules', [
+    RIGHT_RECURSIVE,
+    {'S': ['bS', 'b', 'Y'], 'Y': ['NS', 'c'], 'N': ['λ']},
+    {'S': ['A', 'a'], 'A': ['B', 'bA'], 'B': ['S', 'c']},
+    {'S': ['aSS', 'bA', 'λ'], 'A': ['aS', 'S']},
+])
+def test_engines_agree_through_leo_chains(grammar, rules):
+    g = grammar(rules, use_automaton=False)
+    strings = [''] + [format(i, 'b').zfill(n).replace('0', 'a').replace('1', 'b') + tail
+                      for n in range(1, 6) for i in range(2 ** n) for tail in ('', 'c')]
+    for string in strings:
+        accepted = g.CYK(string)[0]
+        assert g.Earley(string)[0] == g.GLL(string)[0] == accepted
+        assert (g.parse_forest(string) is not None) == accepted
+        recognizer = g.stream()
+        recognizer.feed(string)
+        assert recognizer.accepts() == accepted
+
+
+@pytest.mark.parametrize('rules, counts', [
+    ({'S': ['A', 'abS'], 'A': ['bBB', 'a'], 'B': ['S', 'bBa']}, {'babaa': 3, 'abbaa': 1}),
+    ({'S': ['bAA', 'λ'], 'A': ['AbB', 'λ'], 'B': ['S']}, {'bbb': 5, 'bbbb': 14, 'bbbbb': 42}),
+])
+def test_forest_keeps_every_chain_through_a_leo_item(grammar, rules, counts):
+    g = grammar(rules, use_automaton=False)
+    for string, count in counts.items():
+        assert g.parse_forest(string).count() == count
+
+
+def test_cyclic_grammar_derivation_ends(grammar, forms):
+    g = grammar({'S': ['aBB', 'SB', 'λ'], 'A': ['a', 'λ'], 'B': ['SA', 'λ']})
+    assert g.analyze().cyclic == {'S', 'B'}
+    for string in ('a', 'aa', 'aaa'):
+        path = forms(g.Earley(string)[1])
+        assert path[0] == 'S' and path[-1] == string
+    assert g.parse_forest('a').count() == float('inf')
+
+
+def test_stream_snapshots_keep_leo_items(grammar):
+    g = grammar(RIGHT_RECURSIVE, use_automaton=False)
+    recognizer = g.stream()
+    assert recognizer.feed('abb')
+    snapshot = recognizer.snapshot()
+    assert recognizer.feed('bbc') and recognizer.accepts()
+    recognizer.restore(snapshot)
+    assert not recognizer.accepts()
+    assert recognizer.feed('c') and recognizer.accepts()
+    assert not recognizer.feed('c')
+    recognizer.restore(snapshot)
+    assert recognizer.feed('b' * 5000 + 'c') and recognizer.accepts()
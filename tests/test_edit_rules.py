@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from CFGParser import CFG
+
+VARIABLES = ('S', 'A', 'B', 'C')
+TERMINALS = ('a', 'b', 'λ')
+
+
+def production(rng):
+    if rng.random() < 0.15:
+        return 'λ'
+    return ''.join(rng.choice(VARIABLES + TERMINALS[:2]) for _ in range(rng.randint(1, 3)))
+
+
+def analysis_facts(analysis):
+    return (analysis.productions, dict(analysis.variable_rules), analysis.nullable, analysis.min_length,
+            analysis.min_steps, analysis.first, analysis.productive, analysis.reachable, dict(analysis.replacements))
+
+
+def assert_same_as_fresh(g):
+    fresh = CFG(variables=set(g.variables), terminals=set(g.terminals), rules=set(g._rules))
+    fresh.rules(None)
+    assert analysis_facts(g.analysis) == analysis_facts(fresh.analysis)
+    for variable, tree in g.analysis.null_trees.items():
+        assert tree[0] == variable and tree[1] in {symbols for name, symbols in g.analysis.productions
+                                                   if name == variable}
+    compiled, rebuilt = g.compile(), fresh.compile()
+    for name in ('productions', 'symbols', 'lhs', 'rhs', 'offsets', 'start'):
+        assert getattr(compiled, name) == getattr(rebuilt, name)
+    assert list(g.rulesNodes) == list(fresh.rulesNodes)
+    assert all(g.rulesNodes[v].NodeString == fresh.rulesNodes[v].NodeString for v in g.rulesNodes)
+    assert g.accepts_null == fresh.accepts_null
+    for length in range(5):
+        for i in range(2 ** length):
+            string = format(i, 'b').zfill(length).replace('0', 'a').replace('1', 'b') if length else ''
+            expected = fresh.Earley(string)[0]
+            for engine in ('Earley', 'CYK', 'GLL', 'BFS'):
+                assert getattr(g, engine)(string)[0] == expected, (engine, string, sorted(g._rules))
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_edited_grammar_matches_a_fresh_one(seed):
+    rng = random.Random(seed)
+    rules = {'S': [production(rng) for _ in range(3)]}
+    for variable in VARIABLES[1:3]:
+        rules[variable] = [production(rng) for _ in range(2)]
+    g = CFG(variables=set(VARIABLES), terminals=set(TERMINALS), rules=rules)
+    g.rules(None)
+    for _ in range(6):
+        variable = rng.choice(VARIABLES)
+        edit = rng.random()
+        current = sorted(production for name, production in g._rules if name == variable)
+        if edit < 0.4:
+            g.add_rule(variable, production(rng))
+        elif edit < 0.7 and current:
+            g.remove_rule(variable, rng.choice(current))
+        else:
+            g.replace_rules(variable, [production(rng) for _ in range(rng.randint(0, 2))])
+        assert_same_as_fresh(g)
+
+
+def test_edits_keep_the_grammar_prepared(grammar):
+    g = grammar({'S': ['aSb', 'A'], 'A': ['a']}, use_automaton=False)
+    analysis = g.analysis
+    g.add_rule('A', 'b')
+    assert g.analysis is not analysis and g.rulesNodes
+    assert g.Earley('aab')[0] and g.Earley('abb')[0]
+    g.add_rule('D', 'bD')
+    g.add_rule('D', 'b')
+    g.add_rule('A', 'D')
+    assert 'D' in g.variables and g.Earley('abbbb')[0]
+    g.remove_rule('S', 'aSb')
+    assert not g.Earley('aab')[0] and g.Earley('bb')[0]
+    g.replace_rules('S', ['aS', 'A'])
+    assert g.Earley('aaab')[0]
+    assert_same_as_fresh(g)
+
+
+def test_invalid_edits_raise(grammar):
+    g = grammar({'S': ['aSb', 'A'], 'A': ['a']})
+    with pytest.raises(ValueError, match="Unknown rule 'S -> ab'"):
+        g.remove_rule('S', 'ab')
+    with pytest.raises(ValueError, match="Rule must contain combination of variables and terminals"):
+        g.add_rule('S', 'ax')
+    with pytest.raises(ValueError, match="Variables cannot contain each other, 'SA' contains '[SA]'"):
+        g.add_rule('SA', 'a')
+    with pytest.raises(ValueError, match="Rule cannot combine null character"):
+        g.replace_rules('A', ['aλ'])
+    assert sorted(g._rules) == [('A', 'a'), ('S', 'A'), ('S', 'aSb')]
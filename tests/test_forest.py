@@ -0,0 +1,31 @@
+def test_alternatives_of_different_sizes_are_all_listed(grammar):
+    g = grammar({'S': ['Sb', 'b', 'bb']})
+    forest = g.parse_forest('bb')
+    assert forest.count() == 2
+    assert len(list(forest.derivations())) == forest.count()
+    trees = [forest.tree(rank) for rank in range(forest.count())]
+    assert sorted(''.join(tree[1]) for tree in trees) == ['Sb', 'bb']
+
+
+def test_every_rank_unranks(grammar):
+    g = grammar({'S': ['SS', 'a', 'aa', 'aSa']}, terminals=('a', 'λ'))
+    forest = g.parse_forest('aaaaa')
+    total = forest.count()
+    assert total > 10
+    assert len(list(forest.derivations())) == total
+    trees = [repr(forest.tree(rank)) for rank in range(total)]
+    assert len(set(trees)) == total
+
+
+def test_cycles_list_finitely_many(grammar):
+    g = grammar({'S': ['S', 'a', 'aa', 'Sa']}, terminals=('a', 'λ'))
+    forest = g.parse_forest('aa')
+    assert forest.count() == float('inf')
+    listed = list(forest.derivations())
+    assert 0 < len(listed) < 10
+
+
+def test_rejected_input_has_no_forest(grammar):
+    g = grammar({'S': ['aSb', 'λ']})
+    assert g.parse_forest('aab') is None
+    assert g.parse_forest('aabb').count() == 1
@@ -0,0 +1,32 @@
+from itertools import product
+
+import pytest
+
+EXPRESSIONS = {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}
+EXPRESSION_TERMINALS = ('a', '+', '*', '(', ')', 'λ')
+
+
+def test_left_recursive_expressions(grammar, forms):
+    g = grammar(EXPRESSIONS, terminals=EXPRESSION_TERMINALS, start_variable='E')
+    for string in ['a', 'a+a', 'a*a+a', '(a+a)*a', 'a+a*(a+(a))', 'a+', '(a', 'a)', '', 'a**a', '+a']:
+        accepted, leaf = g.GLL(string)
+        assert accepted == g.Earley(string)[0] == g.CYK(string)[0]
+        if accepted:
+            assert forms(leaf)[-1] == string
+    assert forms(g.GLL('a+a')[1]) == ['E', 'E+T', 'T+T', 'F+T', 'a+T', 'a+F', 'a+a']
+
+
+@pytest.mark.parametrize('rules', [
+    {'S': ['Ab', 'a'], 'A': ['Sa']},
+    {'S': ['A', 'a'], 'A': ['S', 'b']},
+    {'S': ['SS', 'S', 'a', 'λ']},
+    {'S': ['NS', 'bS', 'a'], 'N': ['S', 'λ']},
+])
+def test_left_recursive_and_cyclic_grammars(grammar, forms, rules):
+    g = grammar(rules, use_automaton=False)
+    for string in (''.join(symbols) for n in range(6) for symbols in product('ab', repeat=n)):
+        accepted, leaf = g.GLL(string)
+        assert accepted == g.Earley(string)[0], string
+        if accepted:
+            path = forms(leaf)
+            assert path[0] == 'S' and path[-1] == string
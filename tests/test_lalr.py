@@ -0,0 +1,61 @@
+import pytest
+
+EXPRESSIONS = {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}
+EXPRESSION_TERMINALS = ('a', '+', '*', '(', ')', 'λ')
+
+
+def assert_leftmost(g, path):
+    assert path[0] == g.start_variable
+    for form, following in zip(path, path[1:]):
+        position = next(i for i, symbol in enumerate(form) if symbol in g.variables)
+        variable = form[position]
+        replacement = following[position:len(following) - (len(form) - position - 1)]
+        assert following[:position] == form[:position]
+        assert following[len(following) - (len(form) - position - 1):] == form[position + 1:]
+        assert (variable, replacement or g.null_character) in g._rules
+
+
+@pytest.fixture
+def expressions(grammar):
+    return grammar(EXPRESSIONS, terminals=EXPRESSION_TERMINALS, start_variable='E')
+
+
+def test_left_recursive_expressions(expressions, forms):
+    g = expressions
+    action, goto, conflicts = g.lalr_table()
+    assert conflicts == []
+    assert ('accept',) in action.values()
+    strings = ['a', 'a+a', 'a*a+a', '(a+a)*a', 'a+a*(a+(a))', 'a+', '(a', 'a)', '', 'a**a', '+a']
+    for string in strings:
+        accepted, leaf = g.LALR(string)
+        assert accepted == g.Earley(string)[0]
+        if accepted:
+            assert forms(leaf) == forms(g.Earley(string)[1])
+            assert forms(leaf)[-1] == string
+
+
+def test_derivation_is_leftmost(expressions, forms):
+    g = expressions
+    path = forms(g.LALR('a+a*a')[1])
+    assert_leftmost(g, path)
+    assert path == ['E', 'E+T', 'T+T', 'F+T', 'a+T', 'a+T*F', 'a+F*F', 'a+a*F', 'a+a*a']
+
+
+def test_null_rules(grammar, forms):
+    g = grammar({'S': ['aSb', 'λ']})
+    assert [g.LALR(string)[0] for string in ['', 'ab', 'aabb', 'aab', 'ba']] == [True, True, True, False, False]
+    path = forms(g.LALR('aabb')[1])
+    assert_leftmost(g, path)
+    assert path == ['S', 'aSb', 'aaSbb', 'aabb']
+
+
+@pytest.mark.parametrize('rules, conflict', [
+    ({'S': ['SS', 'a']}, 'LALR(1) shift/reduce conflict in state 3 on a: shift 2 | reduce S -> SS'),
+    ({'S': ['aA', 'aB'], 'A': ['c'], 'B': ['c']},
+     'LALR(1) reduce/reduce conflict in state 3 on $: reduce A -> c | reduce B -> c'),
+])
+def test_conflicts_raise(grammar, rules, conflict):
+    g = grammar(rules)
+    assert g.lalr_table()[2] == [conflict]
+    with pytest.raises(ValueError, match=r"Grammar is not LALR\(1\):\n"):
+        g.LALR('a')
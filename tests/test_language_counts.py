@@ -0,0 +1,95 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from CFGParser import CFG, BudgetExhausted, SearchBudget
+
+VARIABLES = ('S', 'A', 'B')
+
+
+def brute_force(g, alphabet, length):
+    return {''.join(symbols) for symbols in itertools.product(alphabet, repeat=length) if g.Earley(''.join(symbols))[0]}
+
+
+def random_grammar(seed):
+    rng = random.Random(seed)
+
+    def production():
+        if rng.random() < 0.15:
+            return 'λ'
+        return ''.join(rng.choice(VARIABLES + ('a', 'b')) for _ in range(rng.randint(1, 3)))
+
+    rules = {variable: [production() for _ in range(rng.randint(1, 3))] for variable in VARIABLES}
+    g = CFG(terminals={'a', 'b', 'λ'}, rules=rules)
+    g.rules(None)
+    return g
+
+
+def test_ambiguous_grammar_counts_strings_not_trees(grammar):
+    g = grammar({'S': ['SS', 'a']}, terminals=('a', 'λ'))
+    assert g.language_counts().count(13) == 208012
+    assert g.count_strings(13) == 1
+    assert list(g.enumerate(13)) == ['a' * n for n in range(1, 14)]
+    assert g.count_strings(40) == 1
+
+
+def test_ambiguous_grammar_lists_each_string_once(grammar):
+    g = grammar({'S': ['SS', 'a', 'b', 'λ']})
+    strings = list(g.enumerate(6))
+    assert len(strings) == len(set(strings)) == sum(2 ** n for n in range(7))
+    assert [len(string) for string in strings] == sorted(len(string) for string in strings)
+    assert g.count_strings(10) == 2 ** 10
+
+
+def test_ambiguous_grammar_samples_strings_uniformly(grammar):
+    g = grammar({'S': ['aS', 'Sa', 'bS', 'b', 'a']})
+    counts = g.language_counts()
+    assert not counts.unique and counts.count(3) > 8
+    frequencies = Counter(g.sample(3, 20000, seed=1))
+    assert len(frequencies) == 8
+    # aaa has more trees than bbb, but is drawn as often
+    assert all(abs(frequency - 2500) < 250 for frequency in frequencies.values())
+
+
+def test_counting_strings_takes_a_budget(grammar):
+    g = grammar({'S': ['SS', 'a', 'b', 'λ']})
+    with pytest.raises(BudgetExhausted) as raised:
+        g.count_strings(12, budget=SearchBudget(max_expanded=100))
+    assert raised.value.reason == 'expanded'
+    with pytest.raises(BudgetExhausted):
+        g.sample(12, 1, budget=SearchBudget(max_expanded=100))
+    assert g.count_strings(8, budget=SearchBudget(max_expanded=10 ** 5)) == 2 ** 8
+
+
+def test_unambiguous_grammar_counts_from_tables(grammar):
+    g = grammar({'S': ['aSbS', 'λ']})
+    counts = g.language_counts()
+    assert counts.unique
+    assert g.count_strings(40) == 6564120420
+    assert sorted(g.enumerate(4)) == ['', 'aabb', 'ab', 'abab']
+
+
+@pytest.mark.parametrize('seed', range(60))
+def test_counts_and_strings_match_brute_force(seed):
+    g = random_grammar(seed)
+    strings = list(g.enumerate(5))
+    assert len(strings) == len(set(strings))
+    for length in range(6):
+        expected = brute_force(g, 'ab', length)
+        assert g.count_strings(length) == len(expected)
+        assert {string for string in strings if len(string) == length} == expected
+        if g.language_counts().unique:
+            assert g.language_counts().count(length) == len(expected)
+        for string in g.sample(length, 3, seed=seed):
+            assert string in expected
+
+
+def test_regular_grammar_counts_on_its_automaton(grammar):
+    g = grammar({'S': ['aS', 'bS', 'a', 'b']})
+    assert g.language_counts().unique
+    assert g.count_strings(20) == 2 ** 20
+    assert g.sample(8, 5, seed=3) == g.sample(8, 5, seed=3)
+    g.use_automaton = False
+    assert g.count_strings(20) == 2 ** 20
@@ -0,0 +1,57 @@
+import pytest
+
+EXPRESSIONS = {'E': ['TX'], 'X': ['+TX', 'λ'], 'T': ['(E)', 'a']}
+EXPRESSION_TERMINALS = ('a', '+', '(', ')', 'λ')
+
+
+def test_ll1_grammar_is_parsed_as_written(grammar, forms):
+    g = grammar(EXPRESSIONS, terminals=EXPRESSION_TERMINALS, start_variable='E')
+    table, conflicts = g.predictive_table()
+    assert conflicts == []
+    productions = g.analyze().productions
+    assert productions[table[('X', ')')]] == ('X', ())
+    assert productions[table[('T', '(')]] == ('T', ('(', 'E', ')'))
+    for string, accepted in [('a', True), ('a+a', True), ('(a+a)+a', True), ('a+', False), (')', False), ('', False)]:
+        assert g.LL1(string)[0] == accepted
+        assert 'normal_form' not in g.last_stats
+    accepted, leaf = g.LL1('a+(a)')
+    assert forms(leaf) == ['E', 'TX', 'aX', 'a+TX', 'a+(E)X', 'a+(TX)X', 'a+(aX)X', 'a+(a)X', 'a+(a)']
+
+
+def test_conflicts_are_listed(grammar):
+    g = grammar({'S': ['aS', 'ab']}, use_automaton=False, use_normal_form=False)
+    assert g.predictive_table()[1] == ["LL(1) conflict on (S, a): S -> aS | S -> ab"]
+    with pytest.raises(ValueError, match=r"Grammar is not LL\(1\):\nLL\(1\) conflict on \(S, a\)"):
+        g.LL1('ab')
+
+
+def test_left_factored_normal_form_is_used(grammar, forms):
+    g = grammar({'S': ['aS', 'ab']}, use_automaton=False)
+    assert g.predictive_table()[1]
+    assert [g.LL1(string)[0] for string in ['ab', 'aab', 'a', 'b']] == [True, True, False, False]
+    assert g.last_stats['normal_form']
+    assert forms(g.LL1('aab')[1]) == ['S', 'aS', 'aab']
+
+
+def test_ambiguous_grammar_raises(grammar):
+    g = grammar({'S': ['SS', 'a']}, use_automaton=False)
+    with pytest.raises(ValueError, match=r"Grammar is not LL\(1\)"):
+        g.LL1('aa')
+
+
+def test_trace_rows(grammar):
+    g = grammar({'S': ['aSb', 'λ']})
+    assert g.LL1('ab', trace=True)[0]
+    assert [list(row) for row in g.table.rows] == [
+        ['ab$', 'S$', 'S -> aSb'],
+        ['ab$', 'aSb$', 'matched a'],
+        ['b$', 'Sb$', 'S -> λ'],
+        ['b$', 'b$', 'matched b'],
+        ['$', '$', 'accepted'],
+    ]
+    assert not g.LL1('abb', trace=True)[0]
+    assert [list(row) for row in g.table.rows][-2:] == [['bb$', 'b$', 'matched b'], ['b$', '$', 'error']]
+    assert not g.LL1('ca', trace=True)[0]
+    assert [list(row) for row in g.table.rows] == [['ca$', 'S$', 'error: no rule for (S, c)']]
+    g.LL1('ab')
+    assert len(g.table.rows) == 1
@@ -0,0 +1,36 @@
+from CFGParser import CFG, NormalForm
+
+
+def test_left_recursive_grammar_terminates(grammar):
+    g = grammar({'S': ['Sa', 'b']}, use_automaton=False)
+    for string, accepted in [('b', True), ('baaa', True), ('ab', False), ('', False)]:
+        assert g.BFS(string)[0] == g.DFS(string)[0] == accepted
+
+
+def test_fresh_variables_avoid_undeclared_rule_symbols(grammar):
+    g = grammar({'S': ['SAa', 'a']}, terminals=('a', 'λ'), use_automaton=False)
+    fresh = {variable for variable, _, _ in g.normal_form().rules} - set(g.variables)
+    assert 'A' not in fresh
+    for string in ['aAa', 'a', 'aAaAa', 'aa']:
+        assert g.BFS(string)[0] == g.DFS(string)[0] == g.Earley(string)[0]
+
+
+def test_loaded_grammar_keeps_its_normal_forms(grammar, tmp_path, monkeypatch):
+    g = grammar({'S': ['Sa', 'Sb', 'b']}, use_automaton=False)
+    g.prepare(tmp_path, engines=('BFS', 'DFS', 'LL1'))
+    assert g._normal_forms
+
+    def rebuilt(*args):
+        raise AssertionError("normal form rebuilt")
+
+    monkeypatch.setattr(NormalForm, 'apply', rebuilt)
+    monkeypatch.setattr(NormalForm, 'of', classmethod(rebuilt))
+    loaded = CFG.load_cache(g.cache_path(tmp_path))
+    loaded.use_automaton = False
+    assert loaded._normal_forms.keys() == g._normal_forms.keys()
+    assert loaded.BFS('bab')[0] and loaded.DFS('bab')[0] and not loaded.DFS('ab')[0]
+    assert loaded.LL1('bab')[0]
+
+    other = grammar({'S': ['Sa', 'Sb', 'b']}, use_automaton=False)
+    assert other.prepare(tmp_path)
+    assert other.BFS('bba')[0]
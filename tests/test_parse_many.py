@@ -0,0 +1,48 @@
+from CFGParser import SearchBudget
+
+
+def outcomes(results):
+    return [(result.index, result.string, result.status) for result in results]
+
+
+def test_cached_workers_keep_the_grammar_settings(grammar, tmp_path):
+    g = grammar({'S': ['aSb', 'ab']}, use_automaton=False, budget=SearchBudget(max_expanded=3))
+    strings = ['ab', 'aabb', 'aaabbb', 'aab']
+    plain = outcomes(g.parse_many(strings, 'Earley', workers=2, chunk_size=1))
+    cached = outcomes(g.parse_many(strings, 'Earley', workers=2, chunk_size=1, cache_dir=tmp_path))
+    assert plain == cached
+    assert {status for _, _, status in cached} == {'exhausted'}
+
+    g.budget = None
+    g.use_normal_form = False
+    plain = list(g.parse_many(strings, 'BFS', workers=2, chunk_size=1))
+    cached = list(g.parse_many(strings, 'BFS', workers=2, chunk_size=1, cache_dir=tmp_path))
+    assert outcomes(plain) == outcomes(cached)
+    assert [result.accepted for result in cached] == [True, True, True, False]
+    assert not any(result.stats.get('normal_form') for result in plain + cached)
+
+
+def test_results_come_in_input_order(grammar):
+    g = grammar({'S': ['aSb', 'ab']})
+    strings = [format(i, 'b').replace('0', 'a').replace('1', 'b') for i in range(2, 60)]
+    alone = list(g.parse_many(strings, 'Earley', workers=1, derivations=True))
+    pooled = list(g.parse_many(strings, 'Earley', workers=3, chunk_size=4, derivations=True))
+    assert outcomes(alone) == outcomes(pooled)
+    assert [result.index for result in pooled] == list(range(len(strings)))
+    assert [result.string for result in pooled] == strings
+    assert [g.Derivation_Path(r.node) for r in alone] == [g.Derivation_Path(r.node) for r in pooled]
+    assert [result.accepted for result in pooled] == [g.Earley(string)[0] for string in strings]
+
+
+def test_failures_stay_with_their_input(grammar):
+    g = grammar({'S': ['SS', 'a', 'b', 'cd', 'λ']}, terminals=('a', 'b', 'c', 'd', 'λ'), use_automaton=False,
+                use_normal_form=False)
+    strings = ['ab', 42, 'ababababc', 'ba']
+    for workers in (1, 2):
+        results = list(g.parse_many(strings, 'BFS', workers=workers, chunk_size=1, timeout=0.2))
+        assert [result.status for result in results] == ['accepted', 'error', 'timeout', 'accepted']
+        assert results[1].error == 'Input must be a string' and not results[2].accepted
+
+        results = list(g.parse_many(strings, 'BFS', workers=workers, budget=SearchBudget(max_expanded=200)))
+        assert [result.status for result in results] == ['accepted', 'error', 'exhausted', 'accepted']
+        assert results[2].error == 'expanded' and not results[2].accepted
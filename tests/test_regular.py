@@ -0,0 +1,38 @@
+BINARY = ('0', '1', 'λ')
+
+
+def test_right_linear_grammar_uses_automaton(grammar):
+    g = grammar({'S': ['0S', '1S', '0', '1']}, terminals=BINARY)
+    assert g.regular_automaton() is not None
+    for w in ['0', '101', '0011']:
+        assert g.BFS(w)[0] and g.CYK(w)[0] and g.Earley(w)[0]
+    assert not g.BFS('')[0] and not g.Earley('2')[0]
+
+
+def test_every_state_accepting(grammar):
+    g = grammar({'S': ['S0', 'λ']}, terminals=('0', 'λ'))
+    automaton = g.regular_automaton()
+    assert automaton.size == 1
+    assert all(automaton.accepts('0' * n) for n in range(5))
+    assert not automaton.accepts('1')
+    assert g.Earley('000')[0] and g.CYK('')[0]
+
+
+def test_automaton_agrees_with_earley(grammar):
+    rules = {'S': ['0A', '1S', 'λ'], 'A': ['0S', '1A']}
+    g = grammar(rules, terminals=BINARY)
+    plain = grammar(rules, terminals=BINARY)
+    plain.use_automaton = False
+    for n in range(6):
+        for i in range(2 ** n):
+            w = format(i, 'b').zfill(n) if n else ''
+            assert g.Earley(w)[0] == plain.Earley(w)[0] == (w.count('0') % 2 == 0)
+
+
+def test_stream_on_automaton(grammar):
+    g = grammar({'S': ['0S', '1S', '0', '1']}, terminals=BINARY)
+    r = g.stream()
+    assert r.automaton is not None
+    assert not r.accepts()
+    assert r.feed('01') and r.accepts()
+    assert not r.feed('2')
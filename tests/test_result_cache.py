@@ -0,0 +1,40 @@
+from CFGParser import ParseCache, ENGINES
+
+
+def test_hits_rebuild_the_derivation(grammar, forms):
+    g = grammar({'S': ['aSb', 'A'], 'A': ['aA', 'λ']}, result_cache=ParseCache())
+    for engine in ENGINES:
+        if engine in ('LL1', 'LALR'):
+            continue
+        for string in ['aab', 'aabb', 'ba']:
+            accepted, leaf = getattr(g, engine)(string)
+            cached, cached_leaf = getattr(g, engine)(string)
+            assert g.last_stats['cached']
+            assert cached == accepted
+            assert forms(cached_leaf) == forms(leaf)
+
+
+def test_entries_hold_rules_not_forms(grammar):
+    g = grammar({'S': ['aS', 'b']}, result_cache=ParseCache())
+    g.Earley('aaaab')
+    (accepted, rules), _ = next(iter(g.result_cache.entries.values()))
+    assert accepted and [''.join(symbols) for symbols in rules] == ['aS'] * 4 + ['b']
+
+
+def test_settings_are_part_of_the_key(grammar):
+    g = grammar({'S': ['aS', 'b']}, result_cache=ParseCache())
+    g.Earley('ab')
+    g.use_automaton = False
+    g.Earley('ab')
+    assert not g.last_stats['cached']
+    assert g.result_cache.stats()['entries'] == 2
+
+
+def test_grammars_share_a_cache(grammar, forms):
+    first = grammar({'S': ['aSb', 'ab', 'A'], 'A': ['a']}, result_cache=ParseCache())
+    second = grammar({'A': ['a'], 'S': ['A', 'ab', 'aSb']}, result_cache=ParseCache())
+    second.result_cache = first.result_cache
+    accepted, leaf = first.Earley('aabb')
+    cached, cached_leaf = second.Earley('aabb')
+    assert second.last_stats['cached']
+    assert cached == accepted and forms(cached_leaf) == forms(leaf)
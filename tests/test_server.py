@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from Server import GrammarRegistry, ParseClient, make_server, parse
+
+
+@pytest.fixture
+def server():
+    registry = GrammarRegistry()
+    server = make_server(registry, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = ParseClient(port=server.server_address[1], timeout=10)
+    yield client
+    client.close()
+
+
+def test_round_trip(client):
+    grammar = client.register({'S': ['aSb', 'ab']}, engines=['Earley', 'CYK'])
+    assert client.register({'S': ['ab', 'aSb']}, engines=['Earley']) == grammar
+    assert client.request('GET', '/grammars') == {'grammars': [grammar]}
+    results = client.parse(grammar, ['ab', 'aabb', 'aab'], derivations=True)
+    assert [result['input'] for result in results] == ['ab', 'aabb', 'aab']
+    assert [result['status'] for result in results] == ['accepted', 'accepted', 'rejected']
+    assert results[1]['derivation'] == ['S', 'aSb', 'aabb'] and results[2]['derivation'] is None
+    results = client.parse(grammar, ['aabb'], engine='CYK', max_expanded=1)
+    assert results[0]['status'] == 'exhausted' and results[0]['error'] == 'expanded'
+    assert client.request('GET', '/stats')['grammars'][grammar]['entries'] == 3
+    client.request('DELETE', '/grammars/' + grammar)
+    with pytest.raises(RuntimeError, match="Unknown grammar"):
+        client.parse(grammar, ['ab'])
+    with pytest.raises(RuntimeError, match="Unknown engine 'Nope'"):
+        client.parse(client.register({'S': ['a']}), ['a'], engine='Nope')
+
+
+def test_deadline_bounds_the_request():
+    registry = GrammarRegistry(cache_entries=0)
+    identifier, _ = registry.register({'rules': {'S': ['SS', 'a', 'bc', 'λ']}, 'engines': ['BFS']})
+    grammar = registry.grammars[identifier][0]
+    # Without its normal form, BFS never rejects 'aab'
+    grammar.use_automaton = False
+    grammar.use_normal_form = False
+    started = time.monotonic()
+    request = {'grammar': identifier, 'engine': 'BFS', 'inputs': ['aa'] + ['aab'] * 5, 'derivations': True}
+    results = parse(registry, request, {'deadline': 0.3})['results']
+    assert time.monotonic() - started < 1.2
+    assert results[0]['status'] == 'accepted'
+    assert [(result['status'], result['error']) for result in results[1:]] == [('exhausted', 'deadline')] * 5
+    assert len(results) == 6 and all('derivation' in result for result in results)
@@ -0,0 +1,69 @@
+import pytest
+
+RULES = {'S': ['aSb', 'A'], 'A': ['cA', 'λ']}
+
+
+@pytest.mark.parametrize('engine', ['BFS', 'DFS', 'CYK', 'Earley', 'GLL'])
+def test_every_parse_leaves_its_stats(grammar, engine):
+    g = grammar(RULES)
+    assert getattr(g, engine)('aacbb')[0]
+    stats = g.last_stats
+    assert stats['engine'] == engine and stats['expanded'] > 0
+    assert set(stats['timings']) == {'prepare', 'search'}
+    assert min(stats['timings'].values()) >= 0
+    # The next parse starts from zero
+    assert not getattr(g, engine)('d')[0]
+    assert g.last_stats is not stats and g.last_stats['expanded'] == 0
+
+
+def test_prune_reasons_are_counted(grammar):
+    g = grammar(RULES)
+    assert g.BFS('aacbb')[0]
+    # S -> aSb does not fit once the terminals left are all c's
+    assert g.last_stats['pruned'].get('prefix', 0) > 0
+    assert g.last_stats['duplicates_suppressed'] == 0
+    assert not g.DFS('aacb')[0]
+    pruned = g.last_stats['pruned']
+    assert set(pruned) <= {'prefix', 'length', 'first', 'unproductive', 'cycle', 'failure_cache', 'depth_bound'}
+    assert pruned['depth_bound'] > 0 and g.last_stats['depth'] > 0
+
+
+def test_trace_hook_sees_every_step(grammar):
+    events = []
+    g = grammar(RULES, use_normal_form=False, trace_hook=lambda engine, event, detail: events.append((engine, event, detail)))
+    assert g.BFS('acb')[0]
+    expanded = [detail for engine, event, detail in events if event == 'expand']
+    assert expanded[:2] == ['S', 'aSb'] and len(expanded) == g.last_stats['expanded']
+    assert all(engine == 'BFS' for engine, _, _ in events)
+
+    del events[:]
+    assert g.DFS('acb')[0]
+    assert ('DFS', 'deepen', 0) in events
+    assert any(event == 'prune' for _, event, _ in events)
+
+    del events[:]
+    assert g.Earley('acb')[0]
+    assert [detail[0] for _, event, detail in events if event == 'set'] == [0, 1, 2, 3]
+
+
+def test_str_stats(grammar):
+    g = grammar(RULES)
+    assert g.str_stats() == ''
+    g.BFS('aacbb')
+    lines = g.str_stats().splitlines()
+    assert lines[0] == 'Engine: BFS'
+    assert 'Steps: {}'.format(g.last_stats['expanded']) in lines
+    assert any(line.startswith('Pruned: ') and 'prefix' in line for line in lines)
+    assert any(line.startswith('Time: ') for line in lines)
+    stats = dict(g.last_stats)
+    g.DFS('aacbb')
+    assert g.str_stats(stats).splitlines()[0] == 'Engine: BFS'
+    assert 'Depth limit: {}'.format(g.last_stats['depth']) in g.str_stats()
+
+
+def test_trace_memory(grammar):
+    g = grammar(RULES, trace_memory=True)
+    g.Earley('aacbb')
+    memory = g.last_stats['memory']
+    assert memory['peak'] >= 0 and len(memory['top']) <= 5
+    assert 'Memory: ' in g.str_stats()
@@ -0,0 +1,52 @@
+import random
+import re
+
+import pytest
+
+from CFGParser import CFG, find_contained_pair
+
+
+def brute_force(strings):
+    return {(including, included) for including in strings for included in strings
+            if including != included and included in including}
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_contained_pair_matches_brute_force(seed):
+    rng = random.Random(seed)
+    strings = {''.join(rng.choice('ab') for _ in range(rng.randint(0, 5))) for _ in range(rng.randint(1, 7))}
+    pairs = brute_force(strings)
+    found = find_contained_pair(strings)
+    if pairs:
+        assert found in pairs
+    else:
+        assert found is None
+
+
+@pytest.mark.parametrize('strings, pairs', [
+    ([''], set()),
+    (['', 'a'], {('a', '')}),
+    (['ab', 'abc'], {('abc', 'ab')}),
+    (['bc', 'abc'], {('abc', 'bc')}),
+    (['b', 'abc'], {('abc', 'b')}),
+    (['abab', 'ba'], {('abab', 'ba')}),
+    (['aab', 'ab', 'b'], {('aab', 'ab'), ('aab', 'b'), ('ab', 'b')}),
+    (['ab', 'ba', 'aa', 'bb'], set()),
+    (['xa', 'ay'], set()),
+])
+def test_prefixes_suffixes_and_empty_strings(strings, pairs):
+    assert brute_force(strings) == pairs
+    found = find_contained_pair(strings)
+    assert found in pairs if pairs else found is None
+
+
+def test_setters_name_the_contained_pair():
+    with pytest.raises(ValueError, match=re.escape("Variables cannot contain each other, 'SA' contains 'S'")):
+        CFG(variables={'S', 'SA'}, terminals={'a', 'λ'}, rules={'S': ['a']})
+    with pytest.raises(ValueError, match=re.escape("Terminals cannot contain each other, 'ab' contains 'b'")):
+        CFG(terminals={'ab', 'b', 'λ'}, rules={'S': ['ab']})
+    with pytest.raises(ValueError, match="Terminals cannot contain each other, '(a|λ)' contains ''"):
+        CFG(terminals={'a', '', 'λ'}, rules={'S': ['a']})
+    g = CFG(variables={'S', 'A'}, terminals={'a', 'b', 'λ'}, rules={'S': ['aA'], 'A': ['b']})
+    with pytest.raises(ValueError, match=re.escape("Variables cannot contain each other, 'SB' contains 'S'")):
+        g.variables = {'S', 'SB'}